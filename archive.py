@@ -0,0 +1,359 @@
+"""Season archives: a league snapshot in one columnar, memory-mapped file.
+
+Layout (little-endian, every section 8-byte aligned):
+
+    MAGIC | header length (u64) | header (JSON) | column sections...
+
+The header lists, per table, the row count and per column its type and the
+offset (from the first section) of its values and, for nullable columns
+holding NULLs, of a uint8 null mask. ints are int64, floats float64, bools
+uint8, datetimes int64 microseconds since EPOCH (naive, as stored); strings are int32 codes (-1 = NULL) into one dictionary shared by
+the whole file: int64 offsets (count + 1) into a UTF-8 blob.
+
+Archive opens the file with mmap and hands out numpy views of it: nothing
+is read or decoded until a cell is looked at, so an old season can back a
+table model directly (see archive_view.py).
+"""
+import json
+import mmap
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import Boolean, DateTime, Float, Integer, String, delete, insert, select, text
+
+from migrations import schema_version
+from models import Fantasquadra, Formazione, Giocatore, Partita, Quotazione, Rosa, Voto
+from repository import _chunks
+
+
+MAGIC = b"FMARCH1\0"
+ARCHIVE_SUFFIX = ".fma"
+
+EPOCH = datetime(1970, 1, 1)
+
+# Parents before children: the order rows are inserted on import
+ARCHIVE_TABLES = [Giocatore, Quotazione, Fantasquadra, Partita, Rosa, Voto, Formazione]
+
+# Triggers replaced by one pass at the end of an import: the FTS index is
+# rebuilt from the new giocatori, the archived quotazioni are the history
+SUSPENDED_TRIGGERS = ["trg_giocatori_fts_*", "trg_giocatori_prezzo_*"]
+
+# Column type -> (header name, numpy dtype of the values)
+_TYPES = [
+    (Boolean, "bool", np.dtype("u1")),
+    (Integer, "int", np.dtype("<i8")),
+    (Float, "float", np.dtype("<f8")),
+    (String, "str", np.dtype("<i4")),
+    (DateTime, "datetime", np.dtype("<i8")),
+]
+_DTYPES = {name: dtype for _, name, dtype in _TYPES}
+
+_ALIGN = 8
+
+
+class ArchiveError(Exception):
+    pass
+
+
+def _column_type(column):
+    for sql_type, name, _ in _TYPES:
+        if isinstance(column.type, sql_type):
+            return name
+    raise ArchiveError(f"tipo non archiviabile: {column.table.name}.{column.name}")
+
+
+def _to_micros(value):
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+
+def _from_micros(value):
+    return EPOCH + timedelta(microseconds=value)
+
+
+def _padded(size):
+    return -size % _ALIGN
+
+
+# ---------- EXPORT ----------
+
+class _Writer:
+    """Collects the column sections and the string dictionary"""
+
+    def __init__(self):
+        self.sections = []  # bytes, each padded to _ALIGN
+        self.size = 0
+        self.strings = {}  # {value: code}
+
+    def add(self, array):
+        offset = self.size
+        data = array.tobytes()
+        self.sections.append(data + b"\0" * _padded(len(data)))
+        self.size += len(self.sections[-1])
+        return offset
+
+    def encode(self, values):
+        codes = self.strings
+        return np.fromiter(
+            (-1 if v is None else codes.setdefault(v, len(codes)) for v in values),
+            dtype=_DTYPES["str"], count=len(values),
+        )
+
+    def column(self, kind, values):
+        """{type, offset, nulls} of one column, after adding its sections"""
+        nulls = None
+        if kind == "str":
+            array = self.encode(values)
+        else:
+            if kind == "datetime":
+                values = [None if v is None else _to_micros(v) for v in values]
+            mask = np.fromiter((v is None for v in values), dtype=bool, count=len(values))
+            if mask.any():
+                values = [0 if v is None else v for v in values]
+                nulls = self.add(mask.astype("u1"))
+            array = np.array(values, dtype=_DTYPES[kind]).reshape(len(values))
+        return {"type": kind, "offset": self.add(array), "nulls": nulls}
+
+    def dictionary(self):
+        encoded = [value.encode("utf-8") for value in self.strings]
+        offsets = np.zeros(len(encoded) + 1, dtype="<i8")
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        return {
+            "count": len(encoded),
+            "offsets": self.add(offsets),
+            "data": self.add(np.frombuffer(b"".join(encoded), dtype="u1")),
+        }
+
+
+def export_archive(session_factory, path):
+    """Write the league in `session_factory`'s database to `path`.
+
+    Returns {table name: rows}. The file is written next to `path` and
+    renamed at the end, so a failed export never leaves half an archive.
+    """
+    writer = _Writer()
+    tables = {}
+    with session_factory() as session:
+        version = schema_version(session.connection())
+        for model in ARCHIVE_TABLES:
+            table = model.__table__
+            rows = session.execute(
+                select(table).order_by(*table.primary_key.columns)
+            ).all()
+            columns = list(zip(*rows)) if rows else [()] * len(table.columns)
+            tables[table.name] = {
+                "rows": len(rows),
+                "columns": {
+                    column.name: writer.column(_column_type(column), list(values))
+                    for column, values in zip(table.columns, columns)
+                },
+            }
+    header = json.dumps({
+        "schema": version,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "tables": tables,
+        "strings": writer.dictionary(),
+    }).encode("utf-8")
+    header += b" " * _padded(len(MAGIC) + 8 + len(header))
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(len(header).to_bytes(8, "little"))
+        f.write(header)
+        for section in writer.sections:
+            f.write(section)
+    os.replace(tmp_path, path)
+    return {name: table["rows"] for name, table in tables.items()}
+
+
+# ---------- READ ----------
+
+class ArchiveTable:
+    """Read-only columns of one archived table, as numpy views of the file"""
+
+    def __init__(self, archive, name, rows, columns):
+        self.archive = archive
+        self.name = name
+        self.rows = rows
+        self.types = {column: spec["type"] for column, spec in columns.items()}
+        self.columns = {}  # {column: array of values or string codes}
+        self.nulls = {}  # {column: bool array}, only for columns with NULLs
+        for column, spec in columns.items():
+            self.columns[column] = archive._array(spec["offset"], _DTYPES[spec["type"]], rows)
+            if spec["nulls"] is not None:
+                self.nulls[column] = archive._array(spec["nulls"], np.dtype("u1"), rows).view(bool)
+
+    def __len__(self):
+        return self.rows
+
+    def value(self, column, row):
+        """Python value of one cell (None for NULL)"""
+        kind = self.types[column]
+        if kind == "str":
+            return self.archive.string(int(self.columns[column][row]))
+        nulls = self.nulls.get(column)
+        if nulls is not None and nulls[row]:
+            return None
+        value = self.columns[column][row].item()
+        if kind == "datetime":
+            return _from_micros(value)
+        return bool(value) if kind == "bool" else value
+
+    def sort_key(self, column):
+        """Array ordering the rows by `column` (NULLs first, like SQLite)"""
+        values = self.columns[column]
+        if self.types[column] == "str":
+            ranks = np.concatenate(([-1], self.archive.string_ranks()))
+            return ranks[values.astype(np.int64) + 1]
+        nulls = self.nulls.get(column)
+        if nulls is None:
+            return values
+        key = values.astype(np.float64)
+        key[nulls] = -np.inf
+        return key
+
+    def records(self):
+        """Rows as {column: value} dicts, for bulk inserts"""
+        lists = {}
+        for column, kind in self.types.items():
+            if kind == "str":
+                strings = self.archive.string
+                lists[column] = [strings(code) for code in self.columns[column].tolist()]
+                continue
+            values = self.columns[column].tolist()
+            if kind == "bool":
+                values = [bool(v) for v in values]
+            elif kind == "datetime":
+                values = [_from_micros(v) for v in values]
+            nulls = self.nulls.get(column)
+            if nulls is not None:
+                values = [None if null else v for v, null in zip(values, nulls.tolist())]
+            lists[column] = values
+        names = list(lists)
+        return [dict(zip(names, row)) for row in zip(*lists.values())]
+
+
+class Archive:
+    """A season archive opened read-only through mmap"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            try:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # empty file
+                raise ArchiveError(f"{path} non è un archivio di stagione")
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            self._mmap.close()
+            raise ArchiveError(f"{path} non è un archivio di stagione")
+        size = int.from_bytes(self._mmap[len(MAGIC):len(MAGIC) + 8], "little")
+        start = len(MAGIC) + 8
+        self.header = json.loads(self._mmap[start:start + size])
+        self._data = start + size  # offsets in the header start here
+
+        strings = self.header["strings"]
+        self._string_count = strings["count"]
+        self._string_offsets = self._array(strings["offsets"], np.dtype("<i8"), strings["count"] + 1)
+        self._string_data = self._data + strings["data"]
+        self._decoded = {}  # {code: str}, filled as cells are shown
+        self._ranks = None
+
+        self.tables = {
+            name: ArchiveTable(self, name, spec["rows"], spec["columns"])
+            for name, spec in self.header["tables"].items()
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _array(self, offset, dtype, count):
+        # Zero copy: the array reads straight from the mapped pages
+        return np.frombuffer(self._mmap, dtype=dtype, count=count, offset=self._data + offset)
+
+    @property
+    def created(self):
+        return self.header["created"]
+
+    def table(self, name):
+        try:
+            return self.tables[name]
+        except KeyError:
+            raise ArchiveError(f"tabella {name} assente dall'archivio")
+
+    def string(self, code):
+        if code < 0:
+            return None
+        value = self._decoded.get(code)
+        if value is None:
+            start, end = self._string_offsets[code:code + 2].tolist()
+            value = self._decoded[code] = self._mmap[
+                self._string_data + start:self._string_data + end
+            ].decode("utf-8")
+        return value
+
+    def string_ranks(self):
+        """Rank of every dictionary string in case-insensitive order"""
+        if self._ranks is None:
+            order = sorted(range(self._string_count), key=lambda code: self.string(code).casefold())
+            self._ranks = np.empty(self._string_count, dtype=np.int64)
+            self._ranks[order] = np.arange(self._string_count)
+        return self._ranks
+
+    def close(self):
+        self.tables = {}
+        self._string_offsets = None
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass  # arrays still in use: unmapped when the last one goes
+
+
+# ---------- IMPORT ----------
+
+def import_archive(session_factory, path):
+    """Replace the league in the live database with the archived one.
+
+    Everything happens in one transaction: the archived tables are emptied
+    (children first) and refilled with bulk executemany inserts.
+    Returns {table name: rows}. Raises ArchiveError, before touching the
+    database, if the archived columns differ from the live ones.
+    """
+    with Archive(path) as archive:
+        tables = [(model.__table__, archive.table(model.__tablename__)) for model in ARCHIVE_TABLES]
+        with session_factory.begin() as session:
+            # Migrations that leave the archived tables alone keep old
+            # archives usable; a missing or extra column would be silently
+            # NULLed or fail halfway, so the columns must match exactly
+            for table, archived in tables:
+                if set(archived.types) != set(table.columns.keys()):
+                    raise ArchiveError(
+                        f"archivio con schema {archive.header['schema']} incompatibile con "
+                        f"il database (schema {schema_version(session.connection())}): "
+                        f"colonne di {table.name} diverse"
+                    )
+            for table, _ in reversed(tables):
+                session.execute(delete(table))
+
+            # Per-row index and history upkeep costs more than the inserts:
+            # drop those triggers for the load. pysqlite opens the transaction
+            # at the first DML, so the DDL only after the deletes rolls back
+            conn = session.connection()
+            triggers = conn.execute(text(
+                "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND ("
+                + " OR ".join(f"name GLOB '{p}'" for p in SUSPENDED_TRIGGERS) + ")"
+            )).all()
+            for name, _ in triggers:
+                conn.exec_driver_sql(f'DROP TRIGGER "{name}"')
+
+            for table, archived in tables:
+                for chunk in _chunks(archived.records()):
+                    session.execute(insert(table), chunk)
+
+            conn.exec_driver_sql("INSERT INTO giocatori_fts (giocatori_fts) VALUES ('rebuild')")
+            for _, sql in triggers:
+                conn.exec_driver_sql(sql)
+        return {table.name: len(archived) for table, archived in tables}
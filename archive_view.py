@@ -0,0 +1,93 @@
+import os
+
+import numpy as np
+from PySide6.QtCore import QAbstractTableModel, Qt, QModelIndex
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QLabel, QTabWidget, QTableView
+
+from archive import Archive
+from constants import (
+    FANTASQUADRE_FIELDS, FANTASQUADRE_HEADERS, GIOCATORI_FIELDS, GIOCATORI_HEADERS
+)
+
+
+class ArchiveTableModel(QAbstractTableModel):
+    """Read-only table over an archived table, no SQLite involved.
+
+    Cells are read from the mapped columns when painted; sorting reorders
+    an index array with numpy, the data itself never moves.
+    """
+
+    def __init__(self, table, fields, headers):
+        super().__init__()
+        self.table = table
+        self.fields = fields
+        self.headers = headers
+        if "deleted" in table.columns:
+            self.order = np.flatnonzero(table.columns["deleted"] == 0)
+        else:
+            self.order = np.arange(len(table))
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.order)
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(self.fields)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role != Qt.ItemDataRole.DisplayRole:
+            return None
+        return self.table.value(self.fields[index.column()], self.order[index.row()])
+
+    def headerData(self, section, orientation, role):
+        if (
+            role == Qt.ItemDataRole.DisplayRole
+            and orientation == Qt.Orientation.Horizontal
+        ):
+            return self.headers[section]
+        return None
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        key = self.table.sort_key(self.fields[column])[self.order]
+        ranked = self.order[np.argsort(key, kind="stable")]
+        if order == Qt.SortOrder.DescendingOrder:
+            ranked = ranked[::-1]
+        self.layoutAboutToBeChanged.emit()
+        self.order = ranked
+        self.layoutChanged.emit()
+
+
+class ArchiveWindow(QWidget):
+    """Giocatori and fantasquadre of an archived season, read-only"""
+
+    def __init__(self, path, parent=None):
+        super().__init__(parent, Qt.WindowType.Window)
+        self.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        self.archive = Archive(path)
+        self.setWindowTitle(f"Archivio – {os.path.basename(path)}")
+        self.resize(800, 500)
+        self.setup_ui()
+
+    def setup_ui(self):
+        layout = QVBoxLayout()
+
+        info = QLabel(f"Stagione archiviata il {self.archive.created} (sola lettura)")
+        info.setStyleSheet("font-weight: bold;")
+        layout.addWidget(info)
+
+        tabs = QTabWidget()
+        for title, name, fields, headers in (
+            ("Giocatori", "giocatori", GIOCATORI_FIELDS, GIOCATORI_HEADERS),
+            ("Fantasquadre", "fantasquadre", FANTASQUADRE_FIELDS, FANTASQUADRE_HEADERS),
+        ):
+            view = QTableView()
+            view.setModel(ArchiveTableModel(self.archive.table(name), fields, headers))
+            view.setSortingEnabled(True)
+            view.setEditTriggers(QTableView.EditTrigger.NoEditTriggers)
+            tabs.addTab(view, title)
+        layout.addWidget(tabs)
+
+        self.setLayout(layout)
+
+    def closeEvent(self, event):
+        self.archive.close()
+        super().closeEvent(event)
@@ -0,0 +1,406 @@
+"""Live auction (asta) server and client over loopback TCP.
+
+The server holds the current lot and a RosterEngine (remaining crediti
+and ruolo quotas of every fantasquadra) in memory, so checking a bid is a
+few dict lookups no matter how many bidders are connected. All state lives on the asyncio
+event loop thread: bids are applied one at a time without locks. Only the
+award of a lot touches the database, in one transaction that re-checks
+budget and quota and inserts the `rose` row.
+
+Protocol: one JSON object per line. Requests carry an "op" and a "req"
+number that the reply echoes back ({"req": n, "ok": true, ...} or
+{"req": n, "ok": false, "error": "..."}); state changes are broadcast to
+every client as {"event": ...} lines.
+
+    python auction.py --port 8765 --lot-seconds 10
+"""
+import argparse
+import asyncio
+import itertools
+import json
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+from models import Fantasquadra, Giocatore, Rosa
+from roster import RosterError, RosterEngine, load_engine
+
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+
+class AuctionError(Exception):
+    """A rejected request; the message is shown to the bidder"""
+
+
+def load_player(session_factory, giocatore_id):
+    """(nome, ruolo) of a listed player, None if missing or deleted"""
+    with session_factory() as session:
+        return session.query(Giocatore.nome, Giocatore.ruolo).filter_by(
+            id=giocatore_id, deleted=False
+        ).one_or_none()
+
+
+def award(session_factory, giocatore_id, fantasquadra_id, ruolo, prezzo, quota):
+    """Put the player in the team's rosa in one transaction, returns the row id.
+
+    Budget and quota are checked again in SQL so another writer (the app, a
+    second server) can't make the in-memory engine overspend.
+    """
+    try:
+        with session_factory.begin() as session:
+            crediti = session.query(Fantasquadra.crediti).filter_by(
+                id=fantasquadra_id
+            ).scalar() or 0
+            spent = session.query(func.coalesce(func.sum(Rosa.prezzo), 0)).filter_by(
+                fantasquadra_id=fantasquadra_id
+            ).scalar()
+            if crediti - spent < prezzo:
+                raise AuctionError("Crediti insufficienti")
+            taken = session.query(func.count(Rosa.id)).join(
+                Giocatore, Giocatore.id == Rosa.giocatore_id
+            ).filter(Rosa.fantasquadra_id == fantasquadra_id, Giocatore.ruolo == ruolo).scalar()
+            if taken >= quota:
+                raise AuctionError(f"Quota {ruolo} completa ({quota})")
+            rosa = Rosa(
+                fantasquadra_id=fantasquadra_id, giocatore_id=giocatore_id, prezzo=prezzo
+            )
+            session.add(rosa)
+            session.flush()
+            return rosa.id
+    except IntegrityError:
+        raise AuctionError("Giocatore già assegnato")
+
+
+# ---------- LOT ----------
+
+class Lot:
+    """The player being auctioned and the best bid so far"""
+
+    def __init__(self, giocatore_id, nome, ruolo, base):
+        self.giocatore_id = giocatore_id
+        self.nome = nome
+        self.ruolo = ruolo
+        self.amount = base - 1  # the first valid bid is `base`
+        self.team = None
+        self.closing = False  # award being committed, no more bids
+
+    def to_dict(self):
+        return {
+            "giocatore": self.giocatore_id,
+            "nome": self.nome,
+            "ruolo": self.ruolo,
+            "amount": self.amount if self.team is not None else None,
+            "team": self.team,
+        }
+
+
+# ---------- SERVER ----------
+
+class AuctionServer:
+    """Asyncio bid server; create it inside the running event loop"""
+
+    def __init__(self, session_factory, host=DEFAULT_HOST, port=DEFAULT_PORT,
+                 lot_seconds=None):
+        self.session_factory = session_factory
+        self.host = host
+        self.port = port
+        # Without bids for this long the lot is awarded (None: auctioneer closes)
+        self.lot_seconds = lot_seconds
+        self.roster = RosterEngine()
+        self.lot = None
+        self.clients = {}  # {writer: fantasquadra id or None}
+        self._server = None
+        self._timer = None
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        self.roster = await loop.run_in_executor(None, load_engine, self.session_factory)
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        # Port 0 asks the OS for a free port
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        await self._server.serve_forever()
+
+    async def close(self):
+        if self._timer is not None:
+            self._timer.cancel()
+        self._server.close()
+        for writer in list(self.clients):
+            writer.close()
+        await self._server.wait_closed()
+
+    # ---------- CONNECTIONS ----------
+
+    async def _handle_client(self, reader, writer):
+        self.clients[writer] = None
+        try:
+            while line := await reader.readline():
+                try:
+                    message = json.loads(line)
+                    req = message.get("req")
+                except (ValueError, AttributeError):
+                    self._send(writer, {"ok": False, "error": "Messaggio non valido"})
+                    continue
+                try:
+                    reply = await self._dispatch(writer, message)
+                    reply = {"req": req, "ok": True, **(reply or {})}
+                except AuctionError as exc:
+                    reply = {"req": req, "ok": False, "error": str(exc)}
+                except Exception as exc:
+                    reply = {"req": req, "ok": False, "error": f"Errore del server: {exc}"}
+                self._send(writer, reply)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            del self.clients[writer]
+            writer.close()
+
+    def _send(self, writer, message):
+        writer.write(json.dumps(message).encode() + b"\n")
+
+    def _broadcast(self, message):
+        # No drain: a slow client must not hold up the others
+        data = json.dumps(message).encode() + b"\n"
+        for writer in self.clients:
+            if not writer.is_closing():
+                writer.write(data)
+
+    async def _dispatch(self, writer, message):
+        op = message.get("op")
+        if op == "hello":
+            return self.hello(writer, message.get("team"))
+        if op == "bid":
+            return self.bid(self.clients[writer], message.get("amount"), message.get("giocatore"))
+        if op == "open":
+            return await self.open_lot(message.get("giocatore"), message.get("base", 1))
+        if op == "close":
+            return await self.close_lot()
+        if op == "state":
+            return {"lot": self.lot.to_dict() if self.lot else None}
+        raise AuctionError(f"Operazione sconosciuta: {op}")
+
+    # ---------- OPERATIONS ----------
+
+    def hello(self, writer, team):
+        """Register the connection as bidder for `team` (None: spectator/auctioneer)"""
+        if team is not None and team not in self.roster.teams:
+            raise AuctionError("Fantasquadra sconosciuta")
+        self.clients[writer] = team
+        return {
+            "remaining": self.roster.teams[team].remaining if team is not None else None,
+            "lot": self.lot.to_dict() if self.lot else None,
+        }
+
+    def bid(self, team, amount, giocatore_id=None):
+        """Validate and apply a bid, constant time"""
+        lot = self.lot
+        if team is None:
+            raise AuctionError("Identificati con una fantasquadra per offrire")
+        if lot is None or lot.closing:
+            raise AuctionError("Nessun giocatore all'asta")
+        if giocatore_id is not None and giocatore_id != lot.giocatore_id:
+            raise AuctionError("L'asta per questo giocatore è chiusa")
+        if not isinstance(amount, int) or amount <= lot.amount:
+            raise AuctionError(f"L'offerta minima è {lot.amount + 1}")
+        if lot.team == team:
+            raise AuctionError("La tua offerta è già la migliore")
+        try:
+            self.roster.check_assign(lot.giocatore_id, team, lot.ruolo, amount)
+        except RosterError as exc:
+            raise AuctionError(str(exc))
+
+        lot.amount = amount
+        lot.team = team
+        self._restart_timer()
+        self._broadcast({"event": "bid", "giocatore": lot.giocatore_id, "team": team, "amount": amount})
+        return {"amount": amount}
+
+    async def open_lot(self, giocatore_id, base=1):
+        if self.lot is not None:
+            raise AuctionError("C'è già un giocatore all'asta")
+        if giocatore_id in self.roster.players:
+            raise AuctionError("Giocatore già assegnato")
+        if not isinstance(base, int) or base < 1:
+            raise AuctionError("Base d'asta non valida")
+        loop = asyncio.get_running_loop()
+        player = await loop.run_in_executor(None, load_player, self.session_factory, giocatore_id)
+        if player is None:
+            raise AuctionError("Giocatore sconosciuto")
+        if player[1] not in self.roster.quotas:
+            raise AuctionError(f"Ruolo non valido: {player[1]!r}")
+        if self.lot is not None:  # opened by someone else meanwhile
+            raise AuctionError("C'è già un giocatore all'asta")
+
+        self.lot = Lot(giocatore_id, player[0], player[1], base)
+        self._restart_timer()
+        self._broadcast({"event": "lot", **self.lot.to_dict()})
+        return {"lot": self.lot.to_dict()}
+
+    async def close_lot(self):
+        """Award the lot to the best bid (or drop it if nobody bid)"""
+        lot = self.lot
+        if lot is None or lot.closing:
+            raise AuctionError("Nessun giocatore all'asta")
+        lot.closing = True
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        if lot.team is None:
+            self.lot = None
+            self._broadcast({"event": "unsold", "giocatore": lot.giocatore_id})
+            return {"team": None}
+
+        # Reserve crediti and quota slot before leaving the loop, bids for
+        # other lots can't be opened until the commit is done anyway
+        self.roster.assign(lot.giocatore_id, lot.team, lot.ruolo, lot.amount)
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(
+                None, award, self.session_factory, lot.giocatore_id, lot.team,
+                lot.ruolo, lot.amount, self.roster.quotas[lot.ruolo]
+            )
+        except AuctionError as exc:
+            # Assigned or overspent by another writer: the lot can't be awarded
+            self.roster.release(lot.giocatore_id)
+            self.lot = None
+            self._broadcast({"event": "unsold", "giocatore": lot.giocatore_id, "error": str(exc)})
+            raise
+        except Exception:
+            # Database busy etc.: keep the lot open so it can be closed again
+            self.roster.release(lot.giocatore_id)
+            lot.closing = False
+            self._restart_timer()
+            raise
+        self.lot = None
+        self._broadcast({
+            "event": "awarded", "giocatore": lot.giocatore_id, "team": lot.team,
+            "amount": lot.amount, "remaining": self.roster.teams[lot.team].remaining,
+        })
+        return {"team": lot.team, "amount": lot.amount}
+
+    def _restart_timer(self):
+        if self.lot_seconds is None:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = asyncio.get_running_loop().call_later(
+            self.lot_seconds, self._on_timeout
+        )
+
+    def _on_timeout(self):
+        self._timer = None
+
+        async def close():
+            try:
+                await self.close_lot()
+            except AuctionError:
+                pass
+
+        asyncio.ensure_future(close())
+
+
+# ---------- CLIENT ----------
+
+class AuctionClient:
+    """Asyncio client; replies are matched to requests, events go to `events`"""
+
+    def __init__(self):
+        self.events = asyncio.Queue()
+        self._reader = None
+        self._writer = None
+        self._pending = {}
+        self._ids = itertools.count(1)
+        self._listener = None
+
+    async def connect(self, host=DEFAULT_HOST, port=DEFAULT_PORT, team=None):
+        self._reader, self._writer = await asyncio.open_connection(host, port)
+        self._listener = asyncio.ensure_future(self._listen())
+        return await self.request("hello", team=team)
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        if self._listener is not None:
+            await asyncio.gather(self._listener, return_exceptions=True)
+
+    async def request(self, op, **params):
+        """Send a request and wait for its reply; raises AuctionError if rejected"""
+        req = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[req] = future
+        self._writer.write(json.dumps({"op": op, "req": req, **params}).encode() + b"\n")
+        await self._writer.drain()
+        reply = await future
+        if not reply.get("ok"):
+            raise AuctionError(reply.get("error"))
+        return reply
+
+    async def bid(self, amount, giocatore_id=None):
+        return await self.request("bid", amount=amount, giocatore=giocatore_id)
+
+    async def open_lot(self, giocatore_id, base=1):
+        return await self.request("open", giocatore=giocatore_id, base=base)
+
+    async def close_lot(self):
+        return await self.request("close")
+
+    async def next_event(self):
+        """Next broadcast event; raises ConnectionError once the connection is gone"""
+        if not self.events.empty():
+            return self.events.get_nowait()
+        get = asyncio.ensure_future(self.events.get())
+        await asyncio.wait({get, self._listener}, return_when=asyncio.FIRST_COMPLETED)
+        if get.done():
+            return get.result()
+        get.cancel()
+        raise ConnectionError("Connessione chiusa dal server dell'asta")
+
+    async def _listen(self):
+        try:
+            while line := await self._reader.readline():
+                message = json.loads(line)
+                future = self._pending.pop(message.get("req"), None)
+                if future is not None:
+                    future.set_result(message)
+                elif "event" in message:
+                    self.events.put_nowait(message)
+        finally:
+            for future in self._pending.values():
+                future.set_exception(ConnectionError("Connessione chiusa"))
+            self._pending.clear()
+
+
+# ---------- MAIN ----------
+
+async def serve(session_factory, host, port, lot_seconds):
+    server = AuctionServer(session_factory, host, port, lot_seconds)
+    await server.start()
+    print(f"Asta in ascolto su {server.host}:{server.port}")
+    await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Server per l'asta live")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--lot-seconds", type=float,
+                        help="assegna il giocatore dopo N secondi senza offerte")
+    args = parser.parse_args(argv)
+
+    from database import SessionLocal, engine
+    from migrations import migrate
+
+    migrate(engine)
+    try:
+        asyncio.run(serve(SessionLocal, args.host, args.port, args.lot_seconds))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
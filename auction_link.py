@@ -0,0 +1,96 @@
+import asyncio
+import threading
+
+from PySide6.QtCore import QObject, Signal
+
+from auction import AuctionClient, AuctionError
+
+
+class AuctionLink(QObject):
+    """Runs an AuctionClient on its own thread for a window of the app.
+
+    Signals are emitted from the auction thread and delivered queued on the
+    GUI thread; requests return at once, a rejection comes back through
+    `rejected` (accepted ones are visible in the broadcast events).
+    """
+
+    joined = Signal(dict)  # hello reply: remaining crediti, current lot
+    event = Signal(dict)  # {"event": "lot" | "bid" | "awarded" | "unsold", ...}
+    rejected = Signal(str)  # error of a request
+    disconnected = Signal(str)
+
+    def __init__(self, host, port, team=None, parent=None):
+        super().__init__(parent)
+        self.host = host
+        self.port = port
+        self.team = team
+        self.client = None
+        self.loop = None
+        self._task = None
+        self._thread = None
+
+    def start(self):
+        started = threading.Event()
+
+        def run():
+            async def main():
+                self.loop = asyncio.get_running_loop()
+                self._task = asyncio.current_task()
+                started.set()
+                await self._follow()
+
+            try:
+                asyncio.run(main())
+            except asyncio.CancelledError:
+                pass  # stop()
+
+        self._thread = threading.Thread(target=run, name="auction", daemon=True)
+        self._thread.start()
+        started.wait()
+
+    async def _follow(self):
+        self.client = AuctionClient()
+        try:
+            self.joined.emit(await self.client.connect(self.host, self.port, self.team))
+            while True:
+                self.event.emit(await self.client.next_event())
+        except (OSError, AuctionError) as exc:
+            self.disconnected.emit(str(exc))
+        finally:
+            await self.client.close()
+
+    # ---------- REQUESTS (GUI thread) ----------
+
+    def request(self, op, **params):
+        if self.loop is None or self.client is None:
+            return
+        future = asyncio.run_coroutine_threadsafe(self.client.request(op, **params), self.loop)
+        future.add_done_callback(self._on_reply)
+
+    def _on_reply(self, future):
+        if future.cancelled():
+            return
+        exc = future.exception()
+        if isinstance(exc, (AuctionError, ConnectionError)):
+            self.rejected.emit(str(exc))
+        elif exc is not None:
+            self.rejected.emit(f"Errore: {exc}")
+
+    def bid(self, amount, giocatore_id=None):
+        self.request("bid", amount=amount, giocatore=giocatore_id)
+
+    def open_lot(self, giocatore_id, base=1):
+        self.request("open", giocatore=giocatore_id, base=base)
+
+    def close_lot(self):
+        self.request("close")
+
+    def stop(self):
+        if self._thread is None:
+            return
+        try:
+            self.loop.call_soon_threadsafe(self._task.cancel)
+        except RuntimeError:
+            pass  # the loop already ended with the connection
+        self._thread.join(5)
+        self._thread = None
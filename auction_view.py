@@ -0,0 +1,142 @@
+from PySide6.QtCore import Qt
+from PySide6.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QSpinBox, QPushButton, QListWidget
+)
+
+from auction_link import AuctionLink
+
+
+class AuctionWindow(QWidget):
+    """Bidding client of a live auction (auction.py server).
+
+    Connected as a fantasquadra it can bid; the lot controls work for
+    anyone, as on the server (the banditore is just another client).
+    """
+
+    def __init__(self, host, port, team, names, parent=None):
+        super().__init__(parent, Qt.WindowType.Window)
+        self.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        self.team = team
+        self.names = names  # {fantasquadra id: nome}
+        self.lot = None  # lot dict as sent by the server
+        self.setWindowTitle(f"Asta – {host}:{port}")
+        self.resize(450, 450)
+        self.setup_ui()
+
+        self.link = AuctionLink(host, port, team, self)
+        self.link.joined.connect(self._on_joined)
+        self.link.event.connect(self._on_event)
+        self.link.rejected.connect(lambda message: self._log(f"⚠ {message}"))
+        self.link.disconnected.connect(self._on_disconnected)
+        self.link.start()
+
+    def setup_ui(self):
+        layout = QVBoxLayout()
+
+        self.status_label = QLabel("Connessione…")
+        self.status_label.setStyleSheet("font-weight: bold;")
+        layout.addWidget(self.status_label)
+
+        self.lot_label = QLabel()
+        layout.addWidget(self.lot_label)
+
+        bid_row = QHBoxLayout()
+        self.amount_box = QSpinBox()
+        self.amount_box.setRange(1, 9999)
+        self.bid_button = QPushButton("Offri")
+        self.bid_button.clicked.connect(self.bid)
+        bid_row.addWidget(self.amount_box)
+        bid_row.addWidget(self.bid_button)
+        layout.addLayout(bid_row)
+
+        lot_row = QHBoxLayout()
+        self.player_box = QSpinBox()
+        self.player_box.setRange(1, 10**9)
+        self.player_box.setPrefix("Id giocatore ")
+        open_button = QPushButton("Metti all'asta")
+        open_button.clicked.connect(lambda: self.link.open_lot(self.player_box.value()))
+        self.close_button = QPushButton("Aggiudica")
+        self.close_button.clicked.connect(lambda: self.link.close_lot())
+        lot_row.addWidget(self.player_box)
+        lot_row.addWidget(open_button)
+        lot_row.addWidget(self.close_button)
+        layout.addLayout(lot_row)
+
+        self.log = QListWidget()
+        layout.addWidget(self.log)
+
+        self.setLayout(layout)
+        self._show_lot()
+
+    def _team_name(self, team):
+        return self.names.get(team, f"#{team}")
+
+    def _log(self, text):
+        self.log.insertItem(0, text)
+
+    # ---------- SERVER ----------
+
+    def _on_joined(self, reply):
+        if self.team is None:
+            self.status_label.setText("Connesso come banditore/spettatore")
+        else:
+            self._show_remaining(reply["remaining"])
+        self.lot = reply.get("lot")
+        self._show_lot()
+
+    def _show_remaining(self, remaining):
+        self.status_label.setText(
+            f"Connesso come {self._team_name(self.team)} · crediti residui {remaining}"
+        )
+
+    def _on_event(self, event):
+        kind = event.get("event")
+        if kind == "lot":
+            self.lot = {k: v for k, v in event.items() if k != "event"}
+            self._log(f"All'asta: {event['nome']} ({event['ruolo']})")
+        elif kind == "bid":
+            if self.lot is not None and self.lot["giocatore"] == event["giocatore"]:
+                self.lot.update(amount=event["amount"], team=event["team"])
+            self._log(f"{self._team_name(event['team'])} offre {event['amount']}")
+        elif kind == "awarded":
+            self._log(
+                f"Aggiudicato a {self._team_name(event['team'])} per {event['amount']}"
+            )
+            if event["team"] == self.team:
+                self._show_remaining(event["remaining"])
+            self.lot = None
+        elif kind == "unsold":
+            reason = f" ({event['error']})" if event.get("error") else ""
+            self._log(f"Giocatore non aggiudicato{reason}")
+            self.lot = None
+        self._show_lot()
+
+    def _on_disconnected(self, message):
+        self.status_label.setText(f"Disconnesso: {message}")
+        self.bid_button.setEnabled(False)
+
+    def _show_lot(self):
+        lot = self.lot
+        can_bid = lot is not None and self.team is not None
+        self.bid_button.setEnabled(can_bid)
+        self.amount_box.setEnabled(can_bid)
+        self.close_button.setEnabled(lot is not None)
+        if lot is None:
+            self.lot_label.setText("Nessun giocatore all'asta")
+            return
+        if lot["team"] is None:
+            best = "nessuna offerta"
+            minimum = (lot["amount"] or 0) + 1
+        else:
+            best = f"offerta migliore {lot['amount']} ({self._team_name(lot['team'])})"
+            minimum = lot["amount"] + 1
+        self.lot_label.setText(f"{lot['nome']} ({lot['ruolo']}) – {best}")
+        self.amount_box.setValue(max(self.amount_box.value(), minimum))
+
+    def bid(self):
+        if self.lot is not None:
+            self.link.bid(self.amount_box.value(), self.lot["giocatore"])
+
+    def closeEvent(self, event):
+        self.link.stop()
+        super().closeEvent(event)
@@ -0,0 +1,77 @@
+"""Benchmarks for the season archives.
+
+Times the export of a league, opening the archive and reading the first
+page of giocatori from it against Repository.all() on the database, the
+sort of the whole archived table and the round-trip import:
+
+    python -m benchmarks.bench_archive --players 5000 20000
+"""
+import argparse
+import os
+import tempfile
+
+from archive import Archive, export_archive, import_archive
+from benchmarks.common import (
+    make_database, seed_fantasquadre, seed_giocatori, measure, summarize, write_report
+)
+from constants import GIOCATORI_FIELDS, PAGE_SIZE
+from models import Giocatore
+from repository import Repository
+
+
+def read_page(path):
+    """Open the archive and read the cells of the first page, as a view would"""
+    with Archive(path) as archive:
+        table = archive.table("giocatori")
+        rows = min(PAGE_SIZE, len(table))
+        return [[table.value(f, row) for f in GIOCATORI_FIELDS] for row in range(rows)]
+
+
+def sort_by_name(path):
+    with Archive(path) as archive:
+        return archive.table("giocatori").sort_key("nome").argsort(kind="stable")
+
+
+def run_size(players, repeat, workdir, seed):
+    path = os.path.join(workdir, f"archive_{players}.db")
+    engine, session_factory = make_database(path)
+    seed_giocatori(engine, players, seed)
+    seed_fantasquadre(engine, 10, seed)
+    repo = Repository(session_factory, Giocatore, GIOCATORI_FIELDS)
+    archive_path = os.path.join(workdir, f"archive_{players}.fma")
+    export_archive(session_factory, archive_path)
+
+    extra = {"archive_bytes": os.path.getsize(archive_path)}
+    results = [
+        summarize("export", players, measure(
+            lambda: export_archive(session_factory, archive_path), repeat), **extra),
+        summarize("repository_all", players, measure(repo.all, repeat), **extra),
+        summarize("archive_open_page", players, measure(
+            lambda: read_page(archive_path), repeat), **extra),
+        summarize("archive_sort_nome", players, measure(
+            lambda: sort_by_name(archive_path), repeat), **extra),
+        summarize("import", players, measure(
+            lambda: import_archive(session_factory, archive_path), repeat), **extra),
+    ]
+    engine.dispose()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--players", type=int, nargs="+", default=[5000, 20000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--workdir", help="directory for the synthetic databases")
+    args = parser.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory(dir=args.workdir) as workdir:
+        for players in args.players:
+            results.extend(run_size(players, args.repeat, workdir, args.seed))
+    write_report(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""Load test for the live auction server.
+
+Starts the server in a child process on a seeded synthetic database, then
+lets dozens of bidder clients outbid each other concurrently on a series
+of lots and reports bid round-trip and award latencies as JSON:
+
+    python -m benchmarks.bench_auction --bidders 10 50 --lots 20 --output asta.json
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from auction import AuctionClient, AuctionError, AuctionServer
+from benchmarks.common import (
+    make_database, seed_fantasquadre, seed_giocatori, summarize, write_report
+)
+
+
+def _run_server(path, ready):
+    from sqlalchemy.orm import sessionmaker
+    from database import make_engine
+
+    session_factory = sessionmaker(bind=make_engine(f"sqlite:///{path}"), expire_on_commit=False)
+
+    async def serve():
+        server = AuctionServer(session_factory, port=0)
+        await server.start()
+        ready.put(server.port)
+        await server.serve_forever()
+
+    asyncio.run(serve())
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+async def _bidder(client, lot_done, rounds, rng, accepted, rejected):
+    """Raise the best bid (as seen from the events) until the lot closes"""
+    best = 0
+    for _ in range(rounds):
+        if lot_done.is_set():
+            return
+        while not client.events.empty():
+            event = client.events.get_nowait()
+            if event.get("event") == "bid":
+                best = max(best, event["amount"])
+        amount = best + rng.randint(1, 3)
+        start = time.perf_counter()
+        try:
+            await client.bid(amount)
+            accepted.append((time.perf_counter() - start) * 1000)
+            best = amount
+        except AuctionError:
+            rejected.append((time.perf_counter() - start) * 1000)
+
+
+async def run_auction(port, bidders, lots, rounds, seed):
+    rng = random.Random(seed)
+    auctioneer = AuctionClient()
+    await auctioneer.connect(port=port)
+    clients = []
+    for team in range(1, bidders + 1):
+        client = AuctionClient()
+        await client.connect(port=port, team=team)
+        clients.append(client)
+
+    accepted, rejected, awards = [], [], []
+    start = time.perf_counter()
+    for giocatore_id in range(1, lots + 1):
+        await auctioneer.open_lot(giocatore_id)
+        lot_done = asyncio.Event()
+        await asyncio.gather(*(
+            _bidder(client, lot_done, rounds, random.Random(rng.random()), accepted, rejected)
+            for client in clients
+        ))
+        lot_done.set()
+        award_start = time.perf_counter()
+        await auctioneer.close_lot()
+        awards.append((time.perf_counter() - award_start) * 1000)
+    elapsed = time.perf_counter() - start
+
+    for client in [auctioneer, *clients]:
+        await client.close()
+    return accepted, rejected, awards, elapsed
+
+
+def run_size(bidders, lots, rounds, workdir, seed):
+    path = os.path.join(workdir, f"asta_{bidders}.db")
+    engine, _ = make_database(path)
+    seed_giocatori(engine, max(lots, 100), deleted_ratio=0)
+    # Enough crediti that nobody runs out: the test measures contention
+    seed_fantasquadre(engine, bidders)
+    engine.dispose()
+
+    ready = multiprocessing.Queue()
+    server = multiprocessing.Process(target=_run_server, args=(path, ready), daemon=True)
+    server.start()
+    try:
+        port = ready.get(timeout=30)
+        accepted, rejected, awards, elapsed = asyncio.run(
+            run_auction(port, bidders, lots, rounds, seed)
+        )
+    finally:
+        server.terminate()
+        server.join()
+
+    bids = accepted + rejected
+    return [
+        summarize(
+            "bid_roundtrip", bidders, bids,
+            p50_ms=round(percentile(bids, 50), 4),
+            p99_ms=round(percentile(bids, 99), 4),
+            accepted=len(accepted), rejected=len(rejected),
+            bids_per_s=round(len(bids) / elapsed, 1),
+        ),
+        summarize(
+            "award_commit", bidders, awards,
+            p50_ms=round(statistics.median(awards), 4),
+            p99_ms=round(percentile(awards, 99), 4),
+        ),
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bidders", type=int, nargs="+", default=[10, 25, 50])
+    parser.add_argument("--lots", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=5, help="bid attempts per bidder per lot")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--workdir", help="directory for the synthetic databases")
+    args = parser.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory(dir=args.workdir) as workdir:
+        for bidders in args.bidders:
+            results.extend(run_size(bidders, args.lots, args.rounds, workdir, args.seed))
+    write_report(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Benchmarks for the lineup optimizer.
+
+Optimizes a synthetic season (full 25-player rose, 38 giornate of
+fantavoti) for growing league sizes, in-process and across a process
+pool, to show how the optimizer scales:
+
+    python -m benchmarks.bench_lineup --teams 10 100 1000 --workers 1 4
+"""
+import argparse
+
+import numpy as np
+
+from benchmarks.common import measure, summarize, write_report
+from constants import ROSA_QUOTE
+from lineup import RUOLI, optimize_teams, project
+
+
+GIORNATE = 38
+
+
+def make_league(teams, seed):
+    """{team: (ids, ruoli, projected, actual)} with ~30% senza voto"""
+    rng = np.random.default_rng(seed)
+    ruoli = np.repeat(np.arange(len(RUOLI)), [ROSA_QUOTE[r] for r in RUOLI])
+    league = {}
+    for team in range(1, teams + 1):
+        ids = np.arange(len(ruoli)) + team * 100
+        actual = rng.normal(6.0, 1.5, (GIORNATE, len(ruoli)))
+        actual[rng.random(actual.shape) < 0.3] = np.nan
+        league[team] = (ids, ruoli, project(actual), actual)
+    return league
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--teams", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    results = []
+    for teams in args.teams:
+        league = make_league(teams, args.seed)
+        for workers in args.workers:
+            samples = measure(lambda: optimize_teams(league, workers), args.repeat)
+            results.append(summarize(
+                f"season_workers_{workers}", teams, samples,
+                lineups=teams * GIORNATE,
+                lineups_per_s=round(teams * GIORNATE / (min(samples) / 1000), 1),
+            ))
+    write_report(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
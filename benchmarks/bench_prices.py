@@ -0,0 +1,87 @@
+"""Benchmarks for the quotazioni history.
+
+Records a season of price changes through the giocatori triggers, then
+times one player's range, "as of giornata N" for a page and for the whole
+league, the league series for charting and the trend columns of a page:
+
+    python -m benchmarks.bench_prices --players 1000 5000
+"""
+import argparse
+import os
+import random
+import tempfile
+
+from benchmarks.common import make_database, seed_giocatori, measure, summarize, write_report
+from constants import PAGE_SIZE
+from price_history import as_of, history, league_series, trends
+
+
+GIORNATE = 38
+
+
+def record_season(engine, players, seed):
+    """One giornata of pagelle per round, ~30% of the prices change each time"""
+    rng = random.Random(seed)
+    with engine.begin() as conn:
+        for giornata in range(1, GIORNATE + 1):
+            # The triggers date a change by the last giornata with pagelle
+            conn.exec_driver_sql(
+                "INSERT INTO voti (giornata, giocatore_id, gol, assist, ammonizioni,"
+                " espulsioni, rigori_parati, rigori_sbagliati, autogol, gol_subiti,"
+                " clean_sheet) VALUES (?, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0)",
+                (giornata,),
+            )
+            changes = [
+                (rng.choice([-2, -1, 1, 2]), player)
+                for player in range(1, players + 1) if rng.random() < 0.3
+            ]
+            conn.exec_driver_sql(
+                "UPDATE giocatori SET prezzo = MAX(1, prezzo + ?) WHERE id = ?", changes
+            )
+
+
+def run_size(players, repeat, workdir, seed):
+    path = os.path.join(workdir, f"prices_{players}.db")
+    engine, session_factory = make_database(path)
+    seed_giocatori(engine, players, seed, deleted_ratio=0)
+    record_season(engine, players, seed)
+    with engine.connect() as conn:
+        points = conn.exec_driver_sql("SELECT COUNT(*) FROM quotazioni").scalar()
+
+    page = list(range(1, min(PAGE_SIZE, players) + 1))
+    middle = GIORNATE // 2
+    extra = {"quotazioni": points}
+    results = [
+        summarize("player_range", players, measure(
+            lambda: history(session_factory, players // 2, 10, 20), repeat), **extra),
+        summarize("as_of_page", players, measure(
+            lambda: as_of(session_factory, middle, page), repeat), **extra),
+        summarize("as_of_league", players, measure(
+            lambda: as_of(session_factory, middle), repeat), **extra),
+        summarize("league_series", players, measure(
+            lambda: league_series(session_factory), repeat), **extra),
+        summarize("trends_page", players, measure(
+            lambda: trends(session_factory, page), repeat), **extra),
+    ]
+    engine.dispose()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--players", type=int, nargs="+", default=[1000, 5000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--workdir", help="directory for the synthetic databases")
+    args = parser.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory(dir=args.workdir) as workdir:
+        for players in args.players:
+            results.extend(run_size(players, args.repeat, workdir, args.seed))
+    write_report(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Benchmarks for the soft-delete retention job.
+
+Times Repository.purge_deleted() of every expired giocatore at a few batch
+sizes (each batch is one write transaction, i.e. how long other writers
+wait for the lock) and the incremental compaction after it, reporting the
+file size before and after:
+
+    python -m benchmarks.bench_retention --players 20000 50000
+"""
+import argparse
+import os
+import tempfile
+from datetime import datetime
+
+from sqlalchemy import text
+
+from benchmarks.common import make_database, seed_giocatori, measure, summarize, write_report
+from constants import GIOCATORI_FIELDS
+from models import Giocatore
+from repository import Repository
+from retention import compact
+
+
+# Every row soft deleted by the seed is older than this
+CUTOFF = datetime(2100, 1, 1)
+
+
+def file_size(engine, path):
+    with engine.connect() as conn:
+        conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+    return os.path.getsize(path)
+
+
+def run_size(players, batch_sizes, repeat, workdir, seed):
+    path = os.path.join(workdir, f"retention_{players}.db")
+    state = {}
+
+    def fresh():
+        if "engine" in state:
+            state["engine"].dispose()
+        engine, session_factory = make_database(path)
+        seed_giocatori(engine, players, seed, deleted_ratio=0.5)
+        state["engine"] = engine
+        state["repo"] = Repository(session_factory, Giocatore, GIOCATORI_FIELDS)
+        with engine.connect() as conn:
+            state["expired"] = conn.execute(
+                text("SELECT count(*) FROM giocatori WHERE deleted")
+            ).scalar()
+
+    def purged():
+        fresh()
+        state["repo"].purge_deleted(CUTOFF)
+        state["before"] = file_size(state["engine"], path)
+
+    results = []
+    for batch_size in batch_sizes:
+        samples = measure(
+            lambda: state["repo"].purge_deleted(CUTOFF, batch_size=batch_size),
+            repeat, setup=fresh,
+        )
+        batches = -(-state["expired"] // batch_size)
+        results.append(summarize(
+            f"purge_batch_{batch_size}", players, samples,
+            rows=state["expired"], batches=batches,
+            ms_per_batch=round(min(samples) / batches, 4),
+        ))
+
+    samples = measure(lambda: compact(state["engine"]), repeat, setup=purged)
+    results.append(summarize(
+        "compact", players, samples,
+        bytes_before=state["before"], bytes_after=file_size(state["engine"], path),
+    ))
+    state["engine"].dispose()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--players", type=int, nargs="+", default=[20000, 50000])
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[100, 500, 5000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--workdir", help="directory for the synthetic databases")
+    args = parser.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory(dir=args.workdir) as workdir:
+        for players in args.players:
+            results.extend(run_size(players, args.batch_sizes, args.repeat, workdir, args.seed))
+    write_report(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
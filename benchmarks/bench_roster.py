@@ -0,0 +1,124 @@
+"""Benchmarks for the rosa constraint engine.
+
+Validates and applies batches of trades (price changes and swaps between
+teams) with RosterEngine's incremental aggregates and with a naive check
+that re-sums the team's rosa for every change:
+
+    python -m benchmarks.bench_roster --teams 10 100 --trades 1000
+"""
+import argparse
+import random
+
+from benchmarks.common import measure, summarize, write_report
+from constants import ROSA_QUOTE
+from roster import RosterEngine, RosterError
+
+
+def build_engine(teams, seed):
+    """Teams with full rose (25 players each) and plenty of crediti"""
+    rng = random.Random(seed)
+    engine = RosterEngine()
+    giocatore_id = 0
+    for team in range(1, teams + 1):
+        engine.set_team(team, 10000)
+        for ruolo, quota in ROSA_QUOTE.items():
+            for _ in range(quota):
+                giocatore_id += 1
+                engine.assign(giocatore_id, team, ruolo, rng.randint(1, 100))
+    return engine
+
+
+def make_trades(engine, count, seed):
+    """Batch of price edits and release+assign swaps that keeps quotas legal"""
+    rng = random.Random(seed)
+    players = list(engine.players)
+    changes = []
+    moved = set()
+    while len(changes) < count:
+        player = rng.choice(players)
+        if player in moved:
+            continue
+        team, ruolo, _ = engine.players[player]
+        if rng.random() < 0.5:
+            changes.append(("price", player, rng.randint(1, 100)))
+            continue
+        # Swap two players of the same ruolo between teams
+        other = rng.choice(players)
+        other_team, other_ruolo, _ = engine.players[other]
+        if other in moved or other_team == team or other_ruolo != ruolo:
+            continue
+        moved.update((player, other))
+        changes += [
+            ("release", player), ("release", other),
+            ("assign", player, other_team, ruolo, rng.randint(1, 100)),
+            ("assign", other, team, ruolo, rng.randint(1, 100)),
+        ]
+    return changes
+
+
+def naive_apply(players, budgets, changes):
+    """Reference: re-sum the team's rosa to validate every change"""
+    players = dict(players)
+
+    def totals(team):
+        spent = 0
+        counts = dict.fromkeys(ROSA_QUOTE, 0)
+        for entry_team, ruolo, prezzo in players.values():
+            if entry_team == team:
+                spent += prezzo
+                counts[ruolo] += 1
+        return spent, counts
+
+    for change in changes:
+        if change[0] == "release":
+            del players[change[1]]
+        elif change[0] == "price":
+            team, ruolo, old = players[change[1]]
+            spent, _ = totals(team)
+            if budgets[team] - spent < change[2] - old:
+                raise RosterError("Crediti insufficienti")
+            players[change[1]] = (team, ruolo, change[2])
+        else:
+            _, player, team, ruolo, prezzo = change
+            spent, counts = totals(team)
+            if counts[ruolo] >= ROSA_QUOTE[ruolo] or budgets[team] - spent < prezzo:
+                raise RosterError("Rosa non valida")
+            players[player] = (team, ruolo, prezzo)
+    return players
+
+
+def run_size(teams, trades, repeat, seed):
+    engine = build_engine(teams, seed)
+    changes = make_trades(engine, trades, seed)
+    budgets = {team: totals.budget for team, totals in engine.teams.items()}
+
+    def incremental():
+        undo = engine.apply(changes)
+        engine.revert(undo)
+
+    results = [
+        summarize("engine_apply_batch", teams, measure(incremental, repeat), changes=len(changes)),
+        summarize("naive_apply_batch", teams,
+                  measure(lambda: naive_apply(engine.players, budgets, changes), repeat),
+                  changes=len(changes)),
+    ]
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--teams", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--trades", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    results = []
+    for teams in args.teams:
+        results.extend(run_size(teams, args.trades, args.repeat, args.seed))
+    write_report(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
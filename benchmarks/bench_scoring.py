@@ -0,0 +1,141 @@
+"""Benchmarks for the fantavoto scoring engine.
+
+Scores a synthetic season (pagelle for every player and giornata, an XI
+plus bench per team and giornata) with the vectorized engine and with a
+naive per-row loop, and times a full recompute from the database:
+
+    python -m benchmarks.bench_scoring --players 500 --teams 10 100
+"""
+import argparse
+import os
+import random
+import tempfile
+
+import numpy as np
+from sqlalchemy import insert
+
+from benchmarks.common import (
+    make_database, seed_fantasquadre, seed_giocatori, measure, summarize, write_report
+)
+from models import Formazione, Voto
+from scoring import DEFAULT_WEIGHTS, EVENTS, load_lineups, load_votes, score
+from constants import TITOLARI
+
+
+GIORNATE = 38
+
+
+def make_votes(players, giornate, seed):
+    rng = random.Random(seed)
+    rows = []
+    for giornata in range(1, giornate + 1):
+        for player in range(1, players + 1):
+            played = rng.random() < 0.7
+            rows.append({
+                "giornata": giornata,
+                "giocatore_id": player,
+                "voto": rng.choice([5, 5.5, 6, 6, 6.5, 7, 7.5]) if played else None,
+                "gol": int(played and rng.random() < 0.1),
+                "assist": int(played and rng.random() < 0.08),
+                "ammonizioni": int(played and rng.random() < 0.15),
+                "espulsioni": int(played and rng.random() < 0.01),
+                "rigori_parati": 0,
+                "rigori_sbagliati": int(played and rng.random() < 0.005),
+                "autogol": int(played and rng.random() < 0.005),
+                "gol_subiti": 0,
+                "clean_sheet": False,
+            })
+    return rows
+
+
+def make_lineups(players, teams, giornate, seed):
+    """Every team fields 18 players (11 titolari + bench) per giornata"""
+    rng = random.Random(seed)
+    rows = []
+    for giornata in range(1, giornate + 1):
+        for team in range(1, teams + 1):
+            for posizione, player in enumerate(rng.sample(range(1, players + 1), 18), start=1):
+                rows.append({
+                    "giornata": giornata, "fantasquadra_id": team,
+                    "giocatore_id": player, "posizione": posizione,
+                })
+    return rows
+
+
+def naive_score(votes, lineups, weights):
+    """Reference: one dict per pagella, Python arithmetic per row"""
+    fantavoti = {}
+    for row in votes:
+        if row["voto"] is None:
+            continue
+        value = row["voto"]
+        for event in EVENTS:
+            value += weights[event] * row[event]
+        fantavoti[row["giornata"], row["giocatore_id"]] = value
+    totals = {}
+    for row in lineups:
+        if row["posizione"] > TITOLARI:
+            continue
+        key = row["giornata"], row["fantasquadra_id"]
+        totals[key] = totals.get(key, 0.0) + fantavoti.get(
+            (row["giornata"], row["giocatore_id"]), 0.0
+        )
+    return fantavoti, totals
+
+
+def run_size(players, teams, repeat, workdir, seed):
+    path = os.path.join(workdir, f"scoring_{players}_{teams}.db")
+    engine, session_factory = make_database(path)
+    seed_giocatori(engine, players, deleted_ratio=0)
+    seed_fantasquadre(engine, teams)
+    vote_rows = make_votes(players, GIORNATE, seed)
+    lineup_rows = make_lineups(players, teams, GIORNATE, seed)
+    with engine.begin() as conn:
+        conn.execute(insert(Voto), vote_rows)
+        conn.execute(insert(Formazione), lineup_rows)
+
+    votes = load_votes(session_factory)
+    lineups = load_lineups(session_factory)
+    weights = dict(DEFAULT_WEIGHTS, gol=3.5)
+
+    # Both implementations must agree before timing them
+    values, (giornate, squadre, totals) = score(votes, lineups, weights)
+    _, expected = naive_score(vote_rows, lineup_rows, weights)
+    got = dict(zip(zip(giornate.tolist(), squadre.tolist()), totals.tolist()))
+    assert all(np.isclose(got[key], value) for key, value in expected.items())
+
+    size = f"{players}x{teams}"
+    extra = {"pagelle": len(votes), "formazioni": len(lineups)}
+    results = [
+        summarize("season_vectorized", size,
+                  measure(lambda: score(votes, lineups, weights), repeat), **extra),
+        summarize("season_naive_loop", size,
+                  measure(lambda: naive_score(vote_rows, lineup_rows, weights), repeat), **extra),
+        summarize("season_load_and_score", size, measure(
+            lambda: score(load_votes(session_factory), load_lineups(session_factory), weights),
+            repeat
+        ), **extra),
+    ]
+    engine.dispose()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--players", type=int, default=500)
+    parser.add_argument("--teams", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--workdir", help="directory for the synthetic databases")
+    args = parser.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory(dir=args.workdir) as workdir:
+        for teams in args.teams:
+            results.extend(run_size(args.players, teams, args.repeat, workdir, args.seed))
+    write_report(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Benchmarks for the Monte Carlo season simulator.
+
+Plays out the second half of a synthetic season (full 25-player rose,
+19 giornate of fantavoti, double round-robin calendar) in-process and
+across a process pool, to show how the simulator scales with workers:
+
+    python -m benchmarks.bench_season --teams 10 20 --simulations 20000 --workers 1 4
+"""
+import argparse
+
+import numpy as np
+
+from benchmarks.common import measure, summarize, write_report
+from constants import ROSA_QUOTE
+from lineup import RUOLI
+from season import round_robin, season_model, simulate
+
+
+def make_model(teams, seed):
+    """SeasonModel halfway through the season, ~30% senza voto"""
+    rng = np.random.default_rng(seed)
+    ruoli = np.repeat(np.arange(len(RUOLI)), [ROSA_QUOTE[r] for r in RUOLI])
+    calendar = round_robin(range(1, teams + 1), seed=seed)
+    played = len(calendar) // 2
+    matches = [
+        (giornata, casa, trasferta)
+        for giornata, pairs in enumerate(calendar, start=1)
+        for casa, trasferta in pairs
+    ]
+    season = {}
+    for team in range(1, teams + 1):
+        # Stronger and weaker rose, so the probabilities are not all equal
+        actual = rng.normal(6.0 + rng.normal(0, 0.3), 1.5, (played, len(ruoli)))
+        actual[rng.random(actual.shape) < 0.3] = np.nan
+        season[team] = (ruoli, actual)
+    real = {
+        (giornata, team): float(rng.normal(70, 6))
+        for giornata in range(1, played + 1) for team in season
+    }
+    return season_model(matches, played, real, season)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--teams", type=int, nargs="+", default=[10, 20])
+    parser.add_argument("--simulations", type=int, default=20000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    results = []
+    for teams in args.teams:
+        model = make_model(teams, args.seed)
+        baseline = None
+        for workers in args.workers:
+            samples = measure(
+                lambda: simulate(model, args.simulations, args.seed, workers), args.repeat
+            )
+            baseline = baseline or min(samples)
+            results.append(summarize(
+                f"simulate_workers_{workers}", teams, samples,
+                simulations=args.simulations,
+                seasons_per_s=round(args.simulations / (min(samples) / 1000), 1),
+                speedup=round(baseline / min(samples), 2),
+            ))
+    write_report(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
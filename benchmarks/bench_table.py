@@ -0,0 +1,210 @@
+"""Benchmarks for the model/view/repository hot paths.
+
+Runs headless (QT_QPA_PLATFORM=offscreen) on seeded synthetic databases
+and prints/writes a JSON report:
+
+    python -m benchmarks.bench_table --sizes 1000 10000 --output bench.json
+
+Compare two reports with `python -m benchmarks.compare old.json new.json`.
+"""
+import argparse
+import os
+import tempfile
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtWidgets import QApplication
+from PySide6.QtCore import Qt
+
+from benchmarks.common import (
+    make_database, seed_giocatori, measure, summarize, write_report
+)
+from constants import GIOCATORI_FIELDS, GIOCATORI_HEADERS, GIOCATORI_KEY
+from db_worker import DbWorker
+from deleted_items_widget import DeletedItemsWidget
+from editable_table_model import EditableTableModel
+from models import Giocatore
+from repository import Repository
+
+
+ROLES = [
+    Qt.ItemDataRole.DisplayRole,
+    Qt.ItemDataRole.EditRole,
+    Qt.ItemDataRole.ForegroundRole,
+    Qt.ItemDataRole.BackgroundRole,
+    Qt.ItemDataRole.FontRole,
+    Qt.ItemDataRole.ToolTipRole,
+    Qt.ItemDataRole.DecorationRole,
+    Qt.ItemDataRole.TextAlignmentRole,
+    Qt.ItemDataRole.CheckStateRole,
+    Qt.ItemDataRole.SizeHintRole,
+]
+VIEWPORT_ROWS = 40
+BATCH = 1000
+
+
+def drain(app, worker):
+    """Wait until every queued DB task ran and its result reached the model"""
+    while not worker.is_idle():
+        worker.wait_idle()
+        app.processEvents()
+
+
+def load_rows(app, worker, model, count):
+    while len(model.rows) < count and model.canFetchMore():
+        model.fetchMore()
+        drain(app, worker)
+
+
+def run_size(app, size, repeat, workdir):
+    path = os.path.join(workdir, f"bench_{size}.db")
+    engine, session_factory = make_database(path)
+    seed_giocatori(engine, size)
+
+    repo = Repository(session_factory, Giocatore, GIOCATORI_FIELDS)
+    worker = DbWorker()
+    results = []
+
+    def record(name, samples, **extra):
+        results.append(summarize(name, size, samples, **extra))
+
+    # ---------- MODEL ----------
+    model = EditableTableModel(repo, GIOCATORI_FIELDS, GIOCATORI_HEADERS, worker)
+    drain(app, worker)
+
+    def refresh():
+        model.refresh()
+        drain(app, worker)
+
+    record("model.refresh", measure(refresh, repeat))
+
+    def fetch_all():
+        refresh()
+        load_rows(app, worker, model, size)
+
+    record("model.fetch_all", measure(fetch_all, max(1, repeat // 2)))
+
+    def sorted_refresh():
+        model.sort(3, Qt.SortOrder.DescendingOrder)
+        drain(app, worker)
+        model.sort(-1)
+        drain(app, worker)
+
+    record("model.sort_prezzo", measure(sorted_refresh, repeat))
+
+    refresh()
+    load_rows(app, worker, model, BATCH)
+    columns = model.columnCount()
+    visible = min(VIEWPORT_ROWS, model.rowCount())
+
+    def viewport():
+        for row in range(visible):
+            for col in range(columns):
+                index = model.index(row, col)
+                for role in ROLES:
+                    model.data(index, role)
+
+    record(
+        "model.data_viewport", measure(viewport, repeat * 4),
+        calls=visible * columns * len(ROLES)
+    )
+
+    edit_rows = min(BATCH, len(model.rows))
+    prezzo_col = GIOCATORI_FIELDS.index("prezzo")
+    round_no = [0]
+
+    def edit_all():
+        # New values every round, so committed rows become dirty again
+        round_no[0] += 1
+        offset = 1000 * round_no[0]
+        for row in range(1, edit_rows + 1):
+            model.setData(model.index(row, prezzo_col), row + offset)
+
+    record(
+        "model.setData", measure(edit_all, repeat, setup=model.cancel_all_changes),
+        calls=edit_rows
+    )
+    model.cancel_all_changes()
+
+    def commit():
+        model.commit_all_changes()
+        drain(app, worker)
+
+    record(
+        "model.commit_all_changes", measure(commit, repeat, setup=edit_all),
+        dirty_rows=edit_rows
+    )
+
+    # ---------- DELETED ITEMS ----------
+    deleted_widget = DeletedItemsWidget(repo, GIOCATORI_FIELDS, GIOCATORI_HEADERS, worker)
+    drain(app, worker)
+
+    def deleted_refresh():
+        deleted_widget.refresh()
+        drain(app, worker)
+
+    record("deleted.refresh", measure(deleted_refresh, repeat))
+
+    def select_all():
+        deleted_widget.model.set_all_checked(True)
+        drain(app, worker)
+        deleted_widget.model.set_all_checked(False)
+
+    record("deleted.select_all", measure(select_all, repeat))
+
+    # ---------- REPOSITORY ----------
+    live_ids = repo.all_ids()[:BATCH]
+
+    def soft_delete_restore():
+        repo.soft_delete_many(live_ids)
+        repo.restore_many(live_ids)
+
+    record("repo.soft_delete+restore_many", measure(soft_delete_restore, repeat), rows=len(live_ids))
+
+    changes = {obj_id: {"prezzo": i % 300} for i, obj_id in enumerate(live_ids)}
+    record("repo.update_many", measure(lambda: repo.update_many(changes), repeat), rows=len(changes))
+
+    upsert_rows = [
+        {"nome": f"Giocatore {i:06d}", "squadra": "Inter", "ruolo": "A", "prezzo": 1}
+        for i in range(BATCH)
+    ]
+    record(
+        "repo.upsert_many",
+        measure(lambda: repo.upsert_many(upsert_rows, GIOCATORI_KEY), repeat),
+        rows=len(upsert_rows)
+    )
+
+    record(
+        "repo.page_filtered",
+        measure(lambda: repo.page(
+            None, 200, order_by="prezzo",
+            filters=[("ruolo", "eq", "A"), ("prezzo", "min", 50)]
+        ), repeat * 4)
+    )
+
+    deleted_ids = repo.all_ids(deleted=True)[:BATCH]
+    record("repo.hard_delete_many", measure(lambda: repo.hard_delete_many(deleted_ids), 1), rows=len(deleted_ids))
+
+    worker.wait_idle()
+    engine.dispose()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--workdir", help="directory for the synthetic databases")
+    args = parser.parse_args(argv)
+
+    app = QApplication.instance() or QApplication([])
+    results = []
+    with tempfile.TemporaryDirectory(dir=args.workdir) as workdir:
+        for size in args.sizes:
+            results.extend(run_size(app, size, args.repeat, workdir))
+    write_report(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
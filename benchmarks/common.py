@@ -0,0 +1,138 @@
+"""Shared helpers for the benchmark scripts (seeding, timing, JSON reports)"""
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+
+from database import make_engine
+from migrations import migrate
+from models import Giocatore, Fantasquadra
+
+
+RUOLI = ["P", "D", "C", "A"]
+SQUADRE = [
+    "Atalanta", "Bologna", "Cagliari", "Como", "Empoli", "Fiorentina",
+    "Genoa", "Inter", "Juventus", "Lazio", "Lecce", "Milan", "Monza",
+    "Napoli", "Parma", "Roma", "Torino", "Udinese", "Venezia", "Verona",
+]
+
+
+# ---------- DATABASE ----------
+
+def make_database(path):
+    """Fresh SQLite file with the app schema and engine profile.
+    
+    Returns (engine, session factory).
+    """
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    engine = make_engine(f"sqlite:///{path}")
+    migrate(engine)
+    return engine, sessionmaker(bind=engine, expire_on_commit=False)
+
+
+def seed_giocatori(engine, count, seed=42, deleted_ratio=0.1):
+    rng = random.Random(seed)
+    rows = [
+        {
+            "nome": f"Giocatore {i:06d}",
+            "squadra": rng.choice(SQUADRE),
+            "ruolo": rng.choice(RUOLI),
+            "prezzo": rng.randint(1, 300),
+            "deleted": rng.random() < deleted_ratio,
+        }
+        for i in range(count)
+    ]
+    with engine.begin() as conn:
+        conn.execute(insert(Giocatore), rows)
+
+
+def seed_fantasquadre(engine, count, seed=42):
+    rng = random.Random(seed)
+    rows = [
+        {
+            "nome": f"Fantasquadra {i:02d}",
+            "allenatore": f"Allenatore {i:02d}",
+            "crediti": rng.choice([500, 750, 1000]),
+            "deleted": False,
+        }
+        for i in range(count)
+    ]
+    with engine.begin() as conn:
+        conn.execute(insert(Fantasquadra), rows)
+
+
+# ---------- TIMING ----------
+
+def measure(fn, repeat=5, setup=None):
+    """Run fn `repeat` times, returns the samples in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def summarize(name, size, samples, **extra):
+    return {
+        "name": name,
+        "size": size,
+        "repeat": len(samples),
+        "min_ms": round(min(samples), 4),
+        "median_ms": round(statistics.median(samples), 4),
+        "mean_ms": round(statistics.fmean(samples), 4),
+        "max_ms": round(max(samples), 4),
+        **extra,
+    }
+
+
+# ---------- REPORT ----------
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metadata():
+    meta = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": _git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "machine": platform.node(),
+        "sqlite": sqlite3.sqlite_version,
+    }
+    try:
+        import PySide6
+        meta["pyside6"] = PySide6.__version__
+    except ImportError:
+        pass
+    return meta
+
+
+def write_report(results, output=None):
+    report = {"meta": metadata(), "results": results}
+    text = json.dumps(report, indent=2)
+    if output:
+        with open(output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return report
@@ -0,0 +1,44 @@
+"""Compare two benchmark JSON reports from the same machine:
+
+    python -m benchmarks.compare before.json after.json
+"""
+import argparse
+import json
+
+
+def load(path):
+    with open(path) as f:
+        report = json.load(f)
+    return report, {(r["name"], r["size"]): r for r in report["results"]}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, default=1.10,
+                        help="flag results slower than before * threshold")
+    args = parser.parse_args(argv)
+
+    before_report, before = load(args.before)
+    after_report, after = load(args.after)
+    print(f"before: {before_report['meta'].get('commit')}  after: {after_report['meta'].get('commit')}")
+    print(f"{'benchmark':40} {'size':>8} {'before':>10} {'after':>10} {'ratio':>7}")
+
+    regressions = 0
+    for key in sorted(after, key=lambda k: (k[1], k[0])):
+        if key not in before:
+            continue
+        old = before[key]["median_ms"]
+        new = after[key]["median_ms"]
+        ratio = new / old if old else float("inf")
+        flag = ""
+        if ratio > args.threshold:
+            flag = "  <-- slower"
+            regressions += 1
+        print(f"{key[0]:40} {key[1]:>8} {old:>10.3f} {new:>10.3f} {ratio:>7.2f}{flag}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,139 @@
+"""Notice commits made by other connections and patch the views.
+
+SQLite bumps `PRAGMA data_version` on a connection whenever *another*
+connection (this app's writer, an import script, a second app instance)
+commits. Polling it costs a read of the WAL index, no query; only when it
+moves the worker reads the change_log entries after the last seen seq
+(filled by triggers, see migrations.py) and the views reload just those
+rows instead of everything.
+
+The poll runs on the GUI thread: give the watcher an engine with
+busy_timeout=0, a locked database (a writer committing in rollback-journal
+mode) is then just polled again on the next tick.
+"""
+import sqlite3
+
+from PySide6.QtCore import QObject, QTimer, Signal
+from sqlalchemy import exc, func
+
+from models import ChangeLog
+
+
+POLL_INTERVAL_MS = 500
+
+
+def last_seq(session_factory):
+    with session_factory() as session:
+        return _last_seq(session)
+
+
+def _last_seq(session):
+    return session.query(func.coalesce(func.max(ChangeLog.seq), 0)).scalar()
+
+
+def fetch_changes(session_factory, after_seq):
+    """(last seq, {table: {row id: op}}) of the entries after `after_seq`.
+
+    The changes are None when entries after `after_seq` were already
+    pruned: the caller missed some and must reload everything.
+    """
+    with session_factory() as session:
+        first = session.query(func.min(ChangeLog.seq)).scalar()
+        if first is not None and first > after_seq + 1:
+            return _last_seq(session), None
+        query = session.query(ChangeLog.seq, ChangeLog.table_name, ChangeLog.row_id, ChangeLog.op)
+        rows = query.filter(ChangeLog.seq > after_seq).order_by(ChangeLog.seq).all()
+    changes = {}
+    for _, table, row_id, op in rows:
+        # The last op of a row wins (e.g. created then deleted = D)
+        changes.setdefault(table, {})[row_id] = op
+    return (rows[-1][0] if rows else after_seq), changes
+
+
+def _is_locked(error):
+    return "locked" in str(error) or "busy" in str(error)
+
+
+class ChangeWatcher(QObject):
+    """Polls data_version and emits the rows changed since the last poll"""
+
+    changed = Signal(dict)  # {table name: {row id: op}}
+    reset = Signal()  # changes were missed, reload everything
+
+    def __init__(self, engine, session_factory, worker, interval=POLL_INTERVAL_MS, parent=None):
+        super().__init__(parent)
+        self.engine = engine
+        self.session_factory = session_factory
+        self.worker = worker
+        self._connection = None  # data_version is per connection: keep one
+        self._version = None  # None: not read yet, the first read fetches
+        self._seq = None
+        self._fetching = False
+        self._dirty = False  # data_version moved while a fetch was running
+        self._timer = QTimer(self)
+        self._timer.setInterval(interval)
+        self._timer.timeout.connect(self.poll)
+
+    def start(self):
+        """Start watching (queue it after the migrations on the worker)"""
+        self._fetching = True
+        self.worker.submit(last_seq, self.session_factory, on_result=self._on_started)
+
+    def _on_started(self, seq):
+        self._seq = seq
+        self._fetching = False
+        self._timer.start()
+
+    def stop(self):
+        self._timer.stop()
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def _data_version(self):
+        """Current data_version, None while the database is locked"""
+        try:
+            if self._connection is None:
+                self._connection = self.engine.raw_connection()
+            cursor = self._connection.cursor()
+            try:
+                return cursor.execute("PRAGMA data_version").fetchone()[0]
+            finally:
+                cursor.close()
+        except (sqlite3.OperationalError, exc.OperationalError) as error:
+            if not _is_locked(error):
+                raise
+            return None
+
+    def poll(self):
+        if not self._timer.isActive():
+            return
+        version = self._data_version()
+        if version is None or version == self._version:
+            return
+        self._version = version
+        if self._fetching:
+            self._dirty = True
+            return
+        self._fetch()
+
+    def _fetch(self):
+        self._fetching = True
+        self._dirty = False
+        self.worker.submit(
+            fetch_changes, self.session_factory, self._seq,
+            on_result=self._on_changes, on_error=self._on_failed
+        )
+
+    def _on_failed(self, _):
+        self._fetching = False
+
+    def _on_changes(self, result):
+        self._seq, changes = result
+        self._fetching = False
+        if changes is None:
+            self.reset.emit()
+        elif changes:
+            self.changed.emit(changes)
+        if self._dirty:
+            self._fetch()
@@ -1,5 +1,48 @@
+# "host:port" of the sync server the app replicates from (unset: standalone)
+ENV_SYNC = "FANTAMANAGER_SYNC"
+
 GIOCATORI_FIELDS = ["nome", "squadra", "ruolo", "prezzo"]
 GIOCATORI_HEADERS = ["Nome", "Squadra", "Ruolo", "Prezzo"]
+GIOCATORI_KEY = ["nome", "squadra"]  # natural key used by the listone import
 
 FANTASQUADRE_FIELDS = ["nome", "allenatore", "crediti"]
 FANTASQUADRE_HEADERS = ["Nome", "Allenatore", "Crediti"]
+
+# Rows loaded per fetchMore() call in the table models
+PAGE_SIZE = 200
+
+# Rows written per transaction by the listone import
+IMPORT_CHUNK_SIZE = 2000
+
+# Rows changed by other connections that a table model patches in place;
+# beyond this a full reload is cheaper (see change_watcher.py)
+PATCH_MAX_ROWS = 2000
+
+# Players per ruolo in a complete rosa (3P/8D/8C/6A)
+ROSA_QUOTE = {"P": 3, "D": 8, "C": 8, "A": 6}
+
+# Formazioni: posizione 1..TITOLARI are the starting XI, the rest the bench
+TITOLARI = 11
+
+# Formations allowed for the titolari: (difensori, centrocampisti, attaccanti)
+# plus the portiere
+MODULI = {
+    "3-4-3": (3, 4, 3),
+    "3-5-2": (3, 5, 2),
+    "4-3-3": (4, 3, 3),
+    "4-4-2": (4, 4, 2),
+    "4-5-1": (4, 5, 1),
+    "5-3-2": (5, 3, 2),
+    "5-4-1": (5, 4, 1),
+}
+PANCHINA = 7  # bench size
+MAX_SOSTITUZIONI = 3  # titolari senza voto replaced from the bench
+
+# Partite: fantapunti converted to goals, 1 at GOL_SOGLIA and one more every
+# GOL_FASCIA points above it; 3 points for a win, 1 for a draw
+GOL_SOGLIA = 66
+GOL_FASCIA = 6
+
+# Season simulator: places that count as "top" and the relegated ones
+SIM_TOP = 4
+SIM_RETROCESSE = 3
@@ -1,9 +1,83 @@
-from sqlalchemy import create_engine
+import os
+
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, declarative_base
 
-DATABASE_URL = "sqlite:///fantamanager.db"
+# The database lives next to the code unless FANTAMANAGER_DB points elsewhere,
+# so starting the app from another directory doesn't create an empty league
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fantamanager.db")
+DB_PATH = os.path.abspath(os.environ.get("FANTAMANAGER_DB", DEFAULT_DB_PATH))
+
+DATABASE_URL = f"sqlite:///{DB_PATH}"
+
+# PRAGMAs applied to every new connection, selected with FANTAMANAGER_DB_PROFILE.
+# "fast": WAL lets readers run while a writer commits; synchronous=NORMAL is
+# durable across app crashes in WAL mode (only a power loss can drop the
+# last commits). "safe" keeps SQLite's defaults. Both create new files with
+# incremental auto_vacuum (it must come before journal_mode; on an existing
+# file it changes nothing until migrate() converts it once).
+ENGINE_PROFILES = {
+    "fast": {
+        "auto_vacuum": "INCREMENTAL",
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -64 * 1024,  # negative = KiB, i.e. 64 MB
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,  # ms to wait for the write lock
+    },
+    "safe": {
+        "auto_vacuum": "INCREMENTAL",
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+        "busy_timeout": 5000,
+    },
+}
+DB_PROFILE = os.environ.get("FANTAMANAGER_DB_PROFILE", "fast")
+
+# Reader connections
+READ_POOL_SIZE = 4
+
+# Writer connections: one per thread that writes (the two DbWorker lanes and
+# the sync link), so a checkout never waits in the pool. SQLite still runs
+# one write at a time; a writer waits for the lock up to busy_timeout
+WRITE_POOL_SIZE = 3
+
+
+def make_engine(url=DATABASE_URL, profile=DB_PROFILE, readonly=False, pool_size=1,
+                busy_timeout=None):
+    """SQLite engine whose pooled connections all get the profile PRAGMAs
+
+    `busy_timeout` overrides the profile's (0 = fail at once with "database
+    is locked"); it is applied first, so it covers the other PRAGMAs too.
+    """
+    pragmas = dict(ENGINE_PROFILES[profile])
+    if busy_timeout is not None:
+        pragmas.pop("busy_timeout", None)
+        pragmas = {"busy_timeout": busy_timeout, **pragmas}
+    if readonly:
+        pragmas["query_only"] = "ON"
+
+    engine = create_engine(url, echo=False, pool_size=pool_size, max_overflow=0)
+
+    @event.listens_for(engine, "connect")
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    return engine
+
+
+# Writes (and schema changes) go through `engine`, reads through `read_engine`
+# so a long read never holds the connection a commit is waiting for
+engine = make_engine(pool_size=WRITE_POOL_SIZE)
+read_engine = make_engine(readonly=True, pool_size=READ_POOL_SIZE)
 
-engine = create_engine(DATABASE_URL, echo=False)
-SessionLocal = sessionmaker(bind=engine)
+# Sessions are short-lived units of work (see Repository). Objects they return
+# are read after the session is closed, so commits must not expire them
+SessionLocal = sessionmaker(bind=engine, expire_on_commit=False)
+ReadSessionLocal = sessionmaker(bind=read_engine, expire_on_commit=False)
 
 Base = declarative_base()
@@ -0,0 +1,114 @@
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Qt, Signal
+
+
+class _TaskSignals(QObject):
+    finished = Signal(object)
+    failed = Signal(object)
+    progress = Signal(object)
+
+
+class DbTask(QRunnable):
+    """A repository call executed on the database thread"""
+    
+    def __init__(self, fn, args, kwargs):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = _TaskSignals()
+        self.cancelled = False
+        self.pool = None  # set by DbWorker when the task is started
+    
+    def cancel(self):
+        # Results of a cancelled task are never delivered
+        self.cancelled = True
+    
+    def run(self):
+        if self.cancelled:
+            return
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as exc:
+            self.signals.failed.emit(exc)
+            return
+        self.signals.finished.emit(result)
+
+
+class DbWorker(QObject):
+    """Runs repository operations off the GUI thread.
+    
+    Interactive tasks share one dedicated thread, so they run in submission
+    order and a query always sees the writes queued before it. Long jobs
+    (imports) use `background=True` and run on a second thread, so browsing
+    doesn't wait behind them (WAL lets both lanes use the database at once).
+    Results come back on the GUI thread through queued signals.
+    """
+    
+    failed = Signal(str)  # Signal with the error message of a failed task
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = self._single_thread_pool()
+        self.background_pool = self._single_thread_pool()
+        self._tasks = set()
+    
+    def _single_thread_pool(self):
+        pool = QThreadPool(self)
+        pool.setMaxThreadCount(1)
+        pool.setExpiryTimeout(-1)  # keep the same thread alive
+        return pool
+    
+    def submit(self, fn, *args, on_result=None, on_error=None,
+               background=False, **kwargs):
+        task = DbTask(fn, args, kwargs)
+        return self._start(task, on_result, on_error, background)
+    
+    def submit_with_progress(self, fn, *args, on_progress,
+                             on_result=None, on_error=None,
+                             background=False, **kwargs):
+        """Like submit(), passing fn a `progress` callback safe to call off-thread"""
+        task = DbTask(fn, args, kwargs)
+        task.kwargs["progress"] = task.signals.progress.emit
+        task.signals.progress.connect(
+            lambda value: None if task.cancelled else on_progress(value),
+            Qt.ConnectionType.QueuedConnection
+        )
+        return self._start(task, on_result, on_error, background)
+    
+    def _start(self, task, on_result, on_error, background):
+        def finished(result):
+            self._tasks.discard(task)
+            if not task.cancelled and on_result is not None:
+                on_result(result)
+        
+        def failed(exc):
+            self._tasks.discard(task)
+            if task.cancelled:
+                return
+            if on_error is not None:
+                on_error(exc)
+            self.failed.emit(str(exc))
+        
+        task.signals.finished.connect(finished, Qt.ConnectionType.QueuedConnection)
+        task.signals.failed.connect(failed, Qt.ConnectionType.QueuedConnection)
+        self._tasks.add(task)
+        task.pool = self.background_pool if background else self.pool
+        task.pool.start(task)
+        return task
+    
+    def cancel(self, task):
+        """Cancel a task: drop it if still queued, ignore its result otherwise"""
+        if task is None:
+            return
+        task.cancel()
+        if task.pool.tryTake(task):
+            self._tasks.discard(task)
+    
+    def is_idle(self):
+        """True once every submitted task has run and delivered its result"""
+        return not self._tasks
+    
+    def wait_idle(self, msecs=-1):
+        done = self.pool.waitForDone(msecs)
+        return self.background_pool.waitForDone(msecs) and done
@@ -0,0 +1,248 @@
+from bisect import bisect_left
+
+from PySide6.QtCore import (
+    QAbstractTableModel,
+    Qt,
+    QModelIndex,
+    Signal
+)
+
+from constants import PAGE_SIZE, PATCH_MAX_ROWS
+
+
+class DeletedItemsModel(QAbstractTableModel):
+    
+    selection_changed = Signal(int)  # Signal with the number of checked rows
+    loading_changed = Signal(bool)  # Signal when a query starts/finishes
+    
+    def __init__(self, repository, fields, headers, worker):
+        super().__init__()
+        self.repo = repository
+        self.worker = worker
+        self.fields = fields
+        self.headers = [""] + headers  # checkbox column
+        self.rows = []
+        self.checked_ids = set()
+        self._has_more = False
+        self._cursor = None
+        self._query_task = None  # refresh/fetchMore query in flight
+        self._select_all_task = None
+
+    # ---------- BASIC ----------
+
+    def refresh(self):
+        # A newer refresh supersedes whatever query is still running
+        self.worker.cancel(self._query_task)
+        self.worker.cancel(self._select_all_task)
+        self._start_query(
+            self.repo.page, None, PAGE_SIZE,
+            deleted=True, on_result=self._on_refreshed
+        )
+
+    def _on_refreshed(self, rows):
+        self.beginResetModel()
+        self.rows = rows
+        self._has_more = len(self.rows) == PAGE_SIZE
+        self._cursor = self.rows[-1][0] if self.rows else None
+        self.checked_ids = set()
+        self.endResetModel()
+        self.selection_changed.emit(0)
+
+    def is_loading(self):
+        return self._query_task is not None
+
+    def _start_query(self, fn, *args, on_result, **kwargs):
+        def done(result):
+            self._query_task = None
+            self.loading_changed.emit(False)
+            on_result(result)
+
+        def failed(exc):
+            self._query_task = None
+            self.loading_changed.emit(False)
+
+        self._query_task = self.worker.submit(
+            fn, *args, on_result=done, on_error=failed, **kwargs
+        )
+        self.loading_changed.emit(True)
+
+    def rowCount(self, parent=QModelIndex()):
+        return len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(self.fields) + 1  # checkbox
+
+    # ---------- LAZY LOADING ----------
+
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._query_task is not None:
+            return False
+        return self._has_more
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        self._start_query(
+            self.repo.page, self._cursor, PAGE_SIZE,
+            deleted=True, on_result=self._on_page
+        )
+
+    def _on_page(self, page):
+        self._has_more = len(page) == PAGE_SIZE
+        if not page:
+            return
+        self._cursor = page[-1][0]
+        first = len(self.rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(page) - 1)
+        self.rows.extend(page)
+        self.endInsertRows()
+
+    # ---------- EXTERNAL CHANGES ----------
+
+    def apply_db_changes(self, changes):
+        """Patch the rows of ids changed by any connection ({id: op}).
+
+        Rows that left the deleted set are dropped (and unchecked), newly
+        deleted ones are inserted in id order if they fall in the loaded
+        range; the other checkboxes stay as they are.
+        """
+        # Queued after any page query in flight, so it patches its result
+        self.worker.submit(
+            self.repo.get_many, list(changes), deleted=True,
+            on_result=lambda rows: self._on_changed(changes, rows)
+        )
+
+    def _on_changed(self, changes, rows):
+        fresh = {r[0]: r for r in rows}
+        for i in range(len(self.rows) - 1, -1, -1):
+            obj_id = self.rows[i][0]
+            if obj_id not in changes:
+                continue
+            row = fresh.pop(obj_id, None)
+            if row is not None:
+                self.rows[i] = row
+                self.dataChanged.emit(self.index(i, 1), self.index(i, len(self.fields)))
+                continue
+            # Restored or hard deleted
+            self.beginRemoveRows(QModelIndex(), i, i)
+            del self.rows[i]
+            self.endRemoveRows()
+        gone = set(changes).difference(r[0] for r in rows)
+        checked = len(self.checked_ids)
+        self.checked_ids -= gone
+
+        # Rows past the loaded range come with their page; with nothing left
+        # to page, at most a page of them is added (the rest gets paged)
+        new_rows = sorted(fresh.values())
+        if self._has_more:
+            new_rows = [r for r in new_rows if r[0] < self._cursor]
+        else:
+            last = self.rows[-1][0] if self.rows else None
+            inside = [r for r in new_rows if last is not None and r[0] < last]
+            beyond = new_rows[len(inside):]
+            if len(beyond) > PAGE_SIZE:
+                beyond = beyond[:PAGE_SIZE]
+                self._has_more = True
+            if beyond:
+                self._cursor = beyond[-1][0]
+            new_rows = inside + beyond
+        if len(new_rows) > PATCH_MAX_ROWS:
+            # Checkboxes are kept by id, a reset only loses the scroll position
+            self.beginResetModel()
+            self.rows = sorted(self.rows + new_rows)
+            self.endResetModel()
+            new_rows = []
+        ids = [r[0] for r in self.rows]
+        for row in new_rows:
+            position = bisect_left(ids, row[0])
+            self.beginInsertRows(QModelIndex(), position, position)
+            self.rows.insert(position, row)
+            ids.insert(position, row[0])
+            self.endInsertRows()
+
+        if len(self.checked_ids) != checked:
+            self.selection_changed.emit(len(self.checked_ids))
+
+    # ---------- DATA ----------
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+
+        values = self.rows[index.row()]  # (id, *fields)
+        col = index.column()
+
+        # Checkbox column
+        if col == 0:
+            if role == Qt.ItemDataRole.CheckStateRole:
+                if values[0] in self.checked_ids:
+                    return Qt.CheckState.Checked
+                return Qt.CheckState.Unchecked
+            return None
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            value = values[col]
+            return str(value) if value else ""
+
+        return None
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if role != Qt.ItemDataRole.CheckStateRole or index.column() != 0:
+            return False
+
+        obj_id = self.rows[index.row()][0]
+        if Qt.CheckState(value) == Qt.CheckState.Checked:
+            self.checked_ids.add(obj_id)
+        else:
+            self.checked_ids.discard(obj_id)
+
+        self.dataChanged.emit(index, index, [Qt.ItemDataRole.CheckStateRole])
+        self.selection_changed.emit(len(self.checked_ids))
+        return True
+
+    # ---------- FLAGS ----------
+
+    def flags(self, index):
+        if index.column() == 0:
+            return Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsUserCheckable
+        return Qt.ItemFlag.ItemIsEnabled
+
+    # ---------- HEADER ----------
+
+    def headerData(self, section, orientation, role):
+        if (
+            role == Qt.ItemDataRole.DisplayRole
+            and orientation == Qt.Orientation.Horizontal
+        ):
+            return self.headers[section]
+        return None
+
+    # ---------- SELECTION ----------
+
+    def selected_count(self):
+        return len(self.checked_ids)
+
+    def selected_ids(self):
+        return list(self.checked_ids)
+
+    def set_all_checked(self, checked):
+        """Check or uncheck every deleted row, including rows not loaded yet"""
+        self.worker.cancel(self._select_all_task)
+        self._select_all_task = None
+        if checked:
+            self._select_all_task = self.worker.submit(
+                self.repo.all_ids, deleted=True, on_result=self._set_checked_ids
+            )
+        else:
+            self._set_checked_ids([])
+
+    def _set_checked_ids(self, ids):
+        self._select_all_task = None
+        self.checked_ids = set(ids)
+        if self.rows:
+            self.dataChanged.emit(
+                self.index(0, 0),
+                self.index(len(self.rows) - 1, 0),
+                [Qt.ItemDataRole.CheckStateRole]
+            )
+        self.selection_changed.emit(len(self.checked_ids))
@@ -1,21 +1,28 @@
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, 
-    QPushButton, QTableWidget, QTableWidgetItem,
+    QPushButton, QTableView,
     QHeaderView, QCheckBox, QLabel
 )
-from PySide6.QtCore import Qt, Signal
+from PySide6.QtCore import Signal
+
+from deleted_items_model import DeletedItemsModel
 
 
 class DeletedItemsWidget(QWidget):
     
-    items_restored = Signal()  # Signal when items are restored
+    items_restored = Signal(list)  # Signal with the ids of restored items
     
-    def __init__(self, repository, fields, headers):
+    def __init__(self, repository, fields, headers, worker):
         super().__init__()
         self.repo = repository
+        self.worker = worker
         self.fields = fields
         self.headers = headers
         
+        self.model = DeletedItemsModel(repository, fields, headers, worker)
+        self.model.selection_changed.connect(self.update_buttons_visibility)
+        self.model.loading_changed.connect(self.update_loading_label)
+        
         self.setup_ui()
         
     def setup_ui(self):
@@ -49,19 +56,27 @@ class DeletedItemsWidget(QWidget):
         
         self.buttons_layout.addStretch()
         
+        # Loading indicator (visible while a query runs)
+        self.loading_label = QLabel("Caricamento…")
+        self.loading_label.setStyleSheet("color: gray;")
+        self.loading_label.setVisible(self.model.is_loading())
+        self.buttons_layout.addWidget(self.loading_label)
+        
         # Create container widget for buttons
         self.buttons_widget = QWidget()
         self.buttons_widget.setLayout(self.buttons_layout)
         layout.addWidget(self.buttons_widget)
         
-        # Table
-        self.table = QTableWidget()
-        self.table.setColumnCount(len(self.fields) + 1)  # +1 for checkbox
-        self.table.setHorizontalHeaderLabels([""] + self.headers)
+        # Table (rows and checkboxes are painted by the model, loaded lazily)
+        self.table = QTableView()
+        self.table.setModel(self.model)
         self.table.horizontalHeader().setStretchLastSection(True)
         self.table.verticalHeader().setVisible(False)
-        self.table.setSelectionMode(QTableWidget.SelectionMode.NoSelection)
-        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.table.setSelectionMode(QTableView.SelectionMode.NoSelection)
+        self.table.setEditTriggers(QTableView.EditTrigger.NoEditTriggers)
+        
+        # Resize first column to fit checkbox
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.ResizeToContents)
         
         layout.addWidget(self.table)
         
@@ -69,55 +84,34 @@ class DeletedItemsWidget(QWidget):
         self.refresh()
     
     def refresh(self):
-        deleted_items = self.repo.all_deleted()
-        self.table.setRowCount(len(deleted_items))
-        
-        self.checkboxes = []
-        
-        for row, obj in enumerate(deleted_items):
-            # Checkbox
-            checkbox = QCheckBox()
-            checkbox.stateChanged.connect(self.update_buttons_visibility)
-            self.checkboxes.append((checkbox, obj))
-            self.table.setCellWidget(row, 0, checkbox)
-            
-            # Data fields
-            for col, field in enumerate(self.fields):
-                value = getattr(obj, field)
-                item = QTableWidgetItem(str(value) if value else "")
-                item.setFlags(item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-                self.table.setItem(row, col + 1, item)
-        
-        # Resize first column to fit checkbox
-        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.ResizeToContents)
-        
-        self.update_buttons_visibility()
+        self.model.refresh()
         self.select_all_cb.setChecked(False)
     
-    def update_buttons_visibility(self):
-        has_selection = any(cb.isChecked() for cb, _ in self.checkboxes)
+    def apply_db_changes(self, changes):
+        """Patch rows deleted, restored or purged elsewhere ({id: op}, see ChangeWatcher)"""
+        self.model.apply_db_changes(changes)
+    
+    def update_loading_label(self, loading):
+        self.loading_label.setVisible(loading)
+    
+    def update_buttons_visibility(self, selected_count):
+        has_selection = selected_count > 0
         self.restore_btn.setVisible(has_selection)
         self.delete_btn.setVisible(has_selection)
     
-    def get_selected_objects(self):
-        return [obj for cb, obj in self.checkboxes if cb.isChecked()]
+    def get_selected_ids(self):
+        return self.model.selected_ids()
     
     def select_deselect_all(self):
-        for cb, _ in self.checkboxes:
-            if self.select_all_cb.isChecked():
-                cb.setChecked(True)
-            else:
-                cb.setChecked(False)
+        self.model.set_all_checked(self.select_all_cb.isChecked())
     
     def restore_selected(self):
-        selected = self.get_selected_objects()
-        for obj in selected:
-            self.repo.restore(obj)
+        ids = self.get_selected_ids()
+        # The worker runs tasks in order, so the queries below see the restore
+        self.worker.submit(self.repo.restore_many, ids)
         self.refresh()
-        self.items_restored.emit()  # Emit signal to refresh main table
+        self.items_restored.emit(ids)  # Emit signal to add rows to main table
     
     def hard_delete_selected(self):
-        selected = self.get_selected_objects()
-        for obj in selected:
-            self.repo.hard_delete(obj)
+        self.worker.submit(self.repo.hard_delete_many, self.get_selected_ids())
         self.refresh()
\ No newline at end of file
@@ -0,0 +1,77 @@
+from PySide6.QtWidgets import (
+    QDockWidget, QWidget, QVBoxLayout, QHBoxLayout,
+    QTableWidget, QTableWidgetItem, QPushButton, QHeaderView
+)
+from PySide6.QtCore import Qt, QTimer
+
+import instrumentation
+
+
+class DiagnosticsDock(QDockWidget):
+    """Live p50/p99 per instrumented operation (hidden until toggled)"""
+    
+    COLUMNS = ["Operazione", "Chiamate", "Media ms", "p50 ms", "p99 ms", "Max ms"]
+    
+    def __init__(self, parent=None):
+        super().__init__("Diagnostica", parent)
+        self.setObjectName("diagnostics_dock")
+        self.setup_ui()
+        
+        # Poll the registry only while the dock is visible
+        self.timer = QTimer(self)
+        self.timer.setInterval(1000)
+        self.timer.timeout.connect(self.refresh)
+        self.visibilityChanged.connect(self.on_visibility_changed)
+        
+        self.hide()
+    
+    def setup_ui(self):
+        container = QWidget()
+        layout = QVBoxLayout()
+        
+        buttons_layout = QHBoxLayout()
+        reset_btn = QPushButton("Azzera")
+        reset_btn.clicked.connect(self.reset)
+        buttons_layout.addWidget(reset_btn)
+        buttons_layout.addStretch()
+        layout.addLayout(buttons_layout)
+        
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        layout.addWidget(self.table)
+        
+        container.setLayout(layout)
+        self.setWidget(container)
+    
+    def on_visibility_changed(self, visible):
+        if visible:
+            self.refresh()
+            self.timer.start()
+        else:
+            self.timer.stop()
+    
+    def refresh(self):
+        snapshot = instrumentation.registry.snapshot()
+        self.table.setRowCount(len(snapshot))
+        for row, name in enumerate(sorted(snapshot)):
+            stats = snapshot[name]
+            values = [
+                name,
+                str(stats["count"]),
+                f"{stats['mean_ms']:.3f}",
+                f"{stats['p50_ms']:.3f}",
+                f"{stats['p99_ms']:.3f}",
+                f"{stats['max_ms']:.3f}",
+            ]
+            for col, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if col > 0:
+                    item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+                self.table.setItem(row, col, item)
+    
+    def reset(self):
+        instrumentation.registry.reset()
+        self.refresh()
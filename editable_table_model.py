@@ -6,36 +6,278 @@ from PySide6.QtCore import (
 )
 from PySide6.QtGui import QColor, QFont
 
+from constants import PAGE_SIZE, PATCH_MAX_ROWS
+from importer import coerce_value
+
 
 class EditableTableModel(QAbstractTableModel):
     
     has_pending_changes = Signal(bool)  # Signal when pending changes state changes
+    loading_changed = Signal(bool)  # Signal when a query starts/finishes
     
-    def __init__(self, repository, fields, headers):
+    def __init__(self, repository, fields, headers, worker, extra_columns=None):
         super().__init__()
         self.repo = repository
+        self.worker = worker
         self.fields = fields
-        self.headers = headers + [""]  # ➕/🗑️/✓ column
+        # Read-only computed columns after the fields: (headers, source) where
+        # source(ids) -> {id: values} runs on the worker once per loaded page
+        self.extra_headers, self.extra_source = extra_columns or ([], None)
+        self.extra_values = {}  # {obj_id: tuple aligned with extra_headers}
+        self.action_column = len(fields) + len(self.extra_headers)
+        self.headers = headers + self.extra_headers + [""]  # ➕/🗑️/✓ column
         self.new_row = {f: "" for f in self.fields}
-        self.edited_cells = {}  # {row: {field: value}}
-        self.original_values = {}  # {row: {field: original_value}}
+        self.edited_cells = {}  # {obj_id: {field: value}}
+        self.original_values = {}  # {obj_id: {field: original_value}}
+        self.rows = []  # (id, *fields) tuples from Repository.page
+        self._has_more = False
+        self._cursor = None  # (sort value, id) of the last paged row
+        self._local_ids = set()  # rows inserted locally, skipped when paging
+        self._query_task = None  # refresh/fetchMore query in flight
+        self.order_by = None  # field sorted by in the database, None = id
+        self.descending = False
+        self.filters = []  # [(field, op, value)] pushed down to Repository.page
         self.refresh()
 
     # ---------- BASIC ----------
 
-    def refresh(self):
+    def refresh(self, keep_edits=False):
+        self._reload(keep_edits)
+
+    def _reload(self, keep_edits):
+        # A newer refresh supersedes whatever query is still running
+        self.worker.cancel(self._query_task)
+        # Only the first page is loaded, the view pulls the rest via fetchMore()
+        self._start_query(
+            self._load_page, None, PAGE_SIZE, **self._page_options(),
+            on_result=lambda page: self._on_refreshed(page, keep_edits)
+        )
+
+    def _load_page(self, *args, **kwargs):
+        # Runs on the worker: the page plus its computed columns
+        return self._with_extra(self.repo.page(*args, **kwargs))
+
+    def _load_extra(self, ids):
+        if self.extra_source is None or not ids:
+            return {}
+        return self.extra_source(ids)
+
+    def _page_options(self):
+        return {
+            "order_by": self.order_by,
+            "descending": self.descending,
+            "filters": self.filters,
+        }
+
+    def _cursor_of(self, row):
+        if self.order_by is None:
+            return None, row[0]
+        return row[self.fields.index(self.order_by) + 1], row[0]
+
+    def _on_refreshed(self, page, keep_edits=False):
+        rows, extra = page
         self.beginResetModel()
-        self.rows = self.repo.all()
-        self.edited_cells = {}
-        self.original_values = {}
+        self.rows = rows
+        self.extra_values = extra
+        self._has_more = len(self.rows) == PAGE_SIZE
+        self._cursor = self._cursor_of(self.rows[-1]) if self.rows else None
+        self._local_ids = set()
+        if not keep_edits:
+            self.edited_cells = {}
+            self.original_values = {}
         self.endResetModel()
-        self.has_pending_changes.emit(False)
+        self.has_pending_changes.emit(bool(self.edited_cells))
+
+    # ---------- SORT / FILTER ----------
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        # Sorting happens in SQL; the action column (or -1) means id order
+        if 0 <= column < len(self.fields):
+            order_by = self.fields[column]
+        else:
+            order_by = None
+        descending = order == Qt.SortOrder.DescendingOrder
+        if (order_by, descending) == (self.order_by, self.descending):
+            return
+        self.order_by = order_by
+        self.descending = descending
+        self._reload(keep_edits=True)
+
+    def set_filters(self, filters):
+        filters = list(filters)
+        if filters == self.filters:
+            return
+        self.filters = filters
+        self._reload(keep_edits=True)
+
+    def is_loading(self):
+        return self._query_task is not None
+
+    def _start_query(self, fn, *args, on_result, **kwargs):
+        def done(result):
+            self._query_task = None
+            self.loading_changed.emit(False)
+            on_result(result)
+
+        def failed(exc):
+            self._query_task = None
+            self.loading_changed.emit(False)
+
+        self._query_task = self.worker.submit(
+            fn, *args, on_result=done, on_error=failed, **kwargs
+        )
+        self.loading_changed.emit(True)
 
     def rowCount(self, parent=QModelIndex()):
         return len(self.rows) + 1  # creation row
 
+    # ---------- LAZY LOADING ----------
+
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._query_task is not None:
+            return False
+        return self._has_more
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        self._start_query(
+            self._load_page, self._cursor[1], PAGE_SIZE,
+            after_value=self._cursor[0], **self._page_options(),
+            on_result=self._on_page
+        )
+
+    def _on_page(self, result):
+        page, extra = result
+        self.extra_values.update(extra)
+        self._has_more = len(page) == PAGE_SIZE
+        if page:
+            self._cursor = self._cursor_of(page[-1])
+        if self._local_ids:
+            page = [r for r in page if r[0] not in self._local_ids]
+        if not page:
+            return
+        first = len(self.rows) + 1  # +1 for creation row
+        self.beginInsertRows(QModelIndex(), first, first + len(page) - 1)
+        self.rows.extend(page)
+        self.endInsertRows()
+
+    def _insert_rows(self, rows):
+        """Insert rows right below the creation row"""
+        if rows and self.rows:
+            # A row can arrive twice (restored here and seen by the watcher)
+            shown = {r[0] for r in self.rows}
+            rows = [r for r in rows if r[0] not in shown]
+        if not rows:
+            return
+        self.beginInsertRows(QModelIndex(), 1, len(rows))
+        self.rows[0:0] = rows
+        self.endInsertRows()
+        self._local_ids.update(r[0] for r in rows)
+
+    def add_rows(self, ids, on_inserted=None):
+        """Show rows that were restored or created outside the model.
+
+        Only live rows matching the filters are shown; as in
+        apply_db_changes(), too many rows mean a reload instead.
+        """
+        if len(ids) > PAGE_SIZE:
+            self.refresh(keep_edits=True)
+            return
+
+        def done(result):
+            self._insert_loaded(result)
+            if on_inserted is not None:
+                on_inserted()
+
+        self.worker.submit(self._load_rows, list(ids), list(self.filters), on_result=done)
+
+    def _load_rows(self, ids, filters):
+        return self._with_extra(self.repo.get_many(ids, deleted=False, filters=filters))
+
+    def _with_extra(self, rows):
+        return rows, self._load_extra([r[0] for r in rows])
+
+    def _insert_loaded(self, result):
+        rows, extra = result
+        self.extra_values.update(extra)
+        self._insert_rows(rows)
+
+    def refresh_extra(self, ids):
+        """Reload the computed columns of some rows (e.g. after a commit)"""
+        if self.extra_source is None or not ids:
+            return
+        self.worker.submit(self._load_extra, list(ids), on_result=self._on_extra)
+
+    def _on_extra(self, extra):
+        self.extra_values.update(extra)
+        self._emit_rows_changed(1, len(self.rows))
+
+    # ---------- EXTERNAL CHANGES ----------
+
+    def apply_db_changes(self, changes):
+        """Patch rows changed in the database by any connection.
+
+        `changes` is {id: op} from ChangeWatcher: loaded rows are reloaded or
+        dropped, rows that became visible (I) are shown on top.
+        """
+        appeared = sum(op == "I" for op in changes.values())
+        if len(changes) > PATCH_MAX_ROWS or appeared > PAGE_SIZE:
+            # Cheaper to reload, and new rows come back paged in sort order
+            self.refresh(keep_edits=True)
+            return
+        self.worker.submit(
+            self._load_changed, list(changes), list(self.filters),
+            on_result=lambda result: self._on_changed(changes, result)
+        )
+
+    def _load_changed(self, ids, filters):
+        return self._with_extra(self.repo.get_many(ids, deleted=False, filters=filters))
+
+    def _on_changed(self, changes, result):
+        rows, extra = result
+        self.extra_values.update(extra)
+        fresh = {r[0]: r for r in rows}
+        dropped_edits = False
+        for i in range(len(self.rows) - 1, -1, -1):
+            obj_id = self.rows[i][0]
+            if obj_id not in changes:
+                continue
+            row = fresh.pop(obj_id, None)
+            if row is not None:
+                self.rows[i] = row
+                self._emit_rows_changed(i + 1, i + 1)
+                continue
+            # Deleted, or no longer matching the filters
+            self.beginRemoveRows(QModelIndex(), i + 1, i + 1)
+            del self.rows[i]
+            self.endRemoveRows()
+            self._local_ids.discard(obj_id)
+            if self.edited_cells.pop(obj_id, None) is not None:
+                del self.original_values[obj_id]
+                dropped_edits = True
+        # Updated rows not loaded yet come with their page
+        self._insert_rows([row for obj_id, row in fresh.items() if changes[obj_id] == "I"])
+        if dropped_edits:
+            self.has_pending_changes.emit(bool(self.edited_cells))
+
+    def row_id(self, row):
+        return self.rows[row - 1][0]
+
+    def find_row(self, obj_id):
+        """Row of a loaded id, None if it isn't loaded"""
+        for i, values in enumerate(self.rows):
+            if values[0] == obj_id:
+                return i + 1
+        return None
+
+    def row_has_edits(self, row):
+        if row <= 0 or row > len(self.rows):
+            return False
+        return bool(self.edited_cells.get(self.row_id(row)))
+
     def columnCount(self, parent=QModelIndex()):
-        return len(self.fields) + 1  # ➕/🗑️/✓
+        return self.action_column + 1  # ➕/🗑️/✓
 
     # ---------- DATA ----------
 
@@ -49,7 +291,7 @@ class EditableTableModel(QAbstractTableModel):
         # ─── CREATION ROW (row 0) ─────────────────────────
         if row == 0:
             # ➕ button (last column)
-            if col == len(self.fields):
+            if col == self.action_column:
                 if role == Qt.ItemDataRole.DisplayRole and self._can_create():
                     return "➕" 
 
@@ -67,6 +309,10 @@ class EditableTableModel(QAbstractTableModel):
 
                 return None
 
+            # computed columns: nothing to show before the row exists
+            if col >= len(self.fields):
+                return None
+
             field = self.fields[col]
             value = self.new_row[field]
 
@@ -88,12 +334,14 @@ class EditableTableModel(QAbstractTableModel):
             return None
 
         # ─── NORMAL ROWS ─────────────────────────────────
-        obj = self.rows[row - 1]
+        values = self.rows[row - 1]
+
+        edits = self.edited_cells.get(values[0])
 
         # Last column: 🗑️ button or 🗑️✓❌ buttons
-        if col == len(self.fields):
+        if col == self.action_column:
             # Check if this row has pending changes
-            has_edits = row in self.edited_cells and len(self.edited_cells[row]) > 0
+            has_edits = bool(edits)
             
             if role == Qt.ItemDataRole.DisplayRole:
                 if has_edits:
@@ -114,14 +362,14 @@ class EditableTableModel(QAbstractTableModel):
             field = self.fields[col]
             
             # Get value (edited or original)
-            if row in self.edited_cells and field in self.edited_cells[row]:
-                value = self.edited_cells[row][field]
+            if edits and field in edits:
+                value = edits[field]
             else:
-                value = getattr(obj, field)
+                value = values[col + 1]
             
             # Background color for edited cells
             if role == Qt.ItemDataRole.BackgroundRole:
-                if row in self.edited_cells and field in self.edited_cells[row]:
+                if edits and field in edits:
                     return QColor(200, 255, 200)  # Light green
             
             if role in (
@@ -130,6 +378,11 @@ class EditableTableModel(QAbstractTableModel):
             ):
                 return value
 
+        # Computed read-only columns
+        elif role == Qt.ItemDataRole.DisplayRole:
+            extra = self.extra_values.get(values[0])
+            return None if extra is None else extra[col - len(self.fields)]
+
         return None
 
     # ---------- EDIT ----------
@@ -137,60 +390,83 @@ class EditableTableModel(QAbstractTableModel):
     def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
         if role != Qt.ItemDataRole.EditRole:
             return False
+        return self.set_many([(index.row(), index.column(), value)]) > 0
+
+    def set_many(self, cells):
+        """Record edits of many [(row, col, value)] cells in one pass.
+
+        Emits a single dataChanged over the touched range and a single
+        has_pending_changes; the edits are saved together on confirm.
+        Returns the number of cells accepted.
+        """
+        touched = [(row, col) for row, col, value in cells if self._track_edit(row, col, value)]
+        if not touched:
+            return 0
+        rows = [row for row, _ in touched]
+        # The action column shows ➕ / 🗑️ ✓ ❌ depending on the edits
+        self.dataChanged.emit(
+            self.index(min(rows), min(col for _, col in touched)),
+            self.index(max(rows), self.action_column)
+        )
+        if max(rows) > 0:
+            self.has_pending_changes.emit(bool(self.edited_cells))
+        return len(touched)
 
-        row = index.row()
-        col = index.column()
+    def _track_edit(self, row, col, value):
+        # Action and computed columns are not editable
+        if not 0 <= col < len(self.fields) or not 0 <= row <= len(self.rows):
+            return False
 
         # CREATION ROW
-        if row == 0 and col < len(self.fields):
-            self.new_row[self.fields[col]] = value
-            self.dataChanged.emit(index, index)
-            plus_index = self.index(0, len(self.fields))
-            self.dataChanged.emit(plus_index, plus_index)
+        if row == 0:
+            self.new_row[self.fields[col]] = "" if value is None else value
             return True
 
         # NORMAL ROW - Track changes
-        obj = self.rows[row - 1]
+        key = self.row_id(row)
         field = self.fields[col]
-        original_value = getattr(obj, field)
+        original_value = self.rows[row - 1][col + 1]
         
         # Only track if value actually changed
         if str(value) != str(original_value):
             # Initialize tracking for this row
-            if row not in self.edited_cells:
-                self.edited_cells[row] = {}
-                self.original_values[row] = {}
+            if key not in self.edited_cells:
+                self.edited_cells[key] = {}
+                self.original_values[key] = {}
             
             # Store original value if not already stored
-            if field not in self.original_values[row]:
-                self.original_values[row][field] = original_value
+            if field not in self.original_values[key]:
+                self.original_values[key][field] = original_value
             
             # Store edited value
-            self.edited_cells[row][field] = value
-            
-            # Emit signal that we have pending changes
-            self.has_pending_changes.emit(True)
+            self.edited_cells[key][field] = value
         else:
             # Value changed back to original, remove from tracking
-            if row in self.edited_cells and field in self.edited_cells[row]:
-                del self.edited_cells[row][field]
-                del self.original_values[row][field]
+            if key in self.edited_cells and field in self.edited_cells[key]:
+                del self.edited_cells[key][field]
+                del self.original_values[key][field]
                 
                 # Clean up empty dicts
-                if not self.edited_cells[row]:
-                    del self.edited_cells[row]
-                    del self.original_values[row]
-                
-                # Check if we still have pending changes
-                self.has_pending_changes.emit(bool(self.edited_cells))
-        
-        self.dataChanged.emit(index, index)
-        # Update the action column
-        action_index = self.index(row, len(self.fields))
-        self.dataChanged.emit(action_index, action_index)
+                if not self.edited_cells[key]:
+                    del self.edited_cells[key]
+                    del self.original_values[key]
         
         return True
 
+    def parse_value(self, col, text):
+        """Convert pasted text to the type of the column's field.
+
+        Raises ValueError when the text does not fit the column.
+        """
+        column = self.repo.model.__table__.c[self.fields[col]]
+        try:
+            value = coerce_value(text, column.type.python_type)
+        except (TypeError, ValueError):
+            raise ValueError(f"valore non valido per {self.fields[col]}: {text!r}")
+        if value is None and not column.nullable:
+            raise ValueError(f"{self.fields[col]} mancante")
+        return value
+
     # ---------- FLAGS ----------
 
     def flags(self, index):
@@ -199,8 +475,8 @@ class EditableTableModel(QAbstractTableModel):
 
         # CREATION ROW
         if row == 0:
-            # ➕ column (last column)
-            if col == len(self.fields):
+            # ➕ column (last column) and computed columns
+            if col >= len(self.fields):
                 return (
                     Qt.ItemFlag.ItemIsSelectable
                     | Qt.ItemFlag.ItemIsEnabled
@@ -214,8 +490,8 @@ class EditableTableModel(QAbstractTableModel):
             )
 
         # NORMAL ROWS
-        # 🗑️/✓ column (last column)
-        if col == len(self.fields):
+        # 🗑️/✓ column (last column) and computed columns
+        if len(self.fields) <= col <= self.action_column:
             return (
                 Qt.ItemFlag.ItemIsSelectable
                 | Qt.ItemFlag.ItemIsEnabled
@@ -248,17 +524,29 @@ class EditableTableModel(QAbstractTableModel):
     def create_from_row(self):
         if not self._can_create():
             return
-        self.repo.create(self.new_row)
+        data = self.new_row
         self.new_row = {f: "" for f in self.fields}
-        self.refresh()
+        creation_index = self.index(0, 0)
+        self.dataChanged.emit(creation_index, self.index(0, self.action_column))
+        self.worker.submit(
+            lambda: self._with_extra([self.repo.to_row(self.repo.create(data))]),
+            on_result=self._insert_loaded
+        )
     
     # ---------- DELETE ----------
     
     def soft_delete_row(self, row):
         if row > 0 and row <= len(self.rows):
-            obj = self.rows[row - 1]
-            self.repo.soft_delete(obj)
-            self.refresh()
+            obj_id = self.row_id(row)
+            self.worker.submit(self.repo.soft_delete_many, [obj_id])
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self.rows[row - 1]
+            self.endRemoveRows()
+            self._local_ids.discard(obj_id)
+            if obj_id in self.edited_cells:
+                del self.edited_cells[obj_id]
+                del self.original_values[obj_id]
+                self.has_pending_changes.emit(bool(self.edited_cells))
     
     # ---------- UPDATE MANAGEMENT ----------
     
@@ -267,62 +555,86 @@ class EditableTableModel(QAbstractTableModel):
     
     def commit_all_changes(self):
         """Commit all pending changes to database"""
-        for row, changes in self.edited_cells.items():
-            obj = self.rows[row - 1]
-            for field, value in changes.items():
-                setattr(obj, field, value)
-        
-        if self.edited_cells:
-            self.repo.session.commit()
-        
-        self.edited_cells = {}
-        self.original_values = {}
+        if not self.edited_cells:
+            return
         
-        # Refresh to update display
-        self.beginResetModel()
-        self.endResetModel()
-        self.has_pending_changes.emit(False)
+        # One transaction for every edited row
+        self._commit_changes(
+            {obj_id: dict(edits) for obj_id, edits in self.edited_cells.items()}
+        )
     
     def cancel_all_changes(self):
         """Cancel all pending changes"""
+        if not self.edited_cells:
+            return
+        
         self.edited_cells = {}
         self.original_values = {}
         
-        # Refresh to update display
-        self.beginResetModel()
-        self.endResetModel()
+        self._emit_rows_changed(1, len(self.rows))
         self.has_pending_changes.emit(False)
     
     def commit_row_changes(self, row):
         """Commit changes for a specific row"""
-        if row in self.edited_cells:
-            obj = self.rows[row - 1]
-            for field, value in self.edited_cells[row].items():
-                setattr(obj, field, value)
-            
-            self.repo.session.commit()
-            
-            del self.edited_cells[row]
-            del self.original_values[row]
-            
-            # Update the entire row
-            for col in range(self.columnCount()):
-                index = self.index(row, col)
-                self.dataChanged.emit(index, index)
-            
-            # Check if we still have pending changes
+        if self.row_has_edits(row):
+            obj_id = self.row_id(row)
+            self._commit_changes({obj_id: dict(self.edited_cells[obj_id])})
+    
+    def _commit_changes(self, changes):
+        # Edits stay highlighted until the worker confirms the write
+        def done(_):
+            self._apply_committed(changes)
+            self._forget_committed(changes)
+            # Repaint in place, keeping selection and scroll position
+            # (rows may have moved while the commit was running)
+            self._emit_rows_changed(1, len(self.rows))
             self.has_pending_changes.emit(bool(self.edited_cells))
+            self.refresh_extra(list(changes))
+        
+        self.worker.submit(self.repo.update_many, changes, on_result=done)
+    
+    def _apply_committed(self, changes):
+        # Rows are immutable tuples: swap in the saved values
+        positions = {f: i + 1 for i, f in enumerate(self.fields)}
+        for i, values in enumerate(self.rows):
+            saved = changes.get(values[0])
+            if saved:
+                values = list(values)
+                for field, value in saved.items():
+                    values[positions[field]] = value
+                self.rows[i] = tuple(values)
+    
+    def _forget_committed(self, changes):
+        for obj_id, values in changes.items():
+            edits = self.edited_cells.get(obj_id)
+            if not edits:
+                continue
+            for field, value in values.items():
+                # Skip cells edited again while the commit was running
+                if field in edits and edits[field] == value:
+                    del edits[field]
+                    del self.original_values[obj_id][field]
+            if not edits:
+                del self.edited_cells[obj_id]
+                del self.original_values[obj_id]
     
     def cancel_row_changes(self, row):
         """Cancel changes for a specific row"""
-        if row in self.edited_cells:
-            del self.edited_cells[row]
-            del self.original_values[row]
+        if self.row_has_edits(row):
+            obj_id = self.row_id(row)
+            del self.edited_cells[obj_id]
+            del self.original_values[obj_id]
             
             # Update the entire row
-            for col in range(self.columnCount()):
-                index = self.index(row, col)
-                self.dataChanged.emit(index, index)
+            self._emit_rows_changed(row, row)
             
             # Check if we still have pending changes
-            self.has_pending_changes.emit(bool(self.edited_cells))
\ No newline at end of file
+            self.has_pending_changes.emit(bool(self.edited_cells))
+    
+    def _emit_rows_changed(self, first, last):
+        if first > last:
+            return
+        self.dataChanged.emit(
+            self.index(first, 0),
+            self.index(last, self.columnCount() - 1)
+        )
\ No newline at end of file
@@ -1,7 +1,9 @@
+import csv
+import io
 from typing import cast
-from PySide6.QtWidgets import QTableView, QAbstractItemDelegate, QMessageBox
+from PySide6.QtWidgets import QApplication, QTableView, QAbstractItemDelegate, QMessageBox
 from PySide6.QtCore import Qt, QTimer, Signal, QPoint
-from PySide6.QtGui import QCursor
+from PySide6.QtGui import QCursor, QKeySequence
 
 from editable_table_model import EditableTableModel
 
@@ -22,6 +24,23 @@ class EditableTableView(QTableView):
             Qt.Key.Key_Down
         )
 
+        # ===============================
+        # CLIPBOARD / FILL DOWN
+        # ===============================
+        if self.state() != QTableView.State.EditingState:
+            if event.matches(QKeySequence.StandardKey.Copy):
+                self.copy_selection()
+                return
+            if event.matches(QKeySequence.StandardKey.Paste):
+                self.paste()
+                return
+            if (
+                key == Qt.Key.Key_D
+                and event.modifiers() == Qt.KeyboardModifier.ControlModifier
+            ):
+                self.fill_down()
+                return
+
         # ===============================
         # ENTER
         # ===============================
@@ -69,7 +88,7 @@ class EditableTableView(QTableView):
                 # Normal rows: 🗑️ or 🗑️✓❌ buttons
                 if row > 0:
                     # Check if row has pending changes
-                    has_edits = row in model.edited_cells and len(model.edited_cells[row]) > 0
+                    has_edits = model.row_has_edits(row)
                     
                     if has_edits:
                         # Show a simple menu to choose between delete, confirm, and cancel
@@ -106,6 +125,128 @@ class EditableTableView(QTableView):
             model.soft_delete_row(row)
             self.item_deleted.emit()
 
+    # =====================================
+    # CLIPBOARD
+    # =====================================
+    def _selected_cells(self):
+        """{(row, col)} selected, without the ➕/🗑️ column"""
+        model = cast(EditableTableModel, self.model())
+        return {
+            (index.row(), index.column())
+            for index in self.selectedIndexes()
+            if index.column() != model.action_column
+        }
+
+    def copy_selection(self):
+        """Copy the selected range as TSV, ready for a spreadsheet"""
+        cells = self._selected_cells()
+        if not cells:
+            return
+        model = self.model()
+        rows = sorted({row for row, _ in cells if row > 0})
+        cols = sorted({col for _, col in cells})
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, dialect="excel-tab", lineterminator="\n")
+        for row in rows:
+            values = (
+                model.data(model.index(row, col)) if (row, col) in cells else None
+                for col in cols
+            )
+            writer.writerow(["" if v is None else v for v in values])
+        QApplication.clipboard().setText(buffer.getvalue())
+
+    def paste(self):
+        """Paste TSV from the clipboard as one batch of pending edits.
+
+        A rectangle starts at the top-left selected cell; a single value
+        fills every selected cell. Nothing is saved until confirmed.
+        """
+        text = QApplication.clipboard().text()
+        cells = self._selected_cells()
+        if not text or not cells:
+            return
+        model = cast(EditableTableModel, self.model())
+        grid = list(csv.reader(io.StringIO(text), dialect="excel-tab"))
+        if grid and not grid[-1]:
+            grid.pop()  # the line break after the last row
+        if not grid:
+            return
+        # A blank line inside the range is a row of one empty cell
+        grid = [row or [""] for row in grid]
+
+        if len(grid) == 1 and len(grid[0]) == 1:
+            targets = [(row, col, grid[0][0]) for row, col in sorted(cells)]
+        else:
+            top = min(row for row, _ in cells)
+            left = min(col for _, col in cells)
+            targets = [
+                (top + i, left + j, value)
+                for i, values in enumerate(grid)
+                for j, value in enumerate(values)
+            ]
+
+        edits, errors = [], []
+        for row, col, value in targets:
+            if row >= model.rowCount() or col >= len(model.fields):
+                continue  # outside the table or on a computed column
+            try:
+                edits.append((row, col, model.parse_value(col, value)))
+            except ValueError as e:
+                errors.append(f"riga {row + 1}: {e}")  # as numbered by the header
+        model.set_many(edits)
+
+        if errors:
+            QMessageBox.warning(
+                self, "Incolla",
+                f"{len(errors)} celle non incollate:\n" + "\n".join(errors[:10])
+            )
+
+    def fill_down(self):
+        """Copy the top selected cell of each column into the cells below it.
+
+        With a single row selected the value comes from the row above.
+        """
+        model = cast(EditableTableModel, self.model())
+        columns = {}
+        for row, col in self._selected_cells():
+            if col < len(model.fields):
+                columns.setdefault(col, []).append(row)
+
+        edits = []
+        for col, rows in columns.items():
+            rows.sort()
+            if len(rows) == 1:
+                source, rows = rows[0] - 1, rows
+            else:
+                source, rows = rows[0], rows[1:]
+            if source < 1:
+                continue  # the creation row holds no value to copy
+            value = model.data(model.index(source, col), Qt.ItemDataRole.EditRole)
+            edits.extend((row, col, value) for row in rows)
+        model.set_many(edits)
+
+    # =====================================
+    # JUMP TO ROW
+    # =====================================
+    def reveal(self, obj_id):
+        """Select the row of obj_id, loading it on top if not paged in yet"""
+        model = cast(EditableTableModel, self.model())
+        row = model.find_row(obj_id)
+        if row is None:
+            model.add_rows(
+                [obj_id], on_inserted=lambda: self._select_row(model.find_row(obj_id))
+            )
+            return
+        self._select_row(row)
+
+    def _select_row(self, row):
+        if row is None:
+            return
+        index = self.model().index(row, 0)
+        self.setCurrentIndex(index)
+        self.scrollTo(index, QTableView.ScrollHint.PositionAtCenter)
+        self.setFocus()
+
     # =====================================
     # ENTER LOGIC
     # =====================================
@@ -127,7 +268,7 @@ class EditableTableView(QTableView):
             
             # Normal rows: handle 🗑️ or 🗑️✓❌
             if row > 0:
-                has_edits = row in model.edited_cells and len(model.edited_cells[row]) > 0
+                has_edits = model.row_has_edits(row)
                 
                 if has_edits:
                     # Show menu
@@ -0,0 +1,92 @@
+from PySide6.QtWidgets import (
+    QWidget, QHBoxLayout, QLabel,
+    QLineEdit, QSpinBox, QPushButton
+)
+from PySide6.QtCore import QTimer, Signal
+
+
+class FilterBar(QWidget):
+    """Giocatori filters (ruolo, squadra, prezzo, nome), applied in SQL"""
+
+    filters_changed = Signal(list)  # [(field, op, value)] for Repository.page
+
+    NO_LIMIT = -1  # spin box value meaning "no bound"
+
+    def __init__(self):
+        super().__init__()
+
+        # Wait for the user to stop typing before querying
+        self.debounce = QTimer(self)
+        self.debounce.setSingleShot(True)
+        self.debounce.setInterval(250)
+        self.debounce.timeout.connect(self.emit_filters)
+
+        self.setup_ui()
+
+    def setup_ui(self):
+        layout = QHBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        self.nome_edit = QLineEdit()
+        self.nome_edit.setPlaceholderText("Nome inizia con…")
+        layout.addWidget(self.nome_edit)
+
+        self.ruolo_edit = QLineEdit()
+        self.ruolo_edit.setPlaceholderText("Ruolo")
+        self.ruolo_edit.setMaximumWidth(80)
+        layout.addWidget(self.ruolo_edit)
+
+        self.squadra_edit = QLineEdit()
+        self.squadra_edit.setPlaceholderText("Squadra")
+        layout.addWidget(self.squadra_edit)
+
+        layout.addWidget(QLabel("Prezzo"))
+        self.prezzo_min = self._price_box("min")
+        layout.addWidget(self.prezzo_min)
+        layout.addWidget(QLabel("–"))
+        self.prezzo_max = self._price_box("max")
+        layout.addWidget(self.prezzo_max)
+
+        clear_btn = QPushButton("Azzera filtri")
+        clear_btn.clicked.connect(self.clear)
+        layout.addWidget(clear_btn)
+
+        for edit in (self.nome_edit, self.ruolo_edit, self.squadra_edit):
+            edit.textChanged.connect(self.debounce.start)
+        for box in (self.prezzo_min, self.prezzo_max):
+            box.valueChanged.connect(self.debounce.start)
+
+        self.setLayout(layout)
+
+    def _price_box(self, placeholder):
+        box = QSpinBox()
+        box.setRange(self.NO_LIMIT, 9999)
+        box.setSpecialValueText(placeholder)
+        box.setValue(self.NO_LIMIT)
+        return box
+
+    def filters(self):
+        filters = []
+        nome = self.nome_edit.text().strip()
+        if nome:
+            filters.append(("nome", "prefix", nome))
+        ruolo = self.ruolo_edit.text().strip()
+        if ruolo:
+            filters.append(("ruolo", "eq", ruolo))
+        squadra = self.squadra_edit.text().strip()
+        if squadra:
+            filters.append(("squadra", "eq", squadra))
+        if self.prezzo_min.value() != self.NO_LIMIT:
+            filters.append(("prezzo", "min", self.prezzo_min.value()))
+        if self.prezzo_max.value() != self.NO_LIMIT:
+            filters.append(("prezzo", "max", self.prezzo_max.value()))
+        return filters
+
+    def emit_filters(self):
+        self.filters_changed.emit(self.filters())
+
+    def clear(self):
+        for edit in (self.nome_edit, self.ruolo_edit, self.squadra_edit):
+            edit.clear()
+        for box in (self.prezzo_min, self.prezzo_max):
+            box.setValue(self.NO_LIMIT)
@@ -0,0 +1,166 @@
+import csv
+import os
+
+from constants import (
+    GIOCATORI_FIELDS,
+    GIOCATORI_HEADERS,
+    GIOCATORI_KEY,
+    IMPORT_CHUNK_SIZE,
+)
+
+
+class ImportResult:
+    """Counters and per-line errors of an import run"""
+
+    def __init__(self):
+        self.inserted = 0
+        self.updated = 0
+        self.errors = []  # [(line number, message)]
+
+    @property
+    def processed(self):
+        return self.inserted + self.updated
+
+
+# ---------- READERS ----------
+
+def _iter_csv(path):
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        sample = f.read(4096)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+        except csv.Error:
+            dialect = csv.excel
+        yield from csv.reader(f, dialect)
+
+
+def _iter_xlsx(path):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportError("Per importare file .xlsx serve il pacchetto openpyxl")
+
+    # read_only streams rows instead of loading the whole sheet
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def iter_records(path, fields, headers):
+    """Stream (line number, {field: raw value}) from a CSV or XLSX file.
+
+    The first row is the header; columns are matched on field names or
+    table headers, case-insensitively. Unknown columns are ignored.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    rows = _iter_xlsx(path) if ext in (".xlsx", ".xlsm") else _iter_csv(path)
+
+    names = {}
+    for field, header in zip(fields, headers):
+        names[field.lower()] = field
+        names[header.lower()] = field
+
+    header_row = next(rows, None)
+    if header_row is None:
+        return
+    columns = [
+        (i, names[str(cell).strip().lower()])
+        for i, cell in enumerate(header_row)
+        if cell is not None and str(cell).strip().lower() in names
+    ]
+
+    for line_no, row in enumerate(rows, start=2):
+        if not row or all(v is None or str(v).strip() == "" for v in row):
+            continue
+        yield line_no, {
+            field: row[i] if i < len(row) else None
+            for i, field in columns
+        }
+
+
+# ---------- VALIDATION ----------
+
+def coerce_value(value, python_type):
+    """Raw cell value as `python_type` (blank = None), ValueError if invalid"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.strip()
+        if value == "":
+            return None
+    if python_type is int:
+        if isinstance(value, str):
+            value = value.replace(",", ".")
+        number = float(value)
+        if not number.is_integer():
+            raise ValueError(f"{value!r} non è un numero intero")
+        return int(number)
+    return python_type(value)
+
+
+def coerce_record(record, model, key_fields):
+    """Convert raw values to the column types of `model`"""
+    result = {}
+    for field, value in record.items():
+        column = model.__table__.c[field]
+        try:
+            value = coerce_value(value, column.type.python_type)
+        except (TypeError, ValueError):
+            raise ValueError(f"valore non valido per {field}: {value!r}")
+        if value is None and (field in key_fields or not column.nullable):
+            raise ValueError(f"{field} mancante")
+        result[field] = value
+    return result
+
+
+# ---------- IMPORT ----------
+
+def import_records(repo, path, fields, headers, key_fields,
+                   progress=None, chunk_size=IMPORT_CHUNK_SIZE):
+    """Stream `path` into `repo`, upserting by `key_fields` one chunk at a time.
+
+    `progress` is called with the number of processed lines after each chunk.
+    """
+    result = ImportResult()
+    chunk = []
+    line_count = 0
+
+    def flush():
+        inserted, updated = repo.upsert_many(chunk, key_fields)
+        result.inserted += inserted
+        result.updated += updated
+        chunk.clear()
+        if progress is not None:
+            progress(line_count)
+
+    checked_columns = False
+    for line_no, record in iter_records(path, fields, headers):
+        if not checked_columns:
+            missing = [f for f in key_fields if f not in record]
+            if missing:
+                raise ValueError(f"Colonne mancanti nel file: {', '.join(missing)}")
+            checked_columns = True
+
+        line_count += 1
+        try:
+            chunk.append(coerce_record(record, repo.model, key_fields))
+        except ValueError as exc:
+            result.errors.append((line_no, str(exc)))
+            continue
+        if len(chunk) >= chunk_size:
+            flush()
+
+    if chunk:
+        flush()
+    return result
+
+
+def import_players(repo, path, progress=None, chunk_size=IMPORT_CHUNK_SIZE):
+    """Import the listone (nome, squadra, ruolo, prezzo) from CSV or XLSX"""
+    return import_records(
+        repo, path, GIOCATORI_FIELDS, GIOCATORI_HEADERS, GIOCATORI_KEY,
+        progress=progress, chunk_size=chunk_size
+    )
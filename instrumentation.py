@@ -0,0 +1,178 @@
+"""Opt-in hot-path instrumentation.
+
+Set FANTAMANAGER_INSTRUMENT=1 to record:
+
+- query counts and latency of every SQL statement (cursor execute events)
+- call counts and latency of EditableTableModel.data/setData/refresh
+- latency of every public Repository method
+
+Set FANTAMANAGER_STATS_FILE=<path> as well to dump the stats as JSON on exit.
+When instrumentation is off nothing is patched, so there is no overhead.
+"""
+import atexit
+import bisect
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import event
+
+
+ENV_ENABLE = "FANTAMANAGER_INSTRUMENT"
+ENV_STATS_FILE = "FANTAMANAGER_STATS_FILE"
+
+# Upper bounds (ms) of the latency histogram buckets, the last one is open
+BUCKETS_MS = [0.01, 0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000]
+# Samples kept per operation for percentiles
+SAMPLE_WINDOW = 10000
+
+
+class LatencyStats:
+    """Count, histogram and a window of recent samples for one operation"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.samples = deque(maxlen=SAMPLE_WINDOW)
+
+    def add(self, ms):
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+        self.buckets[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.samples.append(ms)
+
+    def percentile(self, p):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_ms": self.total_ms / self.count if self.count else 0.0,
+            "p50_ms": self.percentile(50),
+            "p99_ms": self.percentile(99),
+            "max_ms": self.max_ms,
+            "histogram": {
+                f"<={bound}ms": n for bound, n in zip(BUCKETS_MS, self.buckets)
+            } | {f">{BUCKETS_MS[-1]}ms": self.buckets[-1]},
+        }
+
+
+class StatsRegistry:
+    """Thread-safe {operation name: LatencyStats}"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, name, ms):
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = LatencyStats()
+            stats.add(ms)
+
+    def snapshot(self):
+        with self._lock:
+            return {name: stats.summary() for name, stats in self._stats.items()}
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+registry = StatsRegistry()
+_installed = False
+
+
+def is_enabled():
+    return _installed
+
+
+def enabled_from_env():
+    return os.environ.get(ENV_ENABLE, "").lower() in ("1", "true", "yes", "on")
+
+
+# ---------- SQL ----------
+
+def _statement_kind(statement):
+    return statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "?"
+
+
+def instrument_engine(engine):
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_instr_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start = conn.info["_instr_start"].pop()
+        ms = (time.perf_counter() - start) * 1000
+        registry.record("sql", ms)
+        registry.record(f"sql.{_statement_kind(statement)}", ms)
+
+
+# ---------- PYTHON CALLS ----------
+
+def _timed(name, fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            registry.record(name, (time.perf_counter() - start) * 1000)
+    wrapper.__wrapped_for_stats__ = fn
+    return wrapper
+
+
+def instrument_methods(cls, names, prefix):
+    for name in names:
+        fn = cls.__dict__.get(name)
+        if fn is None or hasattr(fn, "__wrapped_for_stats__"):
+            continue
+        setattr(cls, name, _timed(f"{prefix}.{name}", fn))
+
+
+def _public_methods(cls):
+    return [
+        name for name, value in vars(cls).items()
+        if callable(value) and not name.startswith("_")
+    ]
+
+
+# ---------- SETUP ----------
+
+def install():
+    """Patch the hot paths; safe to call more than once"""
+    global _installed
+    if _installed:
+        return
+    from database import engine, read_engine
+    from editable_table_model import EditableTableModel
+    from repository import Repository
+
+    instrument_engine(engine)
+    instrument_engine(read_engine)
+    instrument_methods(EditableTableModel, ["data", "setData", "refresh"], "model")
+    instrument_methods(Repository, _public_methods(Repository), "repo")
+    _installed = True
+
+    path = os.environ.get(ENV_STATS_FILE)
+    if path:
+        atexit.register(dump, path)
+
+
+def dump(path):
+    with open(path, "w") as f:
+        json.dump(dict(sorted(registry.snapshot().items())), f, indent=2)
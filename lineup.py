@@ -0,0 +1,269 @@
+"""Best formation per fantasquadra and giornata.
+
+For every team and giornata the optimizer picks the legal formation
+(MODULI) and titolari with the highest projected fantavoti, then orders
+the bench and scores the lineup on the actual fantavoti with the bench
+substitution rule (a titolare senza voto is replaced by the first bench
+player of the same ruolo who has one, at most MAX_SOSTITUZIONI times).
+
+The choice is exact: players of each ruolo are ranked once per giornata,
+and a DP over the ruolo slots (P, then D, C, A) combines the best k of
+each ruolo into the best complete module, instead of trying player
+permutations; all giornate of a team are solved in the same array pass.
+A season is optimized team by team across a ProcessPoolExecutor.
+"""
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from constants import MAX_SOSTITUZIONI, MODULI, PANCHINA
+
+
+RUOLI = ["P", "D", "C", "A"]
+
+# Below this many teams, starting the (spawned) pool costs more than it
+# saves: a team's season takes ~2 ms, starting the workers ~0.5-1 s
+PARALLEL_MIN_TEAMS = 200
+
+
+class Lineup:
+    """Formation of one team in one giornata (ids of giocatori)"""
+
+    def __init__(self, modulo, titolari, panchina, projected, total):
+        self.modulo = modulo
+        self.titolari = titolari
+        self.panchina = panchina
+        self.projected = projected  # sum of the titolari's projections
+        self.total = total  # actual points after substitutions
+
+    def __repr__(self):
+        return f"Lineup({self.modulo}, projected={self.projected:.1f}, total={self.total:.1f})"
+
+
+# ---------- FORMATION ----------
+
+def _slots(modules):
+    """Modules as role slot counts (P, D, C, A)"""
+    return {name: (1, *counts) for name, counts in modules.items()}
+
+
+def best_formations(ruoli, projected, modules=MODULI):
+    """Best module and titolari for every row (giornata) of `projected`.
+
+    `ruoli` are role codes (index into RUOLI), `projected` a (giornate,
+    players) array of scores (NaN counts as 0). Returns a list with
+    (modulo, titolari indices, projected sum) per giornata, or None when
+    the rosa can't field any module.
+    """
+    scores = np.nan_to_num(np.atleast_2d(projected))
+    rows = np.arange(scores.shape[0])[:, None]
+    # Per ruolo, for every giornata at once: players best first and the
+    # table best[r][:, k] = total of the best k
+    ranked = []
+    best = []
+    for code in range(len(RUOLI)):
+        members = np.flatnonzero(ruoli == code)
+        order = np.argsort(-scores[:, members], axis=1, kind="stable")
+        ranked.append(members[order])
+        sorted_scores = scores[rows, members[order]]
+        best.append(np.concatenate(
+            (np.zeros((scores.shape[0], 1)), np.cumsum(sorted_scores, axis=1)), axis=1
+        ))
+
+    # DP over role slots: states are slot counts chosen so far (a prefix of
+    # some module), valued by the best total for that prefix per giornata
+    slots = _slots(modules)
+    states = {(): np.zeros(scores.shape[0])}
+    for r in range(len(RUOLI)):
+        next_states = {}
+        for counts in slots.values():
+            key = counts[:r + 1]
+            if key in next_states or counts[:r] not in states:
+                continue
+            if counts[r] >= best[r].shape[1]:  # not enough players in this ruolo
+                continue
+            next_states[key] = states[counts[:r]] + best[r][:, counts[r]]
+        states = next_states
+
+    if not states:
+        return [None] * scores.shape[0]
+    names = {counts: name for name, counts in slots.items()}
+    finals = list(states)
+    choice = np.argmax(np.stack([states[c] for c in finals], axis=1), axis=1)
+    results = []
+    for g, c in enumerate(choice):
+        counts = finals[c]
+        titolari = np.concatenate([ranked[r][g, :k] for r, k in enumerate(counts)])
+        results.append((names[counts], titolari, float(states[counts][g])))
+    return results
+
+
+def order_bench(ruoli, projected, titolari, size=PANCHINA):
+    """Best remaining players by projection, at most `size`"""
+    scores = np.nan_to_num(projected)
+    rest = np.setdiff1d(np.arange(len(ruoli)), titolari)
+    return rest[np.argsort(-scores[rest], kind="stable")][:size]
+
+
+def substitute(ruoli, actual, titolari, panchina, max_subs=MAX_SOSTITUZIONI):
+    """Actual points of a lineup after bench substitutions (NaN = senza voto)"""
+    total = 0.0
+    used = set()
+    subs = 0
+    for player in titolari:
+        if not np.isnan(actual[player]):
+            total += actual[player]
+            continue
+        if subs >= max_subs:
+            continue
+        for reserve in panchina:
+            if reserve in used or ruoli[reserve] != ruoli[player] or np.isnan(actual[reserve]):
+                continue
+            used.add(reserve)
+            subs += 1
+            total += actual[reserve]
+            break
+    return total
+
+
+# ---------- SEASON ----------
+
+def optimize_team(ruoli, projected, actual, modules=MODULI, bench_size=PANCHINA):
+    """Lineups of one team for every giornata (rows of projected/actual).
+
+    Returns [(modulo, titolari, panchina, projected, total) or None] with
+    player indices; runs in the worker processes.
+    """
+    results = []
+    for g, choice in enumerate(best_formations(ruoli, projected, modules)):
+        if choice is None:
+            results.append(None)
+            continue
+        name, titolari, value = choice
+        panchina = order_bench(ruoli, projected[g], titolari, bench_size)
+        total = substitute(ruoli, actual[g], titolari, panchina)
+        results.append((name, titolari, panchina, value, total))
+    return results
+
+
+def _optimize_team_task(args):
+    return optimize_team(*args)
+
+
+def project(actual, mode="media"):
+    """Projected fantavoti per giornata from the actual ones.
+
+    "media": mean of the previous giornate with a voto (NaN before the
+    first); "actual": the actual scores, i.e. the best lineup in hindsight.
+    """
+    if mode == "actual":
+        return actual
+    if mode != "media":
+        raise ValueError(f"Unknown projection: {mode}")
+    played = ~np.isnan(actual)
+    sums = np.cumsum(np.where(played, actual, 0.0), axis=0)
+    counts = np.cumsum(played, axis=0)
+    projected = np.full_like(actual, np.nan)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        projected[1:] = sums[:-1] / counts[:-1]
+    return projected
+
+
+def optimize_teams(teams, workers=None, modules=MODULI, bench_size=PANCHINA):
+    """Optimize {team: (ids, ruoli, projected, actual)} across processes.
+
+    Returns ({team: [Lineup or None per giornata]}, seconds spent, workers).
+    `workers=1` runs in this process (no pool); None picks one worker per
+    CPU for large leagues and stays in-process for small ones.
+    """
+    start = time.perf_counter()
+    names = list(teams)
+    jobs = [(teams[t][1], teams[t][2], teams[t][3], modules, bench_size) for t in names]
+    if workers is None:
+        workers = os.cpu_count() if len(jobs) >= PARALLEL_MIN_TEAMS else 1
+    if workers == 1:
+        raw = [_optimize_team_task(job) for job in jobs]
+    else:
+        # spawn: forking a process that runs Qt threads is not safe
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            chunksize = max(1, len(jobs) // (workers * 4))
+            raw = list(pool.map(_optimize_team_task, jobs, chunksize=chunksize))
+
+    lineups = {}
+    for team, results in zip(names, raw):
+        ids = teams[team][0]
+        lineups[team] = [
+            None if r is None else Lineup(r[0], ids[r[1]].tolist(), ids[r[2]].tolist(), r[3], r[4])
+            for r in results
+        ]
+    return lineups, time.perf_counter() - start, workers
+
+
+def load_season(session_factory, weights=None, votes=None):
+    """Rose and fantavoti as {team: (ids, ruoli, actual)} plus the giornate.
+
+    actual is a (giornate, players) array of fantavoti, NaN = senza voto.
+    `votes` reuses pagelle already loaded with scoring.load_votes.
+    """
+    # Imported here: the worker processes only need numpy
+    from models import Giocatore, Rosa
+    from scoring import fantavoti, load_votes, lookup
+
+    if votes is None:
+        votes = load_votes(session_factory)
+    values = fantavoti(votes, weights)
+    giornate = np.unique(votes.giornata)
+
+    with session_factory() as session:
+        rows = session.query(Rosa.fantasquadra_id, Rosa.giocatore_id, Giocatore.ruolo).join(
+            Giocatore, Giocatore.id == Rosa.giocatore_id
+        ).order_by(Rosa.fantasquadra_id, Rosa.giocatore_id).all()
+
+    members = {}
+    for team, player, ruolo in rows:
+        if ruolo in RUOLI:
+            members.setdefault(team, []).append((player, RUOLI.index(ruolo)))
+
+    teams = {}
+    for team, players in members.items():
+        ids = np.array([p for p, _ in players], dtype=np.int64)
+        ruoli = np.array([r for _, r in players], dtype=np.int64)
+        # (giornate, players) grid of fantavoti in one vectorized lookup
+        grid_g = np.repeat(giornate, len(ids))
+        grid_p = np.tile(ids, len(giornate))
+        actual = lookup(votes, values, grid_g, grid_p).reshape(len(giornate), len(ids))
+        teams[team] = (ids, ruoli, actual)
+    return teams, giornate
+
+
+def optimize_season(session_factory, weights=None, projection="media", workers=None):
+    """Best lineup of every fantasquadra in every giornata with votes.
+
+    Returns {"lineups": {team: {giornata: Lineup}}, "timing": {...}}.
+    """
+    start = time.perf_counter()
+    season, giornate = load_season(session_factory, weights)
+    loaded = time.perf_counter()
+    teams = {
+        team: (ids, ruoli, project(actual, projection), actual)
+        for team, (ids, ruoli, actual) in season.items()
+    }
+    lineups, elapsed, workers = optimize_teams(teams, workers)
+    return {
+        "lineups": {
+            team: dict(zip(giornate.tolist(), per_giornata))
+            for team, per_giornata in lineups.items()
+        },
+        "timing": {
+            "teams": len(teams),
+            "giornate": len(giornate),
+            "workers": workers,
+            "load_s": loaded - start,
+            "optimize_s": elapsed,
+            "total_s": time.perf_counter() - start,
+        },
+    }
@@ -1,11 +1,22 @@
+import startup  # first: startup phases are timed from this import
 import sys
 from PySide6.QtWidgets import QApplication
+from PySide6.QtCore import QTimer
 from main_window import MainWindow
+import instrumentation
 
 def main():
+    if instrumentation.enabled_from_env():
+        instrumentation.install()
+    startup.mark("imports")
     app = QApplication(sys.argv)
+    startup.mark("qapplication")
     window = MainWindow()
+    startup.mark("window built")
     window.show()
+    startup.mark("window shown")
+    # First event loop pass paints the (still empty) window
+    QTimer.singleShot(0, lambda: startup.mark("first paint"))
     sys.exit(app.exec())
 
 if __name__ == "__main__":
@@ -1,13 +1,18 @@
-from PySide6.QtWidgets import QMainWindow, QTabWidget, QSplitter
-from PySide6.QtCore import Qt
-from database import SessionLocal, engine
-from models import Giocatore, Fantasquadra
+import os
+
+from PySide6.QtWidgets import (
+    QMainWindow, QTabWidget, QSplitter, QMessageBox, QFileDialog,
+    QWidget, QVBoxLayout, QPushButton, QLabel, QInputDialog
+)
+from PySide6.QtCore import Qt, QTimer
+from database import SessionLocal, ReadSessionLocal, engine, make_engine
+from db_worker import DbWorker
+from migrations import migrate
+from models import Fantasquadra
 from repository import Repository
-from editable_table_model import EditableTableModel
 from constants import *
-from editable_table_view import EditableTableView
-from deleted_items_widget import DeletedItemsWidget
-from table_with_edit_buttons import TableWithEditButtons
+import instrumentation
+import startup
 
 
 class MainWindow(QMainWindow):
@@ -16,67 +21,516 @@ class MainWindow(QMainWindow):
         self.setWindowTitle("Fantamanager – Phase 3")
         self.resize(1000, 600)
 
-        Giocatore.metadata.create_all(engine)
-        Fantasquadra.metadata.create_all(engine)
+        # Every repository call runs on this worker's thread
+        self.worker = DbWorker(self)
+        self.worker.failed.connect(self.show_db_error)
 
-        session = SessionLocal()
+        # Schema check runs first on the worker, every query is queued after it
+        self.worker.submit(migrate, engine, on_result=self._on_schema_ready)
 
-        self.tabs = QTabWidget()
+        # Repositories are cheap (no queries), tab contents are built lazily;
+        # giocatori's (with search) is created on first use, see g_repo
+        self._g_repo = None
+        self.f_repo = Repository(SessionLocal, Fantasquadra, FANTASQUADRE_FIELDS, ReadSessionLocal)
+        self.g_model = None
+        self.f_model = None
 
-        # ========== GIOCATORI TAB ==========
-        g_repo = Repository(session, Giocatore, GIOCATORI_FIELDS)
-        g_model = EditableTableModel(g_repo, GIOCATORI_FIELDS, GIOCATORI_HEADERS)
+        # Views follow commits of other connections (import scripts, other
+        # instances); the first poll is queued after the schema check. Polls
+        # run on the GUI thread, so the watcher never waits for a lock
+        from change_watcher import ChangeWatcher
+        self.watcher = ChangeWatcher(
+            make_engine(readonly=True, busy_timeout=0), ReadSessionLocal, self.worker,
+            parent=self
+        )
+        self.watcher.start()
 
-        g_view = EditableTableView()
-        g_view.setModel(g_model)
+        # Shared league mode: FANTAMANAGER_SYNC=host:port of a sync.py server,
+        # this database becomes a replica kept in sync with it
+        self.sync_link = None
+        self.sync_address = os.environ.get(ENV_SYNC)
 
-        # Wrap view with edit buttons
-        g_table_widget = TableWithEditButtons(g_view)
+        # ========== TABS ==========
+        self.tabs = QTabWidget()
+        self._tab_builders = {}
+        self._add_lazy_tab("Giocatori", self._build_giocatori_tab)
+        self._add_lazy_tab("Fantasquadre", self._build_fantasquadre_tab)
+        self.tabs.currentChanged.connect(self._ensure_tab)
 
-        g_deleted_widget = DeletedItemsWidget(g_repo, GIOCATORI_FIELDS, GIOCATORI_HEADERS)
+        self.setCentralWidget(self.tabs)
         
-        # Connect delete signal to refresh deleted items
-        g_view.item_deleted.connect(g_deleted_widget.refresh)
-        g_view.item_deleted.connect(g_model.refresh)
+        # ========== MENU ==========
+        file_menu = self.menuBar().addMenu("File")
+        import_action = file_menu.addAction("Importa listone…")
+        import_action.triggered.connect(self.import_listone)
+        file_menu.addSeparator()
+        file_menu.addAction("Esporta archivio stagione…").triggered.connect(self.export_archive)
+        file_menu.addAction("Apri archivio stagione…").triggered.connect(self.open_archive)
+        file_menu.addAction("Ripristina archivio stagione…").triggered.connect(self.restore_archive)
+        auction_menu = self.menuBar().addMenu("Asta")
+        auction_menu.addAction("Partecipa all'asta…").triggered.connect(self.join_auction)
         
-        # Connect restore signal to refresh main table
-        g_deleted_widget.items_restored.connect(g_model.refresh)
+        # Diagnostics dock, only when instrumentation is on (FANTAMANAGER_INSTRUMENT)
+        if instrumentation.is_enabled():
+            from diagnostics_dock import DiagnosticsDock
+            self.diagnostics_dock = DiagnosticsDock(self)
+            self.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, self.diagnostics_dock)
+            view_menu = self.menuBar().addMenu("Visualizza")
+            toggle_action = self.diagnostics_dock.toggleViewAction()
+            toggle_action.setShortcut("Ctrl+Shift+D")
+            view_menu.addAction(toggle_action)
 
-        # Create splitter for main table and deleted items
-        g_splitter = QSplitter(Qt.Orientation.Vertical)
-        g_splitter.addWidget(g_table_widget)
-        g_splitter.addWidget(g_deleted_widget)
-        g_splitter.setStretchFactor(0, 3)  # Main table gets more space
-        g_splitter.setStretchFactor(1, 1)  # Deleted items gets less space
+        # Build the visible tab once the window had a chance to paint
+        QTimer.singleShot(0, lambda: self._ensure_tab(self.tabs.currentIndex()))
+    
+    @property
+    def g_repo(self):
+        if self._g_repo is None:
+            from player_search import GiocatoriRepository
+            self._g_repo = GiocatoriRepository(SessionLocal, GIOCATORI_FIELDS, ReadSessionLocal)
+        return self._g_repo
+
+    def _on_schema_ready(self, _):
+        startup.mark("schema ready")
+        if self.sync_address:
+            self._start_sync(self.sync_address)
+        # Retention runs after startup and then periodically, off the UI lane
+        from retention import RETENTION_INTERVAL_MS
+        self.retention_timer = QTimer(self)
+        self.retention_timer.timeout.connect(self.run_retention)
+        self.retention_timer.start(RETENTION_INTERVAL_MS)
+        self.run_retention()
+
+    # ---------- RETENTION ----------
+
+    def run_retention(self):
+        from retention import run_retention
+
+        self.worker.submit(
+            run_retention, [self.g_repo, self.f_repo], engine,
+            on_result=self._on_retention_done,
+            background=True,
+        )
+
+    def _on_retention_done(self, purged):
+        if any(purged.values()):
+            self.statusBar().showMessage(
+                f"Eliminati definitivamente: {purged['giocatori']} giocatori, "
+                f"{purged['fantasquadre']} fantasquadre", 10000
+            )
+
+    # ---------- SHARED LEAGUE ----------
+
+    def _start_sync(self, address):
+        from sync_link import SyncLink
+
+        host, _, port = address.rpartition(":")
+        self.sync_link = SyncLink(SessionLocal, host or "127.0.0.1", int(port), self)
+        for repo in (self.g_repo, self.f_repo):
+            self.sync_link.attach(repo)
+        self.sync_label = QLabel()
+        self.statusBar().addPermanentWidget(self.sync_label)
+        self.sync_link.status_changed.connect(self._on_sync_status)
+        self.sync_link.start()
+
+    def _on_sync_status(self, connected, message):
+        self.sync_label.setText(("🟢 " if connected else "🔴 ") + message)
 
-        # ========== FANTASQUADRE TAB ==========
-        f_repo = Repository(session, Fantasquadra, FANTASQUADRE_FIELDS)
-        f_model = EditableTableModel(f_repo, FANTASQUADRE_FIELDS, FANTASQUADRE_HEADERS)
+    # ---------- LAZY TABS ----------
+    
+    def _add_lazy_tab(self, title, builder):
+        placeholder = QWidget()
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        placeholder.setLayout(layout)
+        index = self.tabs.addTab(placeholder, title)
+        self._tab_builders[index] = builder
+    
+    def _ensure_tab(self, index):
+        """Build a tab's contents the first time it is shown"""
+        builder = self._tab_builders.pop(index, None)
+        if builder is None:
+            return
+        self.tabs.widget(index).layout().addWidget(builder())
+    
+    def _build_table_tab(self, repo, fields, headers, top_widgets=(), extra_columns=None):
+        from editable_table_model import EditableTableModel
+        from editable_table_view import EditableTableView
+        from deleted_items_widget import DeletedItemsWidget
+        from table_with_edit_buttons import TableWithEditButtons
 
-        f_view = EditableTableView()
-        f_view.setModel(f_model)
+        model = EditableTableModel(repo, fields, headers, self.worker, extra_columns)
+
+        view = EditableTableView()
+        view.setModel(model)
+        view.setSortingEnabled(True)  # header clicks sort in SQL
 
         # Wrap view with edit buttons
-        f_table_widget = TableWithEditButtons(f_view)
+        table_widget = TableWithEditButtons(view)
+
+        main = QWidget()
+        main_layout = QVBoxLayout()
+        main_layout.setContentsMargins(0, 0, 0, 0)
+        for widget in top_widgets:
+            main_layout.addWidget(widget)
+        main_layout.addWidget(table_widget)
+        main.setLayout(main_layout)
 
-        f_deleted_widget = DeletedItemsWidget(f_repo, FANTASQUADRE_FIELDS, FANTASQUADRE_HEADERS)
+        deleted_widget = DeletedItemsWidget(repo, fields, headers, self.worker)
         
         # Connect delete signal to refresh deleted items
-        f_view.item_deleted.connect(f_deleted_widget.refresh)
-        f_view.item_deleted.connect(f_model.refresh)
+        # (the model already removed the row itself)
+        view.item_deleted.connect(deleted_widget.refresh)
         
-        # Connect restore signal to refresh main table
-        f_deleted_widget.items_restored.connect(f_model.refresh)
+        # Connect restore signal to put restored rows back in the main table
+        deleted_widget.items_restored.connect(model.add_rows)
+
+        # Rows changed by any connection are patched in place
+        table = repo.model.__tablename__
+
+        def db_changed(changes):
+            if table in changes:
+                model.apply_db_changes(changes[table])
+                deleted_widget.apply_db_changes(changes[table])
+
+        self.watcher.changed.connect(db_changed)
+        self.watcher.reset.connect(lambda: model.refresh(keep_edits=True))
+        self.watcher.reset.connect(deleted_widget.refresh)
 
         # Create splitter for main table and deleted items
-        f_splitter = QSplitter(Qt.Orientation.Vertical)
-        f_splitter.addWidget(f_table_widget)
-        f_splitter.addWidget(f_deleted_widget)
-        f_splitter.setStretchFactor(0, 3)  # Main table gets more space
-        f_splitter.setStretchFactor(1, 1)  # Deleted items gets less space
+        splitter = QSplitter(Qt.Orientation.Vertical)
+        splitter.addWidget(main)
+        splitter.addWidget(deleted_widget)
+        splitter.setStretchFactor(0, 3)  # Main table gets more space
+        splitter.setStretchFactor(1, 1)  # Deleted items gets less space
+        return model, view, splitter
+
+    def _build_giocatori_tab(self):
+        from filter_bar import FilterBar
+        from price_history import TREND_HEADERS, trends
+        from search_bar import SearchBar
+
+        # Instant search and filter bar above the table, filters become a
+        # WHERE clause
+        search_bar = SearchBar(self.g_repo, self.worker)
+        filter_bar = FilterBar()
+        # Price trends from the quotazioni history, loaded with each page
+        self.g_model, view, splitter = self._build_table_tab(
+            self.g_repo, GIOCATORI_FIELDS, GIOCATORI_HEADERS, [search_bar, filter_bar],
+            extra_columns=(TREND_HEADERS, lambda ids: trends(ReadSessionLocal, ids)),
+        )
+
+        def apply_filters():
+            self.g_model.set_filters(filter_bar.filters() + search_bar.filters())
+
+        filter_bar.filters_changed.connect(apply_filters)
+        search_bar.filters_changed.connect(apply_filters)
+        search_bar.player_chosen.connect(view.reveal)
+        self._mark_first_data(self.g_model)
+        return splitter
+
+    def _build_fantasquadre_tab(self):
+        from roster_summary import RosterSummaryWidget
+
+        self.f_model, _, splitter = self._build_table_tab(
+            self.f_repo, FANTASQUADRE_FIELDS, FANTASQUADRE_HEADERS
+        )
+        self._mark_first_data(self.f_model)
+
+        # Live rosa aggregates next to the teams
+        self.roster_summary = RosterSummaryWidget(ReadSessionLocal, self.worker)
+        summary_model = self.roster_summary.model
+        self.f_model.rowsInserted.connect(summary_model.sync_teams)
+        self.f_model.rowsRemoved.connect(summary_model.sync_teams)
+        self.f_model.has_pending_changes.connect(summary_model.sync_teams)
+        self.watcher.changed.connect(summary_model.apply_db_changes)
+        self.watcher.reset.connect(summary_model.refresh)
+
+        # Best formation of every team in every giornata (background lane)
+        self.optimize_button = QPushButton("Calcola formazioni migliori")
+        self.optimize_button.clicked.connect(self.optimize_lineups)
+
+        # Round-robin calendar and Monte Carlo standings (background lane)
+        self.calendar_button = QPushButton("Genera calendario")
+        self.calendar_button.clicked.connect(self.generate_calendar)
+        self.simulate_button = QPushButton("Simula campionato")
+        self.simulate_button.clicked.connect(self.simulate_season)
+
+        side = QWidget()
+        side_layout = QVBoxLayout()
+        side_layout.setContentsMargins(0, 0, 0, 0)
+        side_layout.addWidget(self.roster_summary)
+        side_layout.addWidget(self.optimize_button)
+        side_layout.addWidget(self.calendar_button)
+        side_layout.addWidget(self.simulate_button)
+        side.setLayout(side_layout)
+
+        tab = QSplitter(Qt.Orientation.Horizontal)
+        tab.addWidget(splitter)
+        tab.addWidget(side)
+        tab.setStretchFactor(0, 3)
+        tab.setStretchFactor(1, 2)
+        return tab
+
+    def _mark_first_data(self, model):
+        # Time-to-first-data of the first tab that gets built
+        if any(phase == "first tab data" for phase, _ in startup.phases):
+            return
+
+        def loaded(loading):
+            if loading:
+                return
+            model.loading_changed.disconnect(loaded)
+            startup.mark("first tab data")
+            startup.report()
+
+        model.loading_changed.connect(loaded)
+    
+    # ---------- IMPORT ----------
+    
+    def import_listone(self):
+        from importer import import_players
+
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Importa listone", "", "Listone (*.csv *.xlsx)"
+        )
+        if not path:
+            return
+        self.statusBar().showMessage("Importazione listone…")
+        self.worker.submit_with_progress(
+            import_players, self.g_repo, path,
+            on_progress=self._on_import_progress,
+            on_result=self._on_import_done,
+            on_error=lambda exc: self.statusBar().clearMessage(),
+            background=True,
+        )
+    
+    def _on_import_progress(self, count):
+        self.statusBar().showMessage(f"Importazione listone: {count} righe lette…")
+    
+    def _on_import_done(self, result):
+        self.statusBar().showMessage(
+            f"Listone importato: {result.inserted} nuovi, "
+            f"{result.updated} aggiornati, {len(result.errors)} scartati",
+            10000
+        )
+        # No refresh here: the ChangeWatcher patches the imported rows (or
+        # reloads keeping the unsaved edits when there are too many)
+        if result.errors:
+            lines = [f"Riga {line}: {msg}" for line, msg in result.errors[:20]]
+            if len(result.errors) > 20:
+                lines.append(f"… e altre {len(result.errors) - 20}")
+            QMessageBox.warning(self, "Righe scartate", "\n".join(lines))
+    
+    # ---------- SEASON ARCHIVE ----------
+
+    def export_archive(self):
+        from archive import ARCHIVE_SUFFIX, export_archive
+
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Esporta archivio stagione", "", f"Archivio stagione (*{ARCHIVE_SUFFIX})"
+        )
+        if not path:
+            return
+        if not path.endswith(ARCHIVE_SUFFIX):
+            path += ARCHIVE_SUFFIX
+        self.statusBar().showMessage("Esportazione archivio…")
+        self.worker.submit(
+            export_archive, ReadSessionLocal, path,
+            on_result=lambda counts: self._on_archive_done("Archivio esportato", counts),
+            on_error=lambda exc: self.statusBar().clearMessage(),
+            background=True,
+        )
+
+    def open_archive(self):
+        from archive import ARCHIVE_SUFFIX, ArchiveError
+        from archive_view import ArchiveWindow
+
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Apri archivio stagione", "", f"Archivio stagione (*{ARCHIVE_SUFFIX})"
+        )
+        if not path:
+            return
+        try:
+            window = ArchiveWindow(path, self)
+        except (ArchiveError, OSError, ValueError) as e:
+            QMessageBox.warning(self, "Archivio stagione", str(e))
+            return
+        window.show()
+
+    def restore_archive(self):
+        from archive import ARCHIVE_SUFFIX, import_archive
+
+        if self.sync_link is not None:
+            QMessageBox.warning(
+                self, "Archivio stagione",
+                "Non disponibile in modalità lega condivisa."
+            )
+            return
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Ripristina archivio stagione", "", f"Archivio stagione (*{ARCHIVE_SUFFIX})"
+        )
+        if not path:
+            return
+        answer = QMessageBox.question(
+            self, "Ripristina archivio stagione",
+            "Giocatori, fantasquadre, calendario, rose, voti e formazioni attuali verranno "
+            "sostituiti da quelli dell'archivio. Continuare?"
+        )
+        if answer != QMessageBox.StandardButton.Yes:
+            return
+        self.statusBar().showMessage("Ripristino archivio…")
+        self.worker.submit(
+            import_archive, SessionLocal, path,
+            on_result=lambda counts: self._on_archive_done("Archivio ripristinato", counts),
+            on_error=lambda exc: self.statusBar().clearMessage(),
+            background=True,
+        )
+
+    def _on_archive_done(self, message, counts):
+        self.statusBar().showMessage(
+            f"{message}: {counts['giocatori']} giocatori, "
+            f"{counts['fantasquadre']} fantasquadre", 10000
+        )
+
+    # ---------- LIVE AUCTION ----------
+
+    def join_auction(self):
+        from roster_summary import load_teams
+
+        self.worker.submit(load_teams, ReadSessionLocal, on_result=self._choose_auction_team)
+
+    def _choose_auction_team(self, teams):
+        from auction import DEFAULT_HOST, DEFAULT_PORT
+        from auction_view import AuctionWindow
+
+        address, ok = QInputDialog.getText(
+            self, "Asta", "Indirizzo del server dell'asta (host:porta):",
+            text=f"{DEFAULT_HOST}:{DEFAULT_PORT}"
+        )
+        if not ok or not address.strip():
+            return
+        host, _, port = address.strip().rpartition(":")
+        if not host or not port.isdigit():
+            QMessageBox.warning(self, "Asta", f"Indirizzo non valido: {address}")
+            return
+        names = {team: nome for team, (nome, _) in teams.items()}
+        ids = sorted(names, key=lambda team: names[team].lower())
+        choices = ["Nessuna (banditore)"] + [names[team] for team in ids]
+        choice, ok = QInputDialog.getItem(
+            self, "Asta", "Partecipa come fantasquadra:", choices, 0, False
+        )
+        if not ok:
+            return
+        team = None if choice == choices[0] else ids[choices.index(choice) - 1]
+        AuctionWindow(host, int(port), team, names, self).show()
+
+    # ---------- LINEUP OPTIMIZER ----------
+    
+    def optimize_lineups(self):
+        from lineup import optimize_season
+
+        self.optimize_button.setEnabled(False)
+        self.statusBar().showMessage("Calcolo formazioni migliori…")
+
+        def failed(exc):
+            self.optimize_button.setEnabled(True)
+            self.statusBar().clearMessage()
+
+        self.worker.submit(
+            optimize_season, ReadSessionLocal,
+            on_result=self._on_lineups_optimized, on_error=failed,
+            background=True,
+        )
+    
+    def _on_lineups_optimized(self, result):
+        self.optimize_button.setEnabled(True)
+        timing = result["timing"]
+        self.statusBar().showMessage(
+            f"Formazioni: {timing['teams']} squadre × {timing['giornate']} giornate "
+            f"in {timing['total_s']:.2f} s (lettura {timing['load_s']:.2f} s, "
+            f"calcolo {timing['optimize_s']:.2f} s su {timing['workers']} processi)",
+            15000
+        )
+        if not result["lineups"]:
+            QMessageBox.information(
+                self, "Formazioni migliori", "Nessuna rosa con voti da ottimizzare."
+            )
+            return
+
+        names = self.roster_summary.model.names
+        totals = []
+        for team, per_giornata in result["lineups"].items():
+            lineups = [l for l in per_giornata.values() if l is not None]
+            totals.append((sum(l.total for l in lineups), names.get(team, f"#{team}"), lineups))
+        totals.sort(key=lambda item: -item[0])
+        lines = [
+            f"{nome}: {total:.1f} punti (ultima: {lineups[-1].modulo}, {lineups[-1].total:.1f})"
+            if lineups else f"{nome}: rosa incompleta"
+            for total, nome, lineups in totals
+        ]
+        QMessageBox.information(self, "Formazioni migliori", "\n".join(lines))
+    
+    # ---------- SEASON SIMULATOR ----------
+
+    def generate_calendar(self):
+        from season import generate_calendar
+
+        answer = QMessageBox.question(
+            self, "Genera calendario",
+            "Il calendario attuale (se presente) verrà sostituito da un nuovo "
+            "sorteggio tra le fantasquadre. Continuare?"
+        )
+        if answer != QMessageBox.StandardButton.Yes:
+            return
+        self.worker.submit(
+            generate_calendar, SessionLocal,
+            on_result=lambda giornate: self.statusBar().showMessage(
+                f"Calendario generato: {giornate} giornate", 10000
+            ),
+        )
+
+    def simulate_season(self):
+        from season import simulate_season
+
+        self.simulate_button.setEnabled(False)
+        self.statusBar().showMessage("Simulazione campionato…")
+
+        def failed(exc):
+            self.simulate_button.setEnabled(True)
+            self.statusBar().clearMessage()
+
+        self.worker.submit(
+            simulate_season, ReadSessionLocal,
+            on_result=self._on_season_simulated, on_error=failed,
+            background=True,
+        )
 
-        # ========== ADD TABS ==========
-        self.tabs.addTab(g_splitter, "Giocatori")
-        self.tabs.addTab(f_splitter, "Fantasquadre")
+    def _on_season_simulated(self, result):
+        self.simulate_button.setEnabled(True)
+        timing = result["timing"]
+        self.statusBar().showMessage(
+            f"Simulazione: {timing['simulations']} stagioni × {timing['remaining']} giornate "
+            f"in {timing['total_s']:.2f} s su {timing['workers']} processi",
+            15000
+        )
+        names = self.roster_summary.model.names
+        rows = sorted(result["teams"].items(), key=lambda item: -item[1]["punti"])
+        lines = [
+            f"{names.get(team, f'#{team}')}: {p['punti']:.1f} punti attesi "
+            f"(ora {result['standings'][team][0]}) · scudetto {p['titolo']:.1%} · "
+            f"top {SIM_TOP} {p['top']:.1%} · retrocessione {p['retrocessione']:.1%}"
+            for team, p in rows
+        ]
+        QMessageBox.information(self, "Simulazione campionato", "\n".join(lines))
 
-        self.setCentralWidget(self.tabs)
\ No newline at end of file
+    def show_db_error(self, message):
+        QMessageBox.warning(self, "Errore database", message)
+    
+    def closeEvent(self, event):
+        # Let queued writes reach the database before quitting
+        self.watcher.stop()
+        self.worker.wait_idle()
+        if self.sync_link is not None:
+            self.sync_link.stop()
+        super().closeEvent(event)
\ No newline at end of file
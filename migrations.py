@@ -0,0 +1,424 @@
+"""Versioned schema migrations tracked in SQLite's PRAGMA user_version.
+
+Each migration moves the schema from version N-1 to N and must be
+idempotent (IF NOT EXISTS etc.): SQLite commits DDL statement by
+statement, so a migration interrupted halfway is simply run again.
+Migrations use explicit SQL rather than Base.metadata so that later model
+changes never alter what an old migration does.
+"""
+
+
+def _v1_base_tables(conn):
+    conn.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS giocatori (
+            id INTEGER NOT NULL,
+            nome VARCHAR NOT NULL,
+            squadra VARCHAR,
+            ruolo VARCHAR,
+            prezzo INTEGER,
+            deleted BOOLEAN,
+            PRIMARY KEY (id)
+        )
+    """)
+    conn.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS fantasquadre (
+            id INTEGER NOT NULL,
+            nome VARCHAR NOT NULL,
+            allenatore VARCHAR,
+            crediti INTEGER,
+            deleted BOOLEAN,
+            PRIMARY KEY (id)
+        )
+    """)
+
+
+def _v2_giocatori_indexes(conn):
+    for name, columns in [
+        ("ix_giocatori_deleted", "deleted"),
+        ("ix_giocatori_deleted_prezzo", "deleted, prezzo"),
+        ("ix_giocatori_deleted_ruolo_prezzo", "deleted, ruolo, prezzo"),
+        ("ix_giocatori_deleted_squadra", "deleted, squadra"),
+        ("ix_giocatori_deleted_nome", "deleted, nome"),
+    ]:
+        conn.exec_driver_sql(f"CREATE INDEX IF NOT EXISTS {name} ON giocatori ({columns})")
+
+
+def _v3_rose(conn):
+    conn.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS rose (
+            id INTEGER NOT NULL,
+            fantasquadra_id INTEGER NOT NULL,
+            giocatore_id INTEGER NOT NULL,
+            prezzo INTEGER NOT NULL,
+            PRIMARY KEY (id),
+            FOREIGN KEY(fantasquadra_id) REFERENCES fantasquadre (id),
+            FOREIGN KEY(giocatore_id) REFERENCES giocatori (id),
+            UNIQUE (giocatore_id)
+        )
+    """)
+    conn.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_rose_fantasquadra ON rose (fantasquadra_id)"
+    )
+
+
+def _v4_voti_formazioni(conn):
+    conn.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS voti (
+            id INTEGER NOT NULL,
+            giornata INTEGER NOT NULL,
+            giocatore_id INTEGER NOT NULL,
+            voto FLOAT,
+            gol INTEGER NOT NULL,
+            assist INTEGER NOT NULL,
+            ammonizioni INTEGER NOT NULL,
+            espulsioni INTEGER NOT NULL,
+            rigori_parati INTEGER NOT NULL,
+            rigori_sbagliati INTEGER NOT NULL,
+            autogol INTEGER NOT NULL,
+            gol_subiti INTEGER NOT NULL,
+            clean_sheet BOOLEAN NOT NULL,
+            PRIMARY KEY (id),
+            FOREIGN KEY(giocatore_id) REFERENCES giocatori (id)
+        )
+    """)
+    conn.exec_driver_sql(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_voti_giornata_giocatore "
+        "ON voti (giornata, giocatore_id)"
+    )
+    conn.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS formazioni (
+            id INTEGER NOT NULL,
+            giornata INTEGER NOT NULL,
+            fantasquadra_id INTEGER NOT NULL,
+            giocatore_id INTEGER NOT NULL,
+            posizione INTEGER NOT NULL,
+            PRIMARY KEY (id),
+            FOREIGN KEY(fantasquadra_id) REFERENCES fantasquadre (id),
+            FOREIGN KEY(giocatore_id) REFERENCES giocatori (id)
+        )
+    """)
+    conn.exec_driver_sql(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_formazioni_giornata_squadra_giocatore "
+        "ON formazioni (giornata, fantasquadra_id, giocatore_id)"
+    )
+
+
+def _v5_quotazioni(conn):
+    conn.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS quotazioni (
+            giocatore_id INTEGER NOT NULL,
+            giornata INTEGER NOT NULL,
+            prezzo INTEGER NOT NULL,
+            PRIMARY KEY (giocatore_id, giornata),
+            FOREIGN KEY(giocatore_id) REFERENCES giocatori (id)
+        ) WITHOUT ROWID
+    """)
+    # A price change is recorded at the last giornata with pagelle (0 before
+    # the season starts); several changes in the same giornata keep the last
+    current_giornata = "(SELECT COALESCE(MAX(giornata), 0) FROM voti)"
+    conn.exec_driver_sql(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_giocatori_prezzo_insert
+        AFTER INSERT ON giocatori WHEN NEW.prezzo IS NOT NULL
+        BEGIN
+            INSERT OR REPLACE INTO quotazioni (giocatore_id, giornata, prezzo)
+            VALUES (NEW.id, {current_giornata}, NEW.prezzo);
+        END
+    """)
+    conn.exec_driver_sql(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_giocatori_prezzo_update
+        AFTER UPDATE OF prezzo ON giocatori
+        WHEN NEW.prezzo IS NOT NULL AND NEW.prezzo IS NOT OLD.prezzo
+        BEGIN
+            INSERT OR REPLACE INTO quotazioni (giocatore_id, giornata, prezzo)
+            VALUES (NEW.id, {current_giornata}, NEW.prezzo);
+        END
+    """)
+    conn.exec_driver_sql("""
+        CREATE TRIGGER IF NOT EXISTS trg_giocatori_prezzo_delete
+        AFTER DELETE ON giocatori
+        BEGIN
+            DELETE FROM quotazioni WHERE giocatore_id = OLD.id;
+        END
+    """)
+    # Current prices become the first point of every series
+    conn.exec_driver_sql("""
+        INSERT OR IGNORE INTO quotazioni (giocatore_id, giornata, prezzo)
+        SELECT id, 0, prezzo FROM giocatori WHERE prezzo IS NOT NULL
+    """)
+
+
+def _v6_change_log(conn):
+    # Sequence-numbered feed of row changes, read by ChangeWatcher (see
+    # change_watcher.py) to patch views after commits of other connections.
+    # op is the row's visibility change: I = now visible (created or
+    # restored), U = updated, D = gone (soft or hard deleted)
+    conn.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS change_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name VARCHAR NOT NULL,
+            row_id INTEGER NOT NULL,
+            op VARCHAR(1) NOT NULL
+        )
+    """)
+    logged = [("giocatori", "id"), ("fantasquadre", "id"), ("rose", "giocatore_id")]
+    for table, key in logged:
+        if table == "rose":
+            update_op = "'U'"
+        else:
+            update_op = (
+                "CASE WHEN NEW.deleted THEN 'D' WHEN OLD.deleted THEN 'I' ELSE 'U' END"
+            )
+        for event, row, op in [
+            ("INSERT", "NEW", "'I'"),
+            ("UPDATE", "NEW", update_op),
+            ("DELETE", "OLD", "'D'"),
+        ]:
+            conn.exec_driver_sql(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_log_{event.lower()}
+                AFTER {event} ON {table}
+                BEGIN
+                    INSERT INTO change_log (table_name, row_id, op)
+                    VALUES ('{table}', {row}.{key}, {op});
+                END
+            """)
+    # A rosa moved to another giocatore changes both players
+    conn.exec_driver_sql("""
+        CREATE TRIGGER IF NOT EXISTS trg_rose_log_update_old
+        AFTER UPDATE OF giocatore_id ON rose WHEN NEW.giocatore_id IS NOT OLD.giocatore_id
+        BEGIN
+            INSERT INTO change_log (table_name, row_id, op)
+            VALUES ('rose', OLD.giocatore_id, 'D');
+        END
+    """)
+    # Keep the feed bounded: every 1000 entries drop all but the last 10000;
+    # a watcher that falls further behind reloads everything
+    conn.exec_driver_sql("""
+        CREATE TRIGGER IF NOT EXISTS trg_change_log_prune
+        AFTER INSERT ON change_log WHEN NEW.seq % 1000 = 0
+        BEGIN
+            DELETE FROM change_log WHERE seq <= NEW.seq - 10000;
+        END
+    """)
+
+
+def _v7_giocatori_fts(conn):
+    # External-content FTS5 index over nome/squadra (the text lives only in
+    # giocatori); diacritics folded so "Vlahovic" finds "Vlahović", prefix
+    # indexes make the "laut*" queries of search-as-you-type cheap
+    conn.exec_driver_sql("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS giocatori_fts USING fts5(
+            nome, squadra,
+            content='giocatori', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+    """)
+    insert_new = (
+        "INSERT INTO giocatori_fts (rowid, nome, squadra) "
+        "VALUES (NEW.id, NEW.nome, NEW.squadra);"
+    )
+    delete_old = (
+        "INSERT INTO giocatori_fts (giocatori_fts, rowid, nome, squadra) "
+        "VALUES ('delete', OLD.id, OLD.nome, OLD.squadra);"
+    )
+    for name, event, body in [
+        ("trg_giocatori_fts_insert", "INSERT", insert_new),
+        ("trg_giocatori_fts_delete", "DELETE", delete_old),
+        ("trg_giocatori_fts_update", "UPDATE OF nome, squadra", delete_old + insert_new),
+    ]:
+        conn.exec_driver_sql(f"""
+            CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} ON giocatori
+            BEGIN
+                {body}
+            END
+        """)
+    conn.exec_driver_sql("INSERT INTO giocatori_fts (giocatori_fts) VALUES ('rebuild')")
+
+
+def _v8_sync(conn):
+    # Shared league mode (sync.py): the server's feed of field deltas and
+    # the key/value state of both sides (league id, last applied seq)
+    conn.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS sync_feed (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name VARCHAR NOT NULL,
+            row_id INTEGER NOT NULL,
+            field VARCHAR,
+            value VARCHAR
+        )
+    """)
+    conn.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS sync_state (
+            key VARCHAR NOT NULL,
+            value VARCHAR,
+            PRIMARY KEY (key)
+        )
+    """)
+
+
+def _v9_calendario(conn):
+    conn.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS calendario (
+            giornata INTEGER NOT NULL,
+            casa_id INTEGER NOT NULL,
+            trasferta_id INTEGER NOT NULL,
+            PRIMARY KEY (giornata, casa_id),
+            FOREIGN KEY(casa_id) REFERENCES fantasquadre (id),
+            FOREIGN KEY(trasferta_id) REFERENCES fantasquadre (id)
+        ) WITHOUT ROWID
+    """)
+
+
+def _v10_soft_delete_retention(conn):
+    # deleted_at: when a row was soft deleted, kept by triggers so every
+    # write path (repository, sync replicas, scripts) sets it; retention.py
+    # purges the rows deleted more than RETENTION_DAYS ago
+    for table in ("giocatori", "fantasquadre"):
+        columns = [row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({table})")]
+        if "deleted_at" not in columns:  # ADD COLUMN has no IF NOT EXISTS
+            conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN deleted_at DATETIME")
+        # Rows deleted before this version start their retention now
+        conn.exec_driver_sql(
+            f"UPDATE {table} SET deleted_at = CURRENT_TIMESTAMP "
+            f"WHERE deleted AND deleted_at IS NULL"
+        )
+        conn.exec_driver_sql(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_deleted_at
+            AFTER UPDATE OF deleted ON {table} WHEN NEW.deleted IS NOT OLD.deleted
+            BEGIN
+                UPDATE {table} SET deleted_at = CASE WHEN NEW.deleted THEN CURRENT_TIMESTAMP END
+                WHERE id = NEW.id;
+            END
+        """)
+        conn.exec_driver_sql(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_deleted_at_insert
+            AFTER INSERT ON {table} WHEN NEW.deleted AND NEW.deleted_at IS NULL
+            BEGIN
+                UPDATE {table} SET deleted_at = CURRENT_TIMESTAMP WHERE id = NEW.id;
+            END
+        """)
+        # The nested deleted_at update must not reach the change feed twice
+        conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS trg_{table}_log_update")
+        conn.exec_driver_sql(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_log_update
+            AFTER UPDATE ON {table}
+            WHEN NEW.deleted IS NOT OLD.deleted OR NEW.deleted_at IS OLD.deleted_at
+            BEGIN
+                INSERT INTO change_log (table_name, row_id, op)
+                VALUES ('{table}', NEW.id,
+                        CASE WHEN NEW.deleted THEN 'D' WHEN OLD.deleted THEN 'I' ELSE 'U' END);
+            END
+        """)
+        # Deleted set: the deleted items lists and the purge's age range
+        conn.exec_driver_sql(
+            f"CREATE INDEX IF NOT EXISTS ix_{table}_deleted_at "
+            f"ON {table} (deleted_at) WHERE deleted = 1"
+        )
+    # Live set: partial indexes replace the (deleted, ...) ones of v2, they
+    # hold no deleted rows and SQLite picks them for `deleted = ?` too
+    for name in [
+        "ix_giocatori_deleted", "ix_giocatori_deleted_prezzo",
+        "ix_giocatori_deleted_ruolo_prezzo", "ix_giocatori_deleted_squadra",
+        "ix_giocatori_deleted_nome",
+    ]:
+        conn.exec_driver_sql(f"DROP INDEX IF EXISTS {name}")
+    for name, table, columns in [
+        ("ix_giocatori_live_prezzo", "giocatori", "prezzo"),
+        ("ix_giocatori_live_ruolo_prezzo", "giocatori", "ruolo, prezzo"),
+        ("ix_giocatori_live_squadra", "giocatori", "squadra"),
+        ("ix_giocatori_live_nome", "giocatori", "nome"),
+        ("ix_fantasquadre_live_nome", "fantasquadre", "nome"),
+    ]:
+        conn.exec_driver_sql(
+            f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns}) WHERE deleted = 0"
+        )
+
+
+
+def _v11_sort_indexes(conn):
+    # Every sortable column gets a live (column, rowid) index so a sorted
+    # page is a range seek; nome also NOCASE for the prefix filter
+    for name, table, columns in [
+        ("ix_giocatori_live_ruolo", "giocatori", "ruolo"),
+        ("ix_giocatori_live_nome_nocase", "giocatori", "nome COLLATE NOCASE"),
+        ("ix_fantasquadre_live_allenatore", "fantasquadre", "allenatore"),
+        ("ix_fantasquadre_live_crediti", "fantasquadre", "crediti"),
+    ]:
+        conn.exec_driver_sql(
+            f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns}) WHERE deleted = 0"
+        )
+
+
+def _v12_sync_outbox(conn):
+    # Replica side of the shared league: deltas waiting for the server,
+    # same shape as sync_feed
+    conn.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS sync_outbox (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name VARCHAR NOT NULL,
+            row_id INTEGER NOT NULL,
+            field VARCHAR,
+            value VARCHAR
+        )
+    """)
+
+
+def _v13_deleted_id_indexes(conn):
+    # The deleted list pages by id; ix_*_deleted_at can't give that order,
+    # so without these the deleted tab scans the whole table
+    for table in ("giocatori", "fantasquadre"):
+        conn.exec_driver_sql(
+            f"CREATE INDEX IF NOT EXISTS ix_{table}_deleted_id ON {table} (id) WHERE deleted = 1"
+        )
+
+
+# (version, migration) in order; append new ones, never edit applied ones
+MIGRATIONS = [
+    (1, _v1_base_tables),
+    (2, _v2_giocatori_indexes),
+    (3, _v3_rose),
+    (4, _v4_voti_formazioni),
+    (5, _v5_quotazioni),
+    (6, _v6_change_log),
+    (7, _v7_giocatori_fts),
+    (8, _v8_sync),
+    (9, _v9_calendario),
+    (10, _v10_soft_delete_retention),
+    (11, _v11_sort_indexes),
+    (12, _v12_sync_outbox),
+    (13, _v13_deleted_id_indexes),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(conn):
+    return conn.exec_driver_sql("PRAGMA user_version").scalar()
+
+
+def migrate(engine):
+    """Bring the database up to LATEST_VERSION, returns the applied versions.
+
+    An up-to-date database costs a single PRAGMA read.
+    """
+    applied = []
+    with engine.begin() as conn:
+        version = schema_version(conn)
+        for target, migration in MIGRATIONS:
+            if target <= version:
+                continue
+            migration(conn)
+            conn.exec_driver_sql(f"PRAGMA user_version = {target}")
+            applied.append(target)
+    if applied:
+        _incremental_auto_vacuum(engine)
+    return applied
+
+
+def _incremental_auto_vacuum(engine):
+    # Files created before the engine profiles set auto_vacuum keep "none"
+    # until a VACUUM rewrites them, once, here rather than in the retention
+    # job; VACUUM can't run inside the migration transaction
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() != 2:
+            conn.exec_driver_sql("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.exec_driver_sql("VACUUM")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Float, Index, ForeignKey, text
 from database import Base
 
 
@@ -11,6 +11,21 @@ class Giocatore(Base):
     ruolo = Column(String)
     prezzo = Column(Integer)
     deleted = Column(Boolean, default=False)
+    deleted_at = Column(DateTime)  # set by triggers, see migrations.py
+
+    # Back the filter bar / header sorting of the live rows, and the deleted
+    # list / retention purge (partial indexes, one per set).
+    # Created on existing databases by migrations.py (keep in sync)
+    __table_args__ = (
+        Index("ix_giocatori_live_prezzo", "prezzo", sqlite_where=text("deleted = 0")),
+        Index("ix_giocatori_live_ruolo_prezzo", "ruolo", "prezzo", sqlite_where=text("deleted = 0")),
+        Index("ix_giocatori_live_squadra", "squadra", sqlite_where=text("deleted = 0")),
+        Index("ix_giocatori_live_nome", "nome", sqlite_where=text("deleted = 0")),
+        Index("ix_giocatori_live_ruolo", "ruolo", sqlite_where=text("deleted = 0")),
+        Index("ix_giocatori_live_nome_nocase", text("nome COLLATE NOCASE"), sqlite_where=text("deleted = 0")),
+        Index("ix_giocatori_deleted_at", "deleted_at", sqlite_where=text("deleted = 1")),
+        Index("ix_giocatori_deleted_id", "id", sqlite_where=text("deleted = 1")),
+    )
 
 
 class Fantasquadra(Base):
@@ -20,4 +35,160 @@ class Fantasquadra(Base):
     nome = Column(String, nullable=False)
     allenatore = Column(String)
     crediti = Column(Integer)
-    deleted = Column(Boolean, default=False)
\ No newline at end of file
+    deleted = Column(Boolean, default=False)
+    deleted_at = Column(DateTime)  # set by triggers, see migrations.py
+
+    # Created on existing databases by migrations.py (keep in sync)
+    __table_args__ = (
+        Index("ix_fantasquadre_live_nome", "nome", sqlite_where=text("deleted = 0")),
+        Index("ix_fantasquadre_live_allenatore", "allenatore", sqlite_where=text("deleted = 0")),
+        Index("ix_fantasquadre_live_crediti", "crediti", sqlite_where=text("deleted = 0")),
+        Index("ix_fantasquadre_deleted_at", "deleted_at", sqlite_where=text("deleted = 1")),
+        Index("ix_fantasquadre_deleted_id", "id", sqlite_where=text("deleted = 1")),
+    )
+
+
+class Rosa(Base):
+    """A player bought by a fantasquadra (one row per player)"""
+    __tablename__ = "rose"
+
+    id = Column(Integer, primary_key=True)
+    fantasquadra_id = Column(Integer, ForeignKey("fantasquadre.id"), nullable=False)
+    giocatore_id = Column(Integer, ForeignKey("giocatori.id"), nullable=False, unique=True)
+    prezzo = Column(Integer, nullable=False)  # price paid, not the listone price
+
+    # Created on existing databases by migrations.py (keep in sync)
+    __table_args__ = (
+        Index("ix_rose_fantasquadra", "fantasquadra_id"),
+    )
+
+
+class Voto(Base):
+    """Pagella of a player in one giornata (voto NULL = senza voto)"""
+    __tablename__ = "voti"
+
+    id = Column(Integer, primary_key=True)
+    giornata = Column(Integer, nullable=False)
+    giocatore_id = Column(Integer, ForeignKey("giocatori.id"), nullable=False)
+    voto = Column(Float)
+    gol = Column(Integer, nullable=False, default=0)
+    assist = Column(Integer, nullable=False, default=0)
+    ammonizioni = Column(Integer, nullable=False, default=0)
+    espulsioni = Column(Integer, nullable=False, default=0)
+    rigori_parati = Column(Integer, nullable=False, default=0)
+    rigori_sbagliati = Column(Integer, nullable=False, default=0)
+    autogol = Column(Integer, nullable=False, default=0)
+    gol_subiti = Column(Integer, nullable=False, default=0)
+    clean_sheet = Column(Boolean, nullable=False, default=False)
+
+    # Created on existing databases by migrations.py (keep in sync)
+    __table_args__ = (
+        Index("ix_voti_giornata_giocatore", "giornata", "giocatore_id", unique=True),
+    )
+
+
+class Formazione(Base):
+    """A player fielded by a fantasquadra in one giornata.
+
+    posizione 1-11 are the titolari, higher values the bench in order.
+    """
+    __tablename__ = "formazioni"
+
+    id = Column(Integer, primary_key=True)
+    giornata = Column(Integer, nullable=False)
+    fantasquadra_id = Column(Integer, ForeignKey("fantasquadre.id"), nullable=False)
+    giocatore_id = Column(Integer, ForeignKey("giocatori.id"), nullable=False)
+    posizione = Column(Integer, nullable=False)
+
+    # Created on existing databases by migrations.py (keep in sync)
+    __table_args__ = (
+        Index(
+            "ix_formazioni_giornata_squadra_giocatore",
+            "giornata", "fantasquadra_id", "giocatore_id", unique=True
+        ),
+    )
+
+
+class Partita(Base):
+    """A match of the fantacalcio calendar (see season.py).
+
+    Calendar giornata N is played with the pagelle of giornata N.
+    """
+    __tablename__ = "calendario"
+
+    giornata = Column(Integer, primary_key=True)
+    casa_id = Column(Integer, ForeignKey("fantasquadre.id"), primary_key=True)
+    trasferta_id = Column(Integer, ForeignKey("fantasquadre.id"), nullable=False)
+
+    __table_args__ = {"sqlite_with_rowid": False}
+
+
+class Quotazione(Base):
+    """Price of a player as of a giornata (append-only history).
+
+    Rows are written by triggers on giocatori.prezzo (see migrations.py),
+    so every write path (edits, imports, other processes) is recorded.
+    WITHOUT ROWID: the (giocatore_id, giornata) key is the table itself.
+    """
+    __tablename__ = "quotazioni"
+
+    giocatore_id = Column(Integer, ForeignKey("giocatori.id"), primary_key=True)
+    giornata = Column(Integer, primary_key=True)
+    prezzo = Column(Integer, nullable=False)
+
+    __table_args__ = {"sqlite_with_rowid": False}
+
+
+class ChangeLog(Base):
+    """Feed of row changes written by triggers (see migrations.py).
+
+    op: I = row became visible (created/restored), U = updated,
+    D = row gone (soft or hard deleted).
+    """
+    __tablename__ = "change_log"
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    seq = Column(Integer, primary_key=True)
+    table_name = Column(String, nullable=False)
+    row_id = Column(Integer, nullable=False)
+    op = Column(String(1), nullable=False)
+
+
+class SyncFeed(Base):
+    """Shared league change feed on the sync server (see sync.py).
+
+    One entry per changed field: value is JSON, field NULL means the row
+    was hard deleted.
+    """
+    __tablename__ = "sync_feed"
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    seq = Column(Integer, primary_key=True)
+    table_name = Column(String, nullable=False)
+    row_id = Column(Integer, nullable=False)
+    field = Column(String)
+    value = Column(String)
+
+
+class SyncOutbox(Base):
+    """Local edits of a replica not yet accepted by the sync server.
+
+    Written in the transaction of the edit itself, so nothing committed
+    locally is lost if the app quits before pushing it (see sync.py).
+    """
+    __tablename__ = "sync_outbox"
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    seq = Column(Integer, primary_key=True)
+    table_name = Column(String, nullable=False)
+    row_id = Column(Integer, nullable=False)
+    field = Column(String)
+    value = Column(String)
+
+
+class SyncState(Base):
+    """Key/value state of the sync server and of each replica"""
+    __tablename__ = "sync_state"
+
+    key = Column(String, primary_key=True)
+    value = Column(String)
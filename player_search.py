@@ -0,0 +1,160 @@
+"""Typo-tolerant giocatori search, fast enough to run on every keystroke.
+
+Two stages, answered in a few milliseconds:
+- FTS5 (giocatori_fts, kept in sync by triggers, see migrations.py): each
+  word of the query is a prefix of a word of nome/squadra ("laut mart",
+  "kvara"), ranked by bm25 with nome weighing more than squadra;
+- a TrigramIndex of the names held in memory for typos ("Lautaor",
+  "Kvaratscelia"): names sharing most letter trigrams with the query.
+
+The trigram index is built on the first search and then follows the
+change_log feed, so edits from any connection reach it without a rebuild.
+"""
+import heapq
+import unicodedata
+from collections import Counter
+
+from sqlalchemy import text
+
+from change_watcher import _last_seq, fetch_changes
+from models import Giocatore
+from repository import Repository
+
+
+# Suggestions returned per query
+SEARCH_LIMIT = 20
+
+# Share of the query's trigrams a name must contain to be a fuzzy match
+FUZZY_MIN_SCORE = 0.45
+
+
+def normalize(value):
+    """Lowercase words without accents or punctuation ("Vlahović" -> "vlahovic")"""
+    value = unicodedata.normalize("NFKD", value or "")
+    value = "".join(c for c in value if not unicodedata.combining(c))
+    return " ".join("".join(c if c.isalnum() else " " for c in value.lower()).split())
+
+
+def trigrams(value):
+    # Padded so the start of a word counts more ("  k", " kv")
+    padded = f"  {value} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """Inverted index trigram -> ids, for fuzzy matching of short texts"""
+
+    def __init__(self):
+        self.postings = {}  # {trigram: set of ids}
+        self.grams = {}  # {id: trigrams}, to remove or replace an entry
+
+    def __len__(self):
+        return len(self.grams)
+
+    def add(self, obj_id, value):
+        self.remove(obj_id)
+        grams = trigrams(normalize(value))
+        self.grams[obj_id] = grams
+        for gram in grams:
+            self.postings.setdefault(gram, set()).add(obj_id)
+
+    def remove(self, obj_id):
+        for gram in self.grams.pop(obj_id, ()):
+            ids = self.postings[gram]
+            ids.discard(obj_id)
+            if not ids:
+                del self.postings[gram]
+
+    def search(self, query, limit=SEARCH_LIMIT, min_score=FUZZY_MIN_SCORE):
+        """[(id, score)] best first; score is the share of the query matched"""
+        wanted = trigrams(normalize(query))
+        shared = Counter()
+        for gram in wanted:
+            shared.update(self.postings.get(gram, ()))
+        # Query coverage first (partial names match), then the Dice
+        # coefficient so the closest-length name wins among equals
+        scored = (
+            (count / len(wanted), 2 * count / (len(wanted) + len(self.grams[obj_id])), obj_id)
+            for obj_id, count in shared.items()
+            if count / len(wanted) >= min_score
+        )
+        return [(obj_id, score) for score, _, obj_id in heapq.nlargest(limit, scored)]
+
+
+class GiocatoriRepository(Repository):
+    """Repository of giocatori with a ranked, typo-tolerant search().
+
+    Like every Repository method, search() runs on the worker thread, which
+    also owns the in-memory trigram index.
+    """
+
+    def __init__(self, session_factory, fields, read_session_factory=None):
+        super().__init__(session_factory, Giocatore, fields, read_session_factory)
+        self._index = None  # TrigramIndex of live giocatori, built lazily
+        self._index_seq = 0  # change_log seq the index reflects
+
+    def search(self, query, limit=SEARCH_LIMIT):
+        """(id, *fields) rows of live giocatori matching `query`, best first"""
+        query = normalize(query)
+        if not query:
+            return []
+        self._sync_index()
+        with self.read_session_factory() as session:
+            ranked = self._prefix_matches(session, query, limit)
+        if len(ranked) < limit:
+            seen = set(ranked)
+            for obj_id, _ in self._index.search(query, limit + len(seen)):
+                if obj_id not in seen:
+                    ranked.append(obj_id)
+                    seen.add(obj_id)
+        ranked = ranked[:limit]
+        rows = {row[0]: row for row in self.get_many(ranked, deleted=False)}
+        return [rows[obj_id] for obj_id in ranked if obj_id in rows]
+
+    def prepare_search(self):
+        """Build the trigram index ahead of the first keystroke"""
+        self._sync_index()
+
+    def _prefix_matches(self, session, query, limit):
+        match = " ".join(f'"{word}"*' for word in query.split())
+        rows = session.execute(text(
+            "SELECT g.id FROM giocatori_fts JOIN giocatori g ON g.id = giocatori_fts.rowid "
+            "WHERE giocatori_fts MATCH :match AND g.deleted = 0 "
+            "ORDER BY bm25(giocatori_fts, 10.0, 1.0), g.nome LIMIT :limit"
+        ), {"match": match, "limit": limit})
+        return [obj_id for (obj_id,) in rows]
+
+    # ---------- TRIGRAM INDEX ----------
+
+    def _sync_index(self):
+        """Build the index, or patch it with the giocatori changed since"""
+        if self._index is not None:
+            with self.read_session_factory() as session:
+                if _last_seq(session) == self._index_seq:
+                    return
+            seq, changes = fetch_changes(self.read_session_factory, self._index_seq)
+            if changes is not None:
+                self._index_seq = seq
+                self._reindex(changes.get("giocatori", {}))
+                return
+        self._build_index()
+
+    def _build_index(self):
+        index = TrigramIndex()
+        with self.read_session_factory() as session:
+            seq = _last_seq(session)
+            query = session.query(Giocatore.id, Giocatore.nome).filter_by(deleted=False)
+            for obj_id, nome in query:
+                index.add(obj_id, nome)
+        self._index, self._index_seq = index, seq
+
+    def _reindex(self, changes):
+        if not changes:
+            return
+        rows = self.get_many(list(changes), deleted=False)
+        live = {row[0]: row[1 + self.fields.index("nome")] for row in rows}
+        for obj_id in changes:
+            if obj_id in live:
+                self._index.add(obj_id, live[obj_id])
+            else:
+                self._index.remove(obj_id)
@@ -0,0 +1,96 @@
+"""Quotazioni history: range, "as of giornata N" and whole-league queries.
+
+The `quotazioni` table is filled by triggers on giocatori.prezzo (see
+migrations.py) and keyed by (giocatore_id, giornata), so a player's series
+is one contiguous range of the key and "as of N" is the last key <= N.
+"""
+from itertools import groupby
+
+from sqlalchemy import func
+
+from models import Quotazione, Voto
+from repository import _chunks
+
+
+# Trend columns of the giocatori table: price delta over the last N giornate
+TREND_GIORNATE = [1, 5]
+TREND_HEADERS = [f"Δ {n}g" for n in TREND_GIORNATE]
+
+
+def current_giornata(session):
+    """Last giornata with pagelle, 0 before the season starts"""
+    return session.query(func.coalesce(func.max(Voto.giornata), 0)).scalar()
+
+
+def history(session_factory, giocatore_id, start=None, end=None):
+    """[(giornata, prezzo)] of one player, optionally within [start, end]"""
+    with session_factory() as session:
+        query = session.query(Quotazione.giornata, Quotazione.prezzo).filter(
+            Quotazione.giocatore_id == giocatore_id
+        )
+        if start is not None:
+            query = query.filter(Quotazione.giornata >= start)
+        if end is not None:
+            query = query.filter(Quotazione.giornata <= end)
+        return [tuple(row) for row in query.order_by(Quotazione.giornata)]
+
+
+def _as_of_query(session, giornata):
+    # SQLite returns the other columns from the row holding MAX(): one
+    # pass over the key, no correlated subquery per player
+    return session.query(
+        Quotazione.giocatore_id, Quotazione.prezzo, func.max(Quotazione.giornata)
+    ).filter(Quotazione.giornata <= giornata).group_by(Quotazione.giocatore_id)
+
+
+def as_of(session_factory, giornata, ids=None):
+    """{giocatore_id: prezzo} as of `giornata` (players listed later are missing)"""
+    with session_factory() as session:
+        return _as_of(session, giornata, ids)
+
+
+def _as_of(session, giornata, ids):
+    query = _as_of_query(session, giornata)
+    if ids is None:
+        return {player: prezzo for player, prezzo, _ in query}
+    prices = {}
+    for chunk in _chunks(ids):
+        for player, prezzo, _ in query.filter(Quotazione.giocatore_id.in_(chunk)):
+            prices[player] = prezzo
+    return prices
+
+
+def league_series(session_factory, start=None, end=None):
+    """{giocatore_id: [(giornata, prezzo)]} of every player in one query"""
+    with session_factory() as session:
+        query = session.query(Quotazione.giocatore_id, Quotazione.giornata, Quotazione.prezzo)
+        if start is not None:
+            query = query.filter(Quotazione.giornata >= start)
+        if end is not None:
+            query = query.filter(Quotazione.giornata <= end)
+        rows = query.order_by(Quotazione.giocatore_id, Quotazione.giornata).all()
+    return {
+        player: [(giornata, prezzo) for _, giornata, prezzo in points]
+        for player, points in groupby(rows, key=lambda row: row[0])
+    }
+
+
+def trends(session_factory, ids, windows=TREND_GIORNATE):
+    """{giocatore_id: (delta over each window)} for a page of players.
+
+    One as-of query per window for the whole page; a delta is None when
+    the player has no price that far back.
+    """
+    if not ids:
+        return {}
+    with session_factory() as session:
+        now = current_giornata(session)
+        latest = _as_of(session, now, ids)
+        past = [_as_of(session, now - n, ids) for n in windows]
+    return {
+        player: tuple(
+            prezzo - before[player] if player in before else None
+            for before in past
+        )
+        for player, prezzo in latest.items()
+    }
@@ -1,39 +1,307 @@
+from sqlalchemy import and_, delete, insert, select, tuple_, update
+
+
+# Operators accepted in page() filters
+FILTER_OPS = ("eq", "min", "max", "prefix", "in")
+
+# Keep IN (...) lists well below SQLite's bound-parameter limit
+BULK_CHUNK_SIZE = 500
+
+# Rows hard deleted per purge transaction: the write lock is held that long
+PURGE_BATCH_SIZE = 500
+
+
+def _chunks(items, size=BULK_CHUNK_SIZE):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
 class Repository:
-    def __init__(self, session, model, fields):
-        self.session = session
+    """Data access for one table.
+    
+    Every method is its own unit of work: it opens a short-lived session
+    from `session_factory` (writes) or `read_session_factory` (queries) and
+    closes it before returning, so nothing accumulates in an identity map
+    and no loaded object is left around to be expired and lazily reloaded
+    after a commit. Objects returned by all()/create() are detached snapshots.
+    """
+    
+    def __init__(self, session_factory, model, fields, read_session_factory=None):
+        self.session_factory = session_factory
+        self.read_session_factory = read_session_factory or session_factory
         self.model = model
         self.fields = fields
+        # Projection used by the table models: (id, *fields) tuples instead
+        # of full ORM entities (no identity map, no instrumented attributes)
+        self.columns = [model.id] + [getattr(model, f) for f in fields]
+        # Shared league mode (sync.SyncClient): edits are queued as
+        # (id, field, value) deltas in the transaction that makes them and
+        # pushed once committed; new rows get their ids from the server
+        self.replication = None
+
+    def to_row(self, obj):
+        return (obj.id, *(getattr(obj, f) for f in self.fields))
 
     def all(self):
-        return self.session.query(self.model).filter_by(deleted=False).all()
+        with self.read_session_factory() as session:
+            return session.query(self.model).filter_by(deleted=False).all()
+    
+    def page(self, after_id=None, limit=200, deleted=False,
+             order_by=None, descending=False, after_value=None, filters=None):
+        """Keyset pagination: next `limit` (id, *fields) rows after the cursor.
+        
+        Rows are ordered by `order_by` (if given) then id, so the cursor is
+        (after_value, after_id) taken from the last row of the previous page.
+        `filters` is a list of (field, op, value) with op in FILTER_OPS.
+        """
+        with self.read_session_factory() as session:
+            query = session.query(*self.columns).filter_by(deleted=deleted)
+            query = self._apply_filters(query, filters)
+            
+            id_column = self.model.id
+            if order_by is None:
+                if after_id is not None:
+                    query = query.filter(
+                        id_column < after_id if descending else id_column > after_id
+                    )
+                order = [id_column.desc() if descending else id_column]
+            else:
+                column = getattr(self.model, order_by)
+                # SQLite sorts NULLs first ascending and last descending, the
+                # cursor segments follow the same convention
+                if descending:
+                    order = [column.desc(), id_column.desc()]
+                else:
+                    order = [column, id_column]
+                if after_id is not None:
+                    return self._page_segments(
+                        query, order, limit,
+                        self._after_cursor(column, after_value, after_id, descending)
+                    )
+            return [tuple(row) for row in query.order_by(*order).limit(limit)]
+    
+    def _page_segments(self, query, order, limit, segments):
+        # Each segment is an index range seek; an OR across the NULL boundary
+        # would turn every page into a scan from the start of the index
+        rows = []
+        for condition in segments:
+            remaining = limit - len(rows)
+            if remaining <= 0:
+                break
+            page = query.filter(condition).order_by(*order).limit(remaining)
+            rows.extend(tuple(row) for row in page)
+        return rows
+    
+    def _after_cursor(self, column, value, after_id, descending):
+        """Conditions, in sort order, selecting the rows after the cursor"""
+        id_column = self.model.id
+        # Row values, not OR-ed terms: SQLite starts the index range at them
+        cursor = tuple_(column, id_column)
+        if descending:
+            if value is None:
+                return [and_(column.is_(None), id_column < after_id)]
+            return [cursor < tuple_(value, after_id), column.is_(None)]
+        if value is None:
+            return [
+                and_(column.is_(None), id_column > after_id),
+                column.isnot(None),
+            ]
+        return [cursor > tuple_(value, after_id)]
+    
+    def _apply_filters(self, query, filters):
+        for field, op, value in filters or ():
+            column = getattr(self.model, field)
+            if op == "eq":
+                query = query.filter(column == value)
+            elif op == "min":
+                query = query.filter(column >= value)
+            elif op == "max":
+                query = query.filter(column <= value)
+            elif op == "prefix":
+                # A range instead of LIKE, so it seeks the NOCASE index
+                # (ASCII case folding, as LIKE did)
+                folded = column.collate("NOCASE")
+                query = query.filter(folded >= value, folded < value + "\U0010FFFF")
+            elif op == "in":
+                query = query.filter(column.in_(list(value)))
+            else:
+                raise ValueError(f"Unknown filter operator: {op}")
+        return query
+    
+    def all_ids(self, deleted=False):
+        with self.read_session_factory() as session:
+            query = session.query(self.model.id).filter_by(deleted=deleted)
+            return [obj_id for (obj_id,) in query]
+    
+    def get_many(self, ids, deleted=None, filters=None):
+        """(id, *fields) rows of `ids`, optionally only deleted/live ones
+        matching `filters` (as in page())"""
+        if not ids:
+            return []
+        rows = []
+        with self.read_session_factory() as session:
+            base = session.query(*self.columns)
+            if deleted is not None:
+                base = base.filter_by(deleted=deleted)
+            base = self._apply_filters(base, filters)
+            for chunk in _chunks(sorted(ids)):
+                query = (
+                    base.filter(self.model.id.in_(chunk))
+                    .order_by(self.model.id)
+                )
+                rows.extend(tuple(row) for row in query)
+        return rows
     
     def all_deleted(self):
-        return self.session.query(self.model).filter_by(deleted=True).all()
+        with self.read_session_factory() as session:
+            return session.query(self.model).filter_by(deleted=True).all()
     
     def create(self, data: dict):
         obj = self.model(**data)
-        self.session.add(obj)
-        self.session.commit()
+        if self.replication is not None:
+            # Returns once the row reached the local replica
+            [obj.id] = self.replication.create(self.model.__tablename__, [data])
+            return obj
+        with self.session_factory.begin() as session:
+            session.add(obj)
         return obj
 
+    def _replicate(self, session, deltas):
+        if self.replication is not None and deltas:
+            self.replication.push(session, self.model.__tablename__, deltas)
+
     def create_empty(self):
-        obj = self.model()
-        self.session.add(obj)
-        self.session.commit()
-        return obj
+        return self.create({})
 
     def set_value(self, obj, field, value):
+        self.update_many({obj.id: {field: value}})
         setattr(obj, field, value)
-        self.session.commit()
     
     def soft_delete(self, obj):
+        self.soft_delete_many([obj.id])
         obj.deleted = True
-        self.session.commit()
     
     def restore(self, obj):
+        self.restore_many([obj.id])
         obj.deleted = False
-        self.session.commit()
     
     def hard_delete(self, obj):
-        self.session.delete(obj)
-        self.session.commit()
\ No newline at end of file
+        self.hard_delete_many([obj.id])
+    
+    # ---------- BULK ----------
+    # Each bulk call runs set-based statements inside a single transaction
+    
+    def _set_deleted_many(self, ids, deleted):
+        with self.session_factory.begin() as session:
+            for chunk in _chunks(ids):
+                session.execute(
+                    update(self.model)
+                    .where(self.model.id.in_(chunk))
+                    .values(deleted=deleted)
+                )
+            self._replicate(session, [(obj_id, "deleted", deleted) for obj_id in ids])
+    
+    def soft_delete_many(self, ids):
+        if not ids:
+            return
+        self._set_deleted_many(ids, True)
+    
+    def restore_many(self, ids):
+        if not ids:
+            return
+        self._set_deleted_many(ids, False)
+    
+    def hard_delete_many(self, ids):
+        if not ids:
+            return
+        with self.session_factory.begin() as session:
+            for chunk in _chunks(ids):
+                session.execute(
+                    delete(self.model).where(self.model.id.in_(chunk))
+                )
+            self._replicate(session, [(obj_id, None, None) for obj_id in ids])
+    
+    def purge_deleted(self, before, keep=(), batch_size=PURGE_BATCH_SIZE):
+        """Hard delete rows soft deleted before `before`, returns how many.
+
+        Runs in transactions of at most `batch_size` rows, oldest first, so
+        other writers get the lock between batches. Rows still referenced
+        by a column of `keep` (e.g. Rosa.giocatore_id) are left alone.
+        """
+        model = self.model
+        candidates = select(model.id).where(
+            model.deleted == True, model.deleted_at < before,
+            *(model.id.not_in(select(column)) for column in keep)
+        ).order_by(model.deleted_at).limit(batch_size)
+        purged = 0
+        while True:
+            with self.session_factory.begin() as session:
+                ids = session.scalars(
+                    delete(model).where(model.id.in_(candidates)).returning(model.id)
+                ).all()
+                self._replicate(session, [(obj_id, None, None) for obj_id in ids])
+            purged += len(ids)
+            if len(ids) < batch_size:
+                return purged
+    
+    def update_many(self, changes: dict):
+        """Apply {id: {field: value}} as one executemany UPDATE by primary key"""
+        params = [
+            {"id": obj_id, **values}
+            for obj_id, values in changes.items()
+            if values
+        ]
+        if not params:
+            return
+        with self.session_factory.begin() as session:
+            session.execute(update(self.model), params)
+            self._replicate(session, [
+                (obj_id, field, value)
+                for obj_id, values in changes.items()
+                for field, value in values.items()
+            ])
+    
+    def upsert_many(self, rows, key_fields):
+        """Insert or update rows matched on a natural key, in one transaction.
+        
+        Returns (inserted, updated).
+        """
+        if not rows:
+            return 0, 0
+        key_columns = [getattr(self.model, f) for f in key_fields]
+        # Later duplicates of the same key win
+        by_key = {tuple(row[f] for f in key_fields): row for row in rows}
+        
+        with self.session_factory.begin() as session:
+            existing = {}
+            for chunk in _chunks(by_key):
+                query = (
+                    session.query(self.model.id, *key_columns)
+                    .filter(tuple_(*key_columns).in_(chunk))
+                )
+                for obj_id, *key in query:
+                    existing[tuple(key)] = obj_id
+            
+            inserts = [
+                {"deleted": False, **row}
+                for key, row in by_key.items()
+                if key not in existing
+            ]
+            updates = [
+                {"id": existing[key], **row}
+                for key, row in by_key.items()
+                if key in existing
+            ]
+            if inserts and self.replication is None:
+                session.execute(insert(self.model), inserts)
+            if updates:
+                session.execute(update(self.model), updates)
+            self._replicate(session, [
+                (row["id"], field, value)
+                for row in updates
+                for field, value in row.items() if field != "id"
+            ])
+        if inserts and self.replication is not None:
+            self.replication.create(self.model.__tablename__, inserts)
+        return len(inserts), len(updates)
@@ -0,0 +1,80 @@
+"""Retention of soft-deleted rows and compaction of the database file.
+
+Soft-deleted giocatori and fantasquadre stay restorable for RETENTION_DAYS
+(FANTAMANAGER_RETENTION_DAYS, 0 = keep forever), then run_retention()
+hard deletes them in small batches (Repository.purge_deleted) and gives
+the freed pages back to the filesystem with incremental vacuum steps, so
+neither ever holds the write lock for long.
+"""
+import os
+from datetime import datetime, timedelta, timezone
+
+from models import Formazione, Partita, Rosa, Voto
+from repository import PURGE_BATCH_SIZE
+
+
+RETENTION_DAYS = int(os.environ.get("FANTAMANAGER_RETENTION_DAYS", "30"))
+
+# How often the app runs the retention job (after the one at startup)
+RETENTION_INTERVAL_MS = 60 * 60 * 1000
+
+# Pages released per incremental_vacuum statement
+VACUUM_STEP_PAGES = 256
+
+# Rows referenced here are kept past their retention: purging them would
+# leave rose, pagelle, formazioni or calendario pointing at nothing
+RETAINED_BY = {
+    "giocatori": [Rosa.giocatore_id, Voto.giocatore_id, Formazione.giocatore_id],
+    "fantasquadre": [
+        Rosa.fantasquadra_id, Formazione.fantasquadra_id,
+        Partita.casa_id, Partita.trasferta_id,
+    ],
+}
+
+
+def compact(engine, step=VACUUM_STEP_PAGES):
+    """Release the database's free pages, returns how many were freed.
+
+    Truncates the free pages `step` per statement; a file without
+    incremental auto_vacuum (migrate() switches old ones) is left alone.
+    """
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() != 2:
+            return 0
+        before = conn.exec_driver_sql("PRAGMA freelist_count").scalar()
+        remaining = before
+        while remaining:
+            # One short write transaction per step. pysqlite steps a
+            # statement without result columns only once and that frees a
+            # single page, so the step is that many one-page statements
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+            for _ in range(min(step, remaining)):
+                conn.exec_driver_sql("PRAGMA incremental_vacuum(1)")
+            conn.exec_driver_sql("COMMIT")
+            left = conn.exec_driver_sql("PRAGMA freelist_count").scalar()
+            if left >= remaining:
+                break
+            remaining = left
+        return before - remaining
+
+
+def run_retention(repositories, engine, days=RETENTION_DAYS,
+                  batch_size=PURGE_BATCH_SIZE):
+    """Purge what outlived the retention and compact, returns {table: rows}.
+
+    `repositories` are the Repository objects of giocatori/fantasquadre,
+    so purges of a shared league reach the server like any other delete.
+    """
+    if days <= 0:
+        return {}
+    # deleted_at is written by SQLite's CURRENT_TIMESTAMP, i.e. naive UTC
+    cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=days)
+    purged = {}
+    for repo in repositories:
+        table = repo.model.__tablename__
+        purged[table] = repo.purge_deleted(
+            cutoff, keep=RETAINED_BY.get(table, ()), batch_size=batch_size
+        )
+    if any(purged.values()):
+        compact(engine)
+    return purged
@@ -0,0 +1,249 @@
+"""Rosa constraints: remaining crediti and per-ruolo quotas of every team.
+
+RosterEngine keeps per-team aggregates (spent crediti, players per ruolo)
+and updates them on each assignment, release or price change, so a check
+never re-sums a rosa. Batches of changes are validated and applied
+change by change and rolled back as a whole if one of them is rejected.
+
+The engine is plain Python (no Qt, no database): the auction server and
+the app each keep their own. The auction server writes its awards
+itself (auction.award); the app's engine only follows the rose written
+by other connections.
+"""
+from constants import ROSA_QUOTE
+from models import Fantasquadra, Giocatore, Rosa
+from repository import _chunks
+
+
+class RosterError(Exception):
+    """A change that would break a budget or quota; the message is user facing"""
+
+
+class TeamTotals:
+    """Running aggregates of one fantasquadra"""
+
+    __slots__ = ("budget", "spent", "counts")
+
+    def __init__(self, budget, quotas):
+        self.budget = budget or 0
+        self.spent = 0
+        self.counts = dict.fromkeys(quotas, 0)
+
+    @property
+    def remaining(self):
+        return self.budget - self.spent
+
+    @property
+    def size(self):
+        return sum(self.counts.values())
+
+
+class RosterEngine:
+    """Validates and applies rosa changes in constant time.
+
+    Changes are tuples:
+        ("assign", giocatore_id, fantasquadra_id, ruolo, prezzo)
+        ("release", giocatore_id)
+        ("price", giocatore_id, prezzo)
+    """
+
+    def __init__(self, quotas=ROSA_QUOTE):
+        self.quotas = dict(quotas)
+        self.teams = {}  # {fantasquadra id: TeamTotals}
+        self.players = {}  # {giocatore id: (fantasquadra id, ruolo, prezzo)}
+        self.listeners = []  # called with the fantasquadra id after each change
+
+    def _notify(self, team):
+        for listener in self.listeners:
+            listener(team)
+
+    # ---------- TEAMS ----------
+
+    def set_team(self, team, budget):
+        """Add a team or change its crediti (a budget below the spent is allowed)"""
+        totals = self.teams.get(team)
+        if totals is None:
+            self.teams[team] = TeamTotals(budget, self.quotas)
+        else:
+            totals.budget = budget or 0
+        self._notify(team)
+
+    def remove_team(self, team):
+        """Forget a (soft deleted) team; its players stay taken"""
+        self.teams.pop(team, None)
+        self._notify(team)
+
+    # ---------- CHECKS ----------
+
+    def _totals(self, team):
+        totals = self.teams.get(team)
+        if totals is None:
+            raise RosterError("Fantasquadra sconosciuta")
+        return totals
+
+    def check_assign(self, giocatore_id, team, ruolo, prezzo):
+        totals = self._totals(team)
+        if giocatore_id in self.players:
+            raise RosterError("Giocatore già assegnato")
+        if ruolo not in self.quotas:
+            raise RosterError(f"Ruolo non valido: {ruolo!r}")
+        if totals.counts[ruolo] >= self.quotas[ruolo]:
+            raise RosterError(f"Quota {ruolo} completa ({self.quotas[ruolo]})")
+        if prezzo < 0:
+            raise RosterError("Prezzo non valido")
+        if prezzo > totals.remaining:
+            raise RosterError("Crediti insufficienti")
+
+    def check_price(self, giocatore_id, prezzo):
+        entry = self.players.get(giocatore_id)
+        if entry is None:
+            raise RosterError("Giocatore non in rosa")
+        if prezzo < 0:
+            raise RosterError("Prezzo non valido")
+        if prezzo - entry[2] > self._totals(entry[0]).remaining:
+            raise RosterError("Crediti insufficienti")
+
+    # ---------- CHANGES ----------
+
+    def assign(self, giocatore_id, team, ruolo, prezzo):
+        self.check_assign(giocatore_id, team, ruolo, prezzo)
+        self._add(giocatore_id, team, ruolo, prezzo)
+
+    def _add(self, giocatore_id, team, ruolo, prezzo):
+        self.players[giocatore_id] = (team, ruolo, prezzo)
+        totals = self.teams.get(team)
+        if totals is not None:
+            totals.spent += prezzo
+            if ruolo in totals.counts:
+                totals.counts[ruolo] += 1
+            self._notify(team)
+
+    def release(self, giocatore_id):
+        """Remove a player from its rosa, returns the undo change"""
+        if giocatore_id not in self.players:
+            raise RosterError("Giocatore non in rosa")
+        team, ruolo, prezzo = self.players.pop(giocatore_id)
+        totals = self.teams.get(team)
+        if totals is not None:
+            totals.spent -= prezzo
+            if ruolo in totals.counts:
+                totals.counts[ruolo] -= 1
+            self._notify(team)
+        return ("assign", giocatore_id, team, ruolo, prezzo)
+
+    def set_price(self, giocatore_id, prezzo):
+        """Change a purchase price, returns the undo change"""
+        self.check_price(giocatore_id, prezzo)
+        return self._reprice(giocatore_id, prezzo)
+
+    def _reprice(self, giocatore_id, prezzo):
+        team, ruolo, old = self.players[giocatore_id]
+        self.players[giocatore_id] = (team, ruolo, prezzo)
+        totals = self.teams.get(team)
+        if totals is not None:
+            totals.spent += prezzo - old
+            self._notify(team)
+        return ("price", giocatore_id, old)
+
+    def changes_to(self, players):
+        """Batch bringing some players to {giocatore id: (team, ruolo, prezzo) or None}.
+
+        Releases come first so a player moved between teams frees its slot.
+        """
+        releases, prices, assigns = [], [], []
+        for giocatore_id, entry in players.items():
+            current = self.players.get(giocatore_id)
+            if current == entry:
+                continue
+            if current is not None and (entry is None or entry[:2] != current[:2]):
+                releases.append(("release", giocatore_id))
+                current = None
+            if entry is None:
+                continue
+            if current is None:
+                assigns.append(("assign", giocatore_id, *entry))
+            else:
+                prices.append(("price", giocatore_id, entry[2]))
+        return releases + prices + assigns
+
+    def apply(self, changes):
+        """Apply a batch atomically: all changes or none (RosterError).
+
+        Returns the batch that reverts it with revert(), e.g. when saving
+        it fails.
+        """
+        undo = []
+        try:
+            for change in changes:
+                undo.append(self._apply_one(change))
+        except RosterError:
+            self.revert(undo[::-1])
+            raise
+        return undo[::-1]
+
+    def revert(self, undo):
+        """Restore the state before apply() from its undo batch, unchecked.
+
+        The previous state may itself break a check (set_team allows a
+        budget below the spent), so nothing is validated here.
+        """
+        for change in undo:
+            kind = change[0]
+            if kind == "assign":
+                self._add(*change[1:])
+            elif kind == "release":
+                self.release(change[1])
+            elif kind == "price":
+                self._reprice(*change[1:])
+            else:
+                raise ValueError(f"Unknown roster change: {kind}")
+
+    def _apply_one(self, change):
+        kind = change[0]
+        if kind == "assign":
+            self.assign(*change[1:])
+            return ("release", change[1])
+        if kind == "release":
+            return self.release(change[1])
+        if kind == "price":
+            return self.set_price(*change[1:])
+        raise ValueError(f"Unknown roster change: {kind}")
+
+
+# ---------- DATABASE ----------
+
+def load_engine(session_factory, quotas=ROSA_QUOTE):
+    """RosterEngine with the teams and rose currently in the database"""
+    engine = RosterEngine(quotas)
+    with session_factory() as session:
+        for team, crediti in session.query(Fantasquadra.id, Fantasquadra.crediti).filter_by(
+            deleted=False
+        ):
+            engine.teams[team] = TeamTotals(crediti, engine.quotas)
+        query = session.query(
+            Rosa.giocatore_id, Rosa.fantasquadra_id, Giocatore.ruolo, Rosa.prezzo
+        ).join(Giocatore, Giocatore.id == Rosa.giocatore_id)
+        for giocatore_id, team, ruolo, prezzo in query:
+            # Players of deleted teams stay taken but count for nobody
+            engine.players[giocatore_id] = (team, ruolo, prezzo)
+            totals = engine.teams.get(team)
+            if totals is not None:
+                totals.spent += prezzo
+                if ruolo in totals.counts:
+                    totals.counts[ruolo] += 1
+    return engine
+
+
+def load_players(session_factory, ids):
+    """{giocatore id: (fantasquadra id, ruolo, prezzo) or None} of some players"""
+    players = dict.fromkeys(ids)
+    with session_factory() as session:
+        for chunk in _chunks(ids):
+            query = session.query(
+                Rosa.giocatore_id, Rosa.fantasquadra_id, Giocatore.ruolo, Rosa.prezzo
+            ).join(Giocatore, Giocatore.id == Rosa.giocatore_id).filter(
+                Rosa.giocatore_id.in_(chunk)
+            )
+            for giocatore_id, team, ruolo, prezzo in query:
+                players[giocatore_id] = (team, ruolo, prezzo)
+    return players
@@ -0,0 +1,197 @@
+from PySide6.QtCore import QAbstractTableModel, Qt, QModelIndex, QTimer, Signal
+from PySide6.QtGui import QColor
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QLabel, QTableView, QHeaderView
+
+from constants import ROSA_QUOTE
+from models import Fantasquadra
+from roster import RosterEngine, RosterError, load_engine, load_players
+
+
+def load_teams(session_factory):
+    """{fantasquadra id: (nome, crediti)} of the teams not deleted"""
+    with session_factory() as session:
+        query = session.query(
+            Fantasquadra.id, Fantasquadra.nome, Fantasquadra.crediti
+        ).filter_by(deleted=False)
+        return {team: (nome, crediti) for team, nome, crediti in query}
+
+
+def load_summary(session_factory):
+    return load_engine(session_factory), load_teams(session_factory)
+
+
+class RosterSummaryModel(QAbstractTableModel):
+    """Live per-team aggregates (spent, remaining, players per ruolo).
+
+    Reads the RosterEngine totals, which are updated incrementally: a change
+    repaints only the row of the team it touched.
+    """
+
+    loading_changed = Signal(bool)
+
+    def __init__(self, read_session_factory, worker):
+        super().__init__()
+        self.read_session_factory = read_session_factory
+        self.worker = worker
+        self.engine = RosterEngine()
+        self.names = {}  # {fantasquadra id: nome}
+        self.order = []  # fantasquadra ids in display order
+        self.ruoli = list(ROSA_QUOTE)
+        self.headers = ["Fantasquadra", "Crediti", "Spesi", "Residui"] + self.ruoli
+        self._rows = {}  # {fantasquadra id: row}
+        self._sync_pending = False
+        self.refresh()
+
+    # ---------- LOADING ----------
+
+    def refresh(self):
+        """Rebuild the engine from the database"""
+        self.loading_changed.emit(True)
+        self.worker.submit(
+            load_summary, self.read_session_factory,
+            on_result=self._on_loaded,
+            on_error=lambda _: self.loading_changed.emit(False)
+        )
+
+    def _on_loaded(self, result):
+        engine, teams = result
+        self.beginResetModel()
+        self.engine = engine
+        self.engine.listeners.append(self._on_team_changed)
+        self._set_teams(teams)
+        self.endResetModel()
+        self.loading_changed.emit(False)
+
+    def _set_teams(self, teams):
+        self.names = {team: nome for team, (nome, _) in teams.items()}
+        self.order = sorted(self.names, key=lambda team: (str(self.names[team]).lower(), team))
+        self._rows = {team: row for row, team in enumerate(self.order)}
+
+    def sync_teams(self):
+        """Pick up edited crediti/names; coalesces bursts of calls"""
+        if self._sync_pending:
+            return
+        self._sync_pending = True
+        QTimer.singleShot(0, lambda: self.worker.submit(
+            load_teams, self.read_session_factory,
+            on_result=self._on_teams, on_error=self._on_sync_failed
+        ))
+
+    def _on_sync_failed(self, _):
+        self._sync_pending = False
+
+    def _on_teams(self, teams):
+        self._sync_pending = False
+        if set(teams) != set(self.engine.teams):
+            # Teams created, deleted or restored: their rose must be summed
+            self.refresh()
+            return
+        # Only budgets/names changed: update in place, no re-summing
+        for team, (_, crediti) in teams.items():
+            if self.engine.teams[team].budget != (crediti or 0):
+                self.engine.set_team(team, crediti)
+        if {team: nome for team, (nome, _) in teams.items()} != self.names:
+            self.layoutAboutToBeChanged.emit()
+            self._set_teams(teams)
+            self.layoutChanged.emit()
+
+    # ---------- CHANGES ----------
+
+    def apply_db_changes(self, changes):
+        """Follow rose/fantasquadre written by any connection (see ChangeWatcher)"""
+        if "fantasquadre" in changes:
+            self.sync_teams()
+        players = changes.get("rose")
+        if players:
+            self.worker.submit(
+                load_players, self.read_session_factory, list(players),
+                on_result=self._on_players
+            )
+
+    def _on_players(self, players):
+        # Only the players that differ are re-applied; anything the engine
+        # rejects (e.g. a team it doesn't know yet) means a full rebuild
+        try:
+            self.engine.apply(self.engine.changes_to(players))
+        except RosterError:
+            self.refresh()
+
+    def _on_team_changed(self, team):
+        row = self._rows.get(team)
+        if row is not None:
+            self.dataChanged.emit(self.index(row, 1), self.index(row, self.columnCount() - 1))
+
+    # ---------- QT MODEL ----------
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.order)
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(self.headers)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        team = self.order[index.row()]
+        totals = self.engine.teams.get(team)
+        if totals is None:
+            return None
+        col = index.column()
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            if col == 0:
+                return self.names[team]
+            if col == 1:
+                return totals.budget
+            if col == 2:
+                return totals.spent
+            if col == 3:
+                return totals.remaining
+            ruolo = self.ruoli[col - 4]
+            return f"{totals.counts[ruolo]}/{self.engine.quotas[ruolo]}"
+
+        if role == Qt.ItemDataRole.ForegroundRole:
+            if col == 3 and totals.remaining < 0:
+                return QColor(255, 0, 0)
+            if col >= 4:
+                ruolo = self.ruoli[col - 4]
+                if totals.counts[ruolo] >= self.engine.quotas[ruolo]:
+                    return QColor(0, 150, 0)  # quota complete
+
+        if role == Qt.ItemDataRole.TextAlignmentRole and col > 0:
+            return Qt.AlignmentFlag.AlignCenter
+
+        return None
+
+    def headerData(self, section, orientation, role):
+        if (
+            role == Qt.ItemDataRole.DisplayRole
+            and orientation == Qt.Orientation.Horizontal
+        ):
+            return self.headers[section]
+        return None
+
+
+class RosterSummaryWidget(QWidget):
+    """Read-only table of the live rosa aggregates"""
+
+    def __init__(self, read_session_factory, worker):
+        super().__init__()
+        self.model = RosterSummaryModel(read_session_factory, worker)
+        self.setup_ui()
+
+    def setup_ui(self):
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        title = QLabel("Riepilogo rose")
+        title.setStyleSheet("font-weight: bold;")
+        layout.addWidget(title)
+
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.verticalHeader().setVisible(False)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        layout.addWidget(self.table)
+
+        self.setLayout(layout)
@@ -0,0 +1,118 @@
+from PySide6.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QLineEdit,
+    QCheckBox, QListWidget, QListWidgetItem
+)
+from PySide6.QtCore import Qt, QEvent, QTimer, Signal
+
+
+class SearchBar(QWidget):
+    """Instant giocatori search (repository.search on every keystroke).
+
+    Ranked suggestions appear under the box: choosing one jumps to the
+    player's row; "Solo risultati" filters the table to the matches.
+    """
+
+    player_chosen = Signal(int)  # giocatore id to jump to
+    filters_changed = Signal(list)  # [(field, op, value)] for Repository.page
+
+    def __init__(self, repository, worker):
+        super().__init__()
+        self.repo = repository
+        self.worker = worker
+        self.result_ids = []
+        self._task = None  # search in flight, superseded by the next keystroke
+        self.setup_ui()
+        # Queued behind the table's first page
+        QTimer.singleShot(0, lambda: self.worker.submit(self.repo.prepare_search))
+
+    def setup_ui(self):
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(2)
+
+        row = QHBoxLayout()
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("Cerca giocatore (nome o squadra, anche con errori)…")
+        self.search_edit.setClearButtonEnabled(True)
+        self.search_edit.textChanged.connect(self.search)
+        self.search_edit.installEventFilter(self)
+        row.addWidget(self.search_edit)
+
+        self.only_results_cb = QCheckBox("Solo risultati")
+        self.only_results_cb.toggled.connect(self.emit_filters)
+        row.addWidget(self.only_results_cb)
+        layout.addLayout(row)
+
+        self.results_list = QListWidget()
+        self.results_list.setMaximumHeight(160)
+        self.results_list.itemActivated.connect(self._choose_item)
+        self.results_list.itemClicked.connect(self._choose_item)
+        self.results_list.hide()
+        layout.addWidget(self.results_list)
+
+        self.setLayout(layout)
+
+    # ---------- SEARCH ----------
+
+    def search(self, query):
+        self.worker.cancel(self._task)
+        if not query.strip():
+            self._task = None
+            self._show([])
+            return
+        self._task = self.worker.submit(self.repo.search, query, on_result=self._show)
+
+    def _show(self, rows):
+        self._task = None
+        self.result_ids = [row[0] for row in rows]
+        self.results_list.clear()
+        fields = self.repo.fields
+        for row in rows:
+            values = dict(zip(fields, row[1:]))
+            item = QListWidgetItem(
+                f"{values.get('nome')}  ·  {values.get('squadra') or '–'}"
+                f"  ·  {values.get('ruolo') or '?'}  ·  {values.get('prezzo') or 0}"
+            )
+            item.setData(Qt.ItemDataRole.UserRole, row[0])
+            self.results_list.addItem(item)
+        self.results_list.setVisible(bool(rows))
+        if rows:
+            self.results_list.setCurrentRow(0)
+        if self.only_results_cb.isChecked():
+            self.emit_filters()
+
+    def _choose_item(self, item):
+        self.player_chosen.emit(item.data(Qt.ItemDataRole.UserRole))
+
+    # ---------- FILTER ----------
+
+    def filters(self):
+        if not self.only_results_cb.isChecked() or not self.search_edit.text().strip():
+            return []
+        return [("id", "in", list(self.result_ids))]
+
+    def emit_filters(self):
+        self.filters_changed.emit(self.filters())
+
+    # ---------- KEYBOARD ----------
+
+    def eventFilter(self, obj, event):
+        # Arrows move through the suggestions, Enter jumps, Esc clears
+        if obj is self.search_edit and event.type() == QEvent.Type.KeyPress:
+            key = event.key()
+            row = self.results_list.currentRow()
+            if key == Qt.Key.Key_Down and self.results_list.count():
+                self.results_list.setCurrentRow(min(row + 1, self.results_list.count() - 1))
+                return True
+            if key == Qt.Key.Key_Up and self.results_list.count():
+                self.results_list.setCurrentRow(max(row - 1, 0))
+                return True
+            if key in (Qt.Key.Key_Return, Qt.Key.Key_Enter):
+                item = self.results_list.currentItem()
+                if item is not None:
+                    self._choose_item(item)
+                return True
+            if key == Qt.Key.Key_Escape:
+                self.search_edit.clear()
+                return True
+        return super().eventFilter(obj, event)
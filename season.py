@@ -0,0 +1,383 @@
+"""Fantacalcio calendar and Monte Carlo season simulator.
+
+The calendar is a round-robin over the fantasquadre (table `calendario`),
+calendar giornata N being played with the pagelle of giornata N. Matches
+already played keep their real result, from the formazioni; the rest of
+the season is played out many times:
+
+- every team fields its expected best XI (lineup.best_formations on the
+  players' season averages) with the bench ordered behind it;
+- each player's fantavoto in a simulated giornata is drawn from his own
+  season, "senza voto" included, and bench substitutions follow the same
+  rule as lineup.substitute;
+- fantapunti become goals (GOL_SOGLIA, GOL_FASCIA), goals 3/1/0 points,
+  and the standings rank by points, then total fantapunti.
+
+A batch of simulations is a handful of array operations; batches run
+across a ProcessPoolExecutor, each with its own seed spawned from the
+simulation seed, so a seeded run gives the same result on any number of
+workers.
+"""
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from constants import GOL_FASCIA, GOL_SOGLIA, MAX_SOSTITUZIONI, SIM_RETROCESSE, SIM_TOP
+from lineup import RUOLI, best_formations, order_bench
+
+
+# Seasons played out per run and per batch (the unit of work of a worker)
+SIMULATIONS = 20000
+SIM_BATCH = 1000
+
+# Below this much work (simulations x teams x giornate left), starting the
+# (spawned) pool costs more than it saves: ~1 s in-process, while a 10-team
+# league plays out 19 giornate ~30000 times a second
+SIM_PARALLEL_MIN_WORK = 5_000_000
+
+
+class SimulationError(Exception):
+    pass
+
+
+# ---------- CALENDAR ----------
+
+def round_robin(teams, rounds=2, seed=None):
+    """Calendar of `teams`: one [(casa, trasferta)] list per giornata.
+
+    Circle method: every team meets every other once per round, with home
+    and away swapped in the return rounds; with an odd number of teams one
+    team rests each giornata. `seed` shuffles the draw reproducibly.
+    """
+    teams = list(teams)
+    if len(teams) < 2:
+        raise SimulationError("Servono almeno due fantasquadre per il calendario")
+    random.Random(seed).shuffle(teams)
+    if len(teams) % 2:
+        teams.append(None)  # riposo
+    half = len(teams) // 2
+
+    andata = []
+    for g in range(len(teams) - 1):
+        pairs = []
+        for i in range(half):
+            casa, trasferta = teams[i], teams[-1 - i]
+            if casa is None or trasferta is None:
+                continue
+            # The fixed team alternates home and away; the rotating ones
+            # move between the two rows, so they alternate already
+            if i == 0 and g % 2:
+                casa, trasferta = trasferta, casa
+            pairs.append((casa, trasferta))
+        andata.append(pairs)
+        teams = [teams[0], teams[-1]] + teams[1:-1]
+
+    ritorno = [[(trasferta, casa) for casa, trasferta in pairs] for pairs in andata]
+    return [giornata for r in range(rounds) for giornata in (andata, ritorno)[r % 2]]
+
+
+def save_calendar(session_factory, calendar):
+    """Replace the calendar with `calendar` (giornate from 1), one transaction"""
+    from sqlalchemy import delete, insert
+    from models import Partita
+
+    rows = [
+        {"giornata": giornata, "casa_id": casa, "trasferta_id": trasferta}
+        for giornata, pairs in enumerate(calendar, start=1)
+        for casa, trasferta in pairs
+    ]
+    with session_factory.begin() as session:
+        session.execute(delete(Partita))
+        if rows:
+            session.execute(insert(Partita), rows)
+
+
+def load_calendar(session_factory):
+    """(giornata, casa_id, trasferta_id) of every match, in order"""
+    from models import Partita
+
+    with session_factory() as session:
+        query = session.query(Partita.giornata, Partita.casa_id, Partita.trasferta_id)
+        return [tuple(row) for row in query.order_by(Partita.giornata, Partita.casa_id)]
+
+
+def generate_calendar(session_factory, rounds=2, seed=None):
+    """Draw and save a calendar of the live fantasquadre, returns its giornate"""
+    from models import Fantasquadra
+
+    with session_factory() as session:
+        query = session.query(Fantasquadra.id).filter_by(deleted=False)
+        teams = [team for (team,) in query.order_by(Fantasquadra.id)]
+    calendar = round_robin(teams, rounds, seed)
+    save_calendar(session_factory, calendar)
+    return len(calendar)
+
+
+# ---------- MATCHES ----------
+
+def goals(points):
+    """Goals scored with `points` fantapunti (array)"""
+    points = np.asarray(points, dtype=np.float64)
+    return np.where(
+        points >= GOL_SOGLIA, (points - GOL_SOGLIA) // GOL_FASCIA + 1, 0
+    ).astype(np.int64)
+
+
+def match_points(casa, trasferta):
+    """League points of both sides, from their fantapunti (arrays)"""
+    diff = goals(casa) - goals(trasferta)
+    return (
+        np.where(diff > 0, 3, np.where(diff == 0, 1, 0)),
+        np.where(diff < 0, 3, np.where(diff == 0, 1, 0)),
+    )
+
+
+# ---------- SIMULATION ----------
+
+class SeasonModel:
+    """Everything a worker needs to play out the season (numpy only).
+
+    Teams are indexed 0..T-1 in `teams` order; remaining matches are
+    (giornata index, casa, trasferta) arrays over those indices.
+    """
+
+    def __init__(self, teams, points, fantapunti, lineups, giornata, casa, trasferta):
+        self.teams = teams  # fantasquadra ids
+        self.points = points  # (T,) points of the matches played
+        self.fantapunti = fantapunti  # (T,) fantapunti of the matches played
+        # Per team: (history, ruoli, titolari, panchina) or None when the
+        # rosa can't field a module. history is (giornate, players)
+        self.lineups = lineups
+        self.giornate = int(giornata.max()) + 1 if len(giornata) else 0
+        self.giornata = giornata
+        self.casa = casa
+        self.trasferta = trasferta
+        # One-hot (matches, T) matrices: totals per team are one matmul
+        self.casa_matrix = np.eye(len(teams))[casa]
+        self.trasferta_matrix = np.eye(len(teams))[trasferta]
+
+
+def team_scores(rng, lineup, shape, max_subs=MAX_SOSTITUZIONI):
+    """Sampled fantapunti of one team, an array of `shape` (sims, giornate)"""
+    if lineup is None:
+        return np.zeros(shape)
+    history, ruoli, titolari, panchina = lineup
+    players = np.concatenate((titolari, panchina))
+    draws = rng.integers(0, len(history), size=shape + (len(players),))
+    sampled = history[:, players][draws, np.arange(len(players))]
+
+    starters = sampled[..., :len(titolari)]
+    bench = sampled[..., len(titolari):]
+    total = np.nansum(starters, axis=-1)
+    # Titolari are ordered by ruolo, the order lineup.substitute visits
+    # them in: the k-th missing one of a ruolo gets the k-th available
+    # reserve of that ruolo while substitutions are left
+    subs_left = np.full(shape, max_subs)
+    for code in range(len(RUOLI)):
+        missing = np.isnan(starters[..., ruoli[titolari] == code]).sum(axis=-1)
+        values = bench[..., ruoli[panchina] == code]
+        available = ~np.isnan(values)
+        count = np.minimum(np.minimum(missing, available.sum(axis=-1)), subs_left)
+        taken = available & (np.cumsum(available, axis=-1) <= count[..., None])
+        total += np.where(taken, values, 0.0).sum(axis=-1)
+        subs_left -= count
+    return total
+
+
+def simulate_batch(model, seed, simulations):
+    """Final positions of `simulations` seasons.
+
+    Returns ((T, T) counts of team i finishing in position j, (T,) sum of
+    the final points).
+    """
+    rng = np.random.default_rng(seed)
+    teams = len(model.teams)
+    shape = (simulations, model.giornate)
+    scores = np.empty(shape + (teams,))
+    for t, lineup in enumerate(model.lineups):
+        scores[..., t] = team_scores(rng, lineup, shape)
+
+    casa = scores[:, model.giornata, model.casa]  # (simulations, matches)
+    trasferta = scores[:, model.giornata, model.trasferta]
+    casa_points, trasferta_points = match_points(casa, trasferta)
+    points = model.points + casa_points @ model.casa_matrix + trasferta_points @ model.trasferta_matrix
+    fantapunti = model.fantapunti + casa @ model.casa_matrix + trasferta @ model.trasferta_matrix
+
+    # Points first, fantapunti break the ties
+    order = np.lexsort((-fantapunti, -points), axis=-1)
+    position = np.empty_like(order)
+    np.put_along_axis(position, order, np.arange(teams), axis=-1)
+    counts = np.bincount(
+        (np.arange(teams) * teams + position).ravel(), minlength=teams * teams
+    ).reshape(teams, teams)
+    return counts, points.sum(axis=0)
+
+
+_worker_model = None
+
+
+def _init_worker(model):
+    # The model travels once per worker, batches only carry their seed
+    global _worker_model
+    _worker_model = model
+
+
+def _simulate_batch_task(args):
+    return simulate_batch(_worker_model, *args)
+
+
+def simulate(model, simulations=SIMULATIONS, seed=None, workers=None, batch_size=SIM_BATCH):
+    """Play out the season `simulations` times across processes.
+
+    Returns ((T, T) position counts, (T,) mean final points, workers).
+    `workers=1` runs in this process (no pool); None picks one worker per
+    CPU for large runs and stays in-process for small ones.
+    """
+    sizes = [batch_size] * (simulations // batch_size)
+    if simulations % batch_size:
+        sizes.append(simulations % batch_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = list(zip(seeds, sizes))
+    if workers is None:
+        work = simulations * len(model.teams) * model.giornate
+        workers = os.cpu_count() if work >= SIM_PARALLEL_MIN_WORK else 1
+    if workers == 1:
+        results = [simulate_batch(model, *job) for job in jobs]
+    else:
+        # spawn: forking a process that runs Qt threads is not safe
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=context,
+            initializer=_init_worker, initargs=(model,),
+        ) as pool:
+            results = list(pool.map(_simulate_batch_task, jobs))
+
+    teams = len(model.teams)
+    counts = sum((c for c, _ in results), np.zeros((teams, teams), dtype=np.int64))
+    points = sum((p for _, p in results), np.zeros(teams))
+    return counts, points / max(simulations, 1), workers
+
+
+# ---------- SEASON ----------
+
+def expected_lineup(ruoli, actual):
+    """(history, ruoli, titolari, panchina) a team fields in the simulation.
+
+    Season averages pick the XI and the bench order; None when the rosa
+    can't field any module.
+    """
+    played = (~np.isnan(actual)).sum(axis=0)
+    averages = np.where(played > 0, np.nansum(actual, axis=0) / np.maximum(played, 1), np.nan)
+    choice = best_formations(ruoli, averages[None, :])[0]
+    if choice is None:
+        return None
+    _, titolari, _ = choice
+    return actual, ruoli, titolari, order_bench(ruoli, averages, titolari)
+
+
+def season_model(matches, played, real, season):
+    """SeasonModel of the calendar `matches` after giornata `played`.
+
+    `matches` are (giornata, casa, trasferta) fantasquadra ids, `real` the
+    {(giornata, team): fantapunti} of the matches played (missing = 0) and
+    `season` {team: (ruoli, actual fantavoti)} for the ones left.
+    """
+    teams = sorted({team for _, casa, trasferta in matches for team in (casa, trasferta)})
+    position = {team: i for i, team in enumerate(teams)}
+    giornata = np.array([g for g, _, _ in matches], dtype=np.int64)
+    casa = np.array([position[c] for _, c, _ in matches], dtype=np.int64)
+    trasferta = np.array([position[t] for _, _, t in matches], dtype=np.int64)
+
+    # Matches played: real results
+    done = giornata <= played
+    casa_scores = np.array(
+        [real.get((g, teams[c]), 0.0) for g, c in zip(giornata[done].tolist(), casa[done].tolist())]
+    )
+    trasferta_scores = np.array(
+        [real.get((g, teams[t]), 0.0) for g, t in zip(giornata[done].tolist(), trasferta[done].tolist())]
+    )
+    casa_points, trasferta_points = match_points(casa_scores, trasferta_scores)
+    points = (
+        np.bincount(casa[done], casa_points, len(teams))
+        + np.bincount(trasferta[done], trasferta_points, len(teams))
+    )
+    fantapunti = (
+        np.bincount(casa[done], casa_scores, len(teams))
+        + np.bincount(trasferta[done], trasferta_scores, len(teams))
+    )
+
+    lineups = [expected_lineup(*season[team]) if team in season else None for team in teams]
+    # Remaining giornate renumbered 0..R-1 for the sampled score arrays
+    remaining = ~done
+    _, index = np.unique(giornata[remaining], return_inverse=True)
+    return SeasonModel(
+        teams, points, fantapunti, lineups,
+        index.reshape(-1), casa[remaining], trasferta[remaining],
+    )
+
+
+def load_model(session_factory, weights=None):
+    """SeasonModel of the saved calendar and the giornate with pagelle"""
+    # Imported here: the worker processes only need numpy
+    from lineup import load_season
+    from scoring import load_lineups, load_votes, score
+
+    matches = load_calendar(session_factory)
+    if not matches:
+        raise SimulationError("Nessun calendario: generalo prima di simulare")
+    votes = load_votes(session_factory)
+    if len(votes) == 0:
+        raise SimulationError("Nessun voto ancora: impossibile stimare le squadre")
+    season, giornate = load_season(session_factory, weights, votes)
+    # Real results from the formazioni
+    _, (total_giornate, total_teams, totals) = score(votes, load_lineups(session_factory), weights)
+    real = dict(zip(zip(total_giornate.tolist(), total_teams.tolist()), totals.tolist()))
+    return season_model(
+        matches, int(giornate.max()), real,
+        {team: (ruoli, actual) for team, (_, ruoli, actual) in season.items()},
+    )
+
+
+def simulate_season(session_factory, simulations=SIMULATIONS, seed=None, workers=None, weights=None):
+    """Title, top SIM_TOP and relegation probabilities of every team.
+
+    Returns {"teams": {team: {...}}, "standings": {...}, "timing": {...}}.
+    """
+    start = time.perf_counter()
+    model = load_model(session_factory, weights)
+    loaded = time.perf_counter()
+    counts, points, workers = simulate(model, simulations, seed, workers)
+
+    teams = len(model.teams)
+    total = max(simulations, 1)
+    relegation = max(1, teams - SIM_RETROCESSE)
+    result = {
+        team: {
+            "titolo": int(counts[i, 0]) / total,
+            "top": int(counts[i, :SIM_TOP].sum()) / total,
+            "retrocessione": int(counts[i, relegation:].sum()) / total,
+            "punti": float(points[i]),
+            "posizione": float(counts[i] @ np.arange(1, teams + 1)) / total,
+        }
+        for i, team in enumerate(model.teams)
+    }
+    return {
+        "teams": result,
+        # Current standings: (points, fantapunti) of the matches played
+        "standings": {
+            team: (int(model.points[i]), float(model.fantapunti[i]))
+            for i, team in enumerate(model.teams)
+        },
+        "timing": {
+            "simulations": simulations,
+            "remaining": model.giornate,
+            "workers": workers,
+            "load_s": loaded - start,
+            "simulate_s": time.perf_counter() - loaded,
+            "total_s": time.perf_counter() - start,
+        },
+    }
@@ -0,0 +1,35 @@
+"""Startup phase timing.
+
+Import this module first: phases are measured from its import. With
+FANTAMANAGER_STARTUP_TIMING=1 the phases are printed to stderr once the
+first tab has data; with instrumentation on they are also recorded as
+`startup.<phase>` in the diagnostics registry.
+"""
+import os
+import sys
+import time
+
+T0 = time.perf_counter()
+
+ENV_TIMING = "FANTAMANAGER_STARTUP_TIMING"
+
+phases = []  # [(phase, ms since T0)]
+
+
+def mark(phase):
+    ms = (time.perf_counter() - T0) * 1000
+    phases.append((phase, ms))
+
+    import instrumentation
+    if instrumentation.is_enabled():
+        instrumentation.registry.record(f"startup.{phase}", ms)
+    return ms
+
+
+def report():
+    if os.environ.get(ENV_TIMING, "").lower() not in ("1", "true", "yes", "on"):
+        return
+    previous = 0.0
+    for phase, ms in phases:
+        print(f"[startup] {phase:<24} {ms:8.1f} ms  (+{ms - previous:.1f})", file=sys.stderr)
+        previous = ms
@@ -0,0 +1,662 @@
+"""Shared league mode: a sync server and replicas of its database.
+
+The server owns the canonical database. Every write it accepts is stored
+as field deltas (table, row id, field, value) in `sync_feed`, numbered by
+a sequence, and broadcast to the connected clients. Each app instance
+keeps a full local replica (its own SQLite file) and the last seq it
+applied, so the views keep reading locally and a reconnect replays only
+the missing range of the feed; a snapshot is sent only to a new replica.
+
+Clients push the edits of their table models as batched deltas, queued
+in the replica's `sync_outbox` by the transaction of the edit (so they
+survive going offline or quitting) and sent after the replay on
+reconnect; new rows are created on the server, which assigns their ids. Deltas are applied in feed order
+everywhere, so the replicas converge to the server (last writer wins).
+
+Protocol: JSON lines as in auction.py ({"op", "req"} requests, replies
+echoing "req", {"event": ...} broadcasts). Any message carrying
+"entries" ([seq, table, row id, field, value] lists) or a "snapshot" is
+applied by the replica in stream order.
+
+    python sync.py --port 8766
+    FANTAMANAGER_SYNC=127.0.0.1:8766 python main.py
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import uuid
+
+from sqlalchemy import delete, event, func, insert, update
+
+from constants import ENV_SYNC, FANTASQUADRE_FIELDS, GIOCATORI_FIELDS
+from models import Fantasquadra, Giocatore, SyncFeed, SyncOutbox, SyncState
+from repository import _chunks
+
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8766
+
+# Tables edited through the table models, with the fields that replicate
+SYNC_TABLES = {
+    "giocatori": (Giocatore, GIOCATORI_FIELDS + ["deleted"]),
+    "fantasquadre": (Fantasquadra, FANTASQUADRE_FIELDS + ["deleted"]),
+}
+
+# Max line length: a snapshot or a replayed range is a single line
+STREAM_LIMIT = 64 * 1024 * 1024
+
+RECONNECT_SECONDS = 2.0
+CREATE_TIMEOUT_SECONDS = 10.0
+
+# Outbox deltas sent per push request
+OUTBOX_BATCH_SIZE = 5000
+
+log = logging.getLogger(__name__)
+
+
+class SyncError(Exception):
+    """A rejected or impossible sync request; the message is user facing"""
+
+
+class SyncServerError(SyncError):
+    """The server failed on a valid request (e.g. database locked): retry it"""
+
+
+# ---------- STATE ----------
+
+def _get_state(session, key):
+    return session.query(SyncState.value).filter_by(key=key).scalar()
+
+
+def _set_state(session, key, value):
+    session.merge(SyncState(key=key, value=None if value is None else str(value)))
+
+
+def load_state(session_factory):
+    """(league id, last applied seq) of a replica"""
+    with session_factory() as session:
+        return _get_state(session, "league"), int(_get_state(session, "seq") or 0)
+
+
+# ---------- DELTAS ----------
+
+def _validate(table, field=None):
+    if table not in SYNC_TABLES:
+        raise SyncError(f"Tabella non sincronizzata: {table!r}")
+    if field is not None and field not in SYNC_TABLES[table][1]:
+        raise SyncError(f"Campo non sincronizzato: {table}.{field}")
+
+
+def _check_delta(delta):
+    """Validate a [table, row id, field, value] delta sent by a client"""
+    if not isinstance(delta, list) or len(delta) != 4 or not isinstance(delta[1], int):
+        raise SyncError("Delta non valido")
+    table, _, field, value = delta
+    _validate(table, field)
+    model = SYNC_TABLES[table][0]
+    if field is not None and value is None and not model.__table__.c[field].nullable:
+        raise SyncError(f"Valore obbligatorio: {table}.{field}")
+
+
+def apply_deltas(session, deltas, create=True):
+    """Apply [table, row id, field, value] deltas in order, set-based.
+
+    Later deltas of a field win; field None hard deletes the row. A row
+    missing here is inserted with the fields of the batch (replicas follow
+    the feed), or with create=False its deltas are skipped: on the server
+    only create_rows() makes rows. Returns the positions of the skipped
+    deltas.
+    """
+    rows = {}  # {(table, row id): {field: value} or None (deleted)}
+    positions = {}  # {(table, row id): positions of its deltas}
+    for i, (table, row_id, field, value) in enumerate(deltas):
+        _validate(table, field)
+        key = (table, row_id)
+        positions.setdefault(key, []).append(i)
+        if field is None:
+            rows[key] = None
+            continue
+        values = rows.get(key) or {}
+        values[field] = value
+        rows[key] = values
+
+    skipped = []
+    for table, (model, _) in SYNC_TABLES.items():
+        keys = {row_id: values for (t, row_id), values in rows.items() if t == table}
+        existing = set()
+        for chunk in _chunks(list(keys)):
+            existing.update(obj_id for (obj_id,) in session.query(model.id).filter(model.id.in_(chunk)))
+        if not create:
+            for row_id in keys.keys() - existing:
+                skipped.extend(positions[(table, row_id)])
+        deleted = [row_id for row_id, values in keys.items() if values is None and row_id in existing]
+        for chunk in _chunks(deleted):
+            session.execute(delete(model).where(model.id.in_(chunk)))
+        updates = [
+            {"id": row_id, **values} for row_id, values in keys.items()
+            if values and row_id in existing
+        ]
+        inserts = [
+            {"deleted": False, **values, "id": row_id} for row_id, values in keys.items()
+            if values and row_id not in existing and create
+        ]
+        if updates:
+            session.execute(update(model), updates)
+        if inserts:
+            session.execute(insert(model), inserts)
+    return sorted(skipped)
+
+
+def _row_deltas(table, row_id, values):
+    return [[table, row_id, field, value] for field, value in values.items()]
+
+
+# ---------- SERVER SIDE ----------
+
+def league_id(session_factory):
+    """Id of the canonical database, created on first use"""
+    with session_factory.begin() as session:
+        league = _get_state(session, "league")
+        if league is None:
+            league = uuid.uuid4().hex
+            _set_state(session, "league", league)
+        return league
+
+
+def _record(session, deltas):
+    """Append deltas to the feed, returns them as entries with their seq"""
+    if not deltas:
+        return []
+    first = session.query(func.coalesce(func.max(SyncFeed.seq), 0)).scalar() + 1
+    session.execute(insert(SyncFeed), [
+        {"table_name": t, "row_id": r, "field": f, "value": json.dumps(v)}
+        for t, r, f, v in deltas
+    ])
+    # A single writer holds the transaction: the seqs are consecutive
+    return [[first + i, *delta] for i, delta in enumerate(deltas)]
+
+
+def push_deltas(session_factory, deltas):
+    """Apply client deltas to the canonical database and feed, one transaction.
+
+    Returns (skipped, rejected, entries): positions of the deltas whose row
+    doesn't exist here (the feed already deleted it on the replicas),
+    [position, message] of the invalid ones, and the feed entries of the
+    applied ones. One bad delta never holds up the rest of the batch.
+    """
+    valid, rejected = [], []
+    for i, delta in enumerate(deltas):
+        try:
+            _check_delta(delta)
+        except SyncError as exc:
+            rejected.append([i, str(exc)])
+        else:
+            valid.append(i)
+    with session_factory.begin() as session:
+        skipped = [
+            valid[j] for j in apply_deltas(session, [deltas[i] for i in valid], create=False)
+        ]
+        dropped = set(skipped)
+        applied = [deltas[i] for i in valid if i not in dropped]
+        return skipped, rejected, _record(session, applied)
+
+
+def create_rows(session_factory, table, rows):
+    """Insert rows ({field: value}) with new ids, returns (ids, entries)"""
+    _validate(table)
+    model, fields = SYNC_TABLES[table]
+    with session_factory.begin() as session:
+        deltas = []
+        ids = []
+        for values in rows:
+            values = {"deleted": False, **values}
+            for field in values:
+                _validate(table, field)
+            obj = model(**values)
+            session.add(obj)
+            session.flush()
+            ids.append(obj.id)
+            deltas.extend(_row_deltas(table, obj.id, {f: getattr(obj, f) for f in fields}))
+        return ids, _record(session, deltas)
+
+
+def changes_since(session_factory, seq):
+    """Feed entries after `seq`, or None if the replica needs a snapshot"""
+    with session_factory() as session:
+        last = session.query(func.coalesce(func.max(SyncFeed.seq), 0)).scalar()
+        if seq > last:
+            return None  # replica of another (or reset) database
+        query = session.query(
+            SyncFeed.seq, SyncFeed.table_name, SyncFeed.row_id, SyncFeed.field, SyncFeed.value
+        ).filter(SyncFeed.seq > seq).order_by(SyncFeed.seq)
+        return [[s, t, r, f, json.loads(v)] for s, t, r, f, v in query]
+
+
+def snapshot(session_factory):
+    """(seq, {table: [[id, *fields]]}) of the whole league, consistent"""
+    with session_factory() as session:
+        seq = session.query(func.coalesce(func.max(SyncFeed.seq), 0)).scalar()
+        tables = {}
+        for table, (model, fields) in SYNC_TABLES.items():
+            columns = [model.id] + [getattr(model, f) for f in fields]
+            tables[table] = [list(row) for row in session.query(*columns)]
+        return seq, tables
+
+
+class SyncServer:
+    """Asyncio sync server; create it inside the running event loop"""
+
+    def __init__(self, session_factory, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self.session_factory = session_factory
+        self.host = host
+        self.port = port
+        self.league = None
+        self.clients = set()  # writers registered for the feed broadcast
+        self._write_lock = None  # one write (and broadcast) at a time
+        self._server = None
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        self._write_lock = asyncio.Lock()
+        self.league = await loop.run_in_executor(None, league_id, self.session_factory)
+        self._server = await asyncio.start_server(
+            self._handle_client, self.host, self.port, limit=STREAM_LIMIT
+        )
+        # Port 0 asks the OS for a free port
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        await self._server.serve_forever()
+
+    async def close(self):
+        self._server.close()
+        for writer in list(self.clients):
+            writer.close()
+        await self._server.wait_closed()
+
+    # ---------- CONNECTIONS ----------
+
+    async def _handle_client(self, reader, writer):
+        try:
+            while line := await reader.readline():
+                try:
+                    message = json.loads(line)
+                    req = message.get("req")
+                except (ValueError, AttributeError):
+                    self._send(writer, {"ok": False, "error": "Messaggio non valido"})
+                    continue
+                try:
+                    reply = await self._dispatch(writer, message)
+                    reply = {"req": req, "ok": True, **(reply or {})}
+                except SyncError as exc:
+                    reply = {"req": req, "ok": False, "error": str(exc)}
+                except Exception as exc:
+                    reply = {
+                        "req": req, "ok": False, "retry": True,
+                        "error": f"Errore del server: {exc}",
+                    }
+                self._send(writer, reply)
+                if message.get("op") == "hello" and reply["ok"]:
+                    # Only after the replay: every later event follows it
+                    self.clients.add(writer)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.clients.discard(writer)
+            writer.close()
+
+    def _send(self, writer, message):
+        writer.write(json.dumps(message).encode() + b"\n")
+
+    def _broadcast(self, message):
+        # No drain: a slow client must not hold up the others
+        data = json.dumps(message).encode() + b"\n"
+        for writer in self.clients:
+            if not writer.is_closing():
+                writer.write(data)
+
+    async def _dispatch(self, writer, message):
+        op = message.get("op")
+        if op == "hello":
+            return await self.hello(message.get("league"), message.get("seq", 0))
+        if op == "push":
+            return await self.push(message.get("deltas") or [])
+        if op == "create":
+            return await self.create(message.get("table"), message.get("rows") or [])
+        raise SyncError(f"Operazione sconosciuta: {op}")
+
+    # ---------- OPERATIONS ----------
+
+    async def hello(self, league, seq):
+        """Replay the feed after `seq`, or a snapshot for a new replica"""
+        loop = asyncio.get_running_loop()
+        # Under the write lock: no write lands between the replay and the
+        # registration for the broadcast
+        async with self._write_lock:
+            entries = None
+            if league == self.league and seq > 0:
+                entries = await loop.run_in_executor(
+                    None, changes_since, self.session_factory, seq
+                )
+            if entries is not None:
+                return {"league": self.league, "entries": entries}
+            last, tables = await loop.run_in_executor(None, snapshot, self.session_factory)
+            return {"league": self.league, "seq": last, "snapshot": tables}
+
+    async def push(self, deltas):
+        if not isinstance(deltas, list):
+            raise SyncError("Delta non validi")
+        if not deltas:
+            return {"seq": None}
+        return await self._write(push_deltas, self.session_factory, deltas)
+
+    async def create(self, table, rows):
+        if not rows:
+            return {"ids": []}
+        return await self._write(create_rows, self.session_factory, table, rows)
+
+    async def _write(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        async with self._write_lock:
+            result = await loop.run_in_executor(None, fn, *args)
+            entries = result[-1]
+            # Broadcast before replying: the writer's replica already has
+            # the rows when its request returns
+            if entries:
+                self._broadcast({"event": "changes", "entries": entries})
+        reply = {"seq": entries[-1][0] if entries else None}
+        if fn is create_rows:
+            reply["ids"] = result[0]
+        else:
+            reply["skipped"], reply["rejected"] = result[0], result[1]
+        return reply
+
+
+# ---------- REPLICA SIDE ----------
+
+def apply_entries(session_factory, entries):
+    """Apply feed entries newer than the replica's seq, one transaction.
+
+    Returns the new seq; raises SyncError on a gap in the sequence.
+    """
+    with session_factory.begin() as session:
+        seq = int(_get_state(session, "seq") or 0)
+        entries = [e for e in entries if e[0] > seq]
+        if not entries:
+            return seq
+        if entries[0][0] != seq + 1:
+            raise SyncError("Sequenza di sincronizzazione interrotta")
+        apply_deltas(session, [e[1:] for e in entries])
+        _set_state(session, "seq", entries[-1][0])
+        return entries[-1][0]
+
+
+def apply_snapshot(session_factory, league, seq, tables):
+    """Replace the synced tables with the server's, one transaction"""
+    with session_factory.begin() as session:
+        for table, rows in tables.items():
+            _validate(table)
+            model, fields = SYNC_TABLES[table]
+            session.execute(delete(model))
+            if rows:
+                session.execute(insert(model), [
+                    dict(zip(["id"] + fields, row)) for row in rows
+                ])
+        _set_state(session, "league", league)
+        _set_state(session, "seq", seq)
+    return seq
+
+
+def queue_deltas(session, deltas):
+    """Add [table, row id, field, value] deltas to the outbox, in `session`'s transaction"""
+    for table, _, field, _ in deltas:
+        _validate(table, field)
+    session.execute(insert(SyncOutbox), [
+        {"table_name": t, "row_id": r, "field": f, "value": json.dumps(v)}
+        for t, r, f, v in deltas
+    ])
+
+
+def load_outbox(session_factory, limit=OUTBOX_BATCH_SIZE):
+    """(last seq, deltas) of the oldest queued deltas, (None, []) if none"""
+    with session_factory() as session:
+        rows = session.query(
+            SyncOutbox.seq, SyncOutbox.table_name, SyncOutbox.row_id,
+            SyncOutbox.field, SyncOutbox.value
+        ).order_by(SyncOutbox.seq).limit(limit).all()
+    if not rows:
+        return None, []
+    return rows[-1][0], [[t, r, f, json.loads(v)] for _, t, r, f, v in rows]
+
+
+def ack_outbox(session_factory, seq):
+    """Drop the outbox deltas up to `seq` (applied, skipped or rejected by the server)"""
+    with session_factory.begin() as session:
+        session.execute(delete(SyncOutbox).where(SyncOutbox.seq <= seq))
+
+
+class SyncClient:
+    """Keeps a replica in sync with a SyncServer; runs on its own event loop.
+
+    push() and create() are called from other threads (the DB worker).
+    `on_status(connected, message)` is called from the loop thread.
+    """
+
+    def __init__(self, session_factory, host=DEFAULT_HOST, port=DEFAULT_PORT, on_status=None):
+        self.session_factory = session_factory
+        self.host = host
+        self.port = port
+        self.on_status = on_status
+        self.connected = False
+        self.seq = 0
+        self.loop = None
+        self._writer = None
+        self._pending = {}
+        self._ids = itertools.count(1)
+        self._flushing = None
+        self._flush_again = False
+        self._closed = False
+        self._task = None
+
+    # ---------- THREAD-SAFE API ----------
+
+    def push(self, session, table, deltas):
+        """Queue [(row id, field, value)] of a local edit in its transaction.
+
+        They are sent once `session` commits; a rollback discards them.
+        """
+        queue_deltas(session, [[table, row_id, field, value] for row_id, field, value in deltas])
+        event.listen(session, "after_commit", self._committed, once=True)
+
+    def _committed(self, session):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self._flush)
+
+    def create(self, table, rows):
+        """Create rows on the server and wait until the replica has them"""
+        if not self.connected:
+            raise SyncError("Server della lega non raggiungibile: impossibile creare righe")
+        future = asyncio.run_coroutine_threadsafe(
+            self.request("create", table=table, rows=rows), self.loop
+        )
+        return future.result(CREATE_TIMEOUT_SECONDS)["ids"]
+
+    def stop(self):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self._close)
+
+    # ---------- CONNECTION ----------
+
+    async def run(self):
+        """Connect, replay, follow the feed; reconnect until stop()"""
+        self.loop = asyncio.get_running_loop()
+        self._task = asyncio.current_task()
+        while not self._closed:
+            try:
+                reader, self._writer = await asyncio.open_connection(
+                    self.host, self.port, limit=STREAM_LIMIT
+                )
+            except OSError as exc:
+                self._status(False, f"Server della lega non raggiungibile ({exc.strerror or exc})")
+                await asyncio.sleep(RECONNECT_SECONDS)
+                continue
+            try:
+                await self._follow(reader)
+            except (ConnectionError, SyncError, OSError) as exc:
+                self._status(False, f"Sincronizzazione interrotta: {exc}")
+            except Exception as exc:
+                # e.g. "database is locked" applying entries: the thread must
+                # survive it and retry like after a dropped connection
+                log.exception("Sync replica error")
+                self._status(False, f"Sincronizzazione interrotta: {exc}")
+            finally:
+                self._writer.close()
+                self._writer = None
+                self.connected = False
+            if not self._closed:
+                await asyncio.sleep(RECONNECT_SECONDS)
+
+    async def _follow(self, reader):
+        listener = asyncio.ensure_future(self._listen(reader))
+        try:
+            league, self.seq = await self.loop.run_in_executor(
+                None, load_state, self.session_factory
+            )
+            # Replays the missing range (or sends a snapshot) before the reply
+            await self.request("hello", league=league, seq=self.seq)
+            self.connected = True
+            self._status(True, f"Lega condivisa sincronizzata (seq {self.seq})")
+            self._flush()
+            await listener
+        finally:
+            listener.cancel()
+
+    async def _listen(self, reader):
+        try:
+            while line := await reader.readline():
+                await self._handle(json.loads(line))
+            raise ConnectionError("Connessione chiusa dal server")
+        finally:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Connessione chiusa"))
+            self._pending.clear()
+
+    async def _handle(self, message):
+        # Feed data is applied in stream order, before the reply it came with
+        if "snapshot" in message:
+            self.seq = await self.loop.run_in_executor(
+                None, apply_snapshot, self.session_factory,
+                message["league"], message["seq"], message["snapshot"]
+            )
+        if message.get("entries"):
+            self.seq = await self.loop.run_in_executor(
+                None, apply_entries, self.session_factory, message["entries"]
+            )
+        future = self._pending.pop(message.get("req"), None)
+        if future is not None and not future.done():
+            future.set_result(message)
+
+    async def request(self, op, **params):
+        """Send a request and wait for its reply; raises SyncError if rejected
+        (SyncServerError if the server failed and it can be retried)"""
+        if self._writer is None:
+            raise ConnectionError("Non connesso")
+        req = next(self._ids)
+        future = self.loop.create_future()
+        self._pending[req] = future
+        self._writer.write(json.dumps({"op": op, "req": req, **params}).encode() + b"\n")
+        await self._writer.drain()
+        reply = await future
+        if not reply.get("ok"):
+            error = SyncServerError if reply.get("retry") else SyncError
+            raise error(reply.get("error"))
+        return reply
+
+    # ---------- OUTBOX ----------
+
+    def _flush(self):
+        if not self.connected:
+            return  # sent after the replay of the next connection
+        if self._flushing is None:
+            self._flushing = asyncio.ensure_future(self._send_outbox())
+        else:
+            self._flush_again = True  # committed while a send was running
+
+    async def _send_outbox(self):
+        run = self.loop.run_in_executor
+        try:
+            while self.connected:
+                self._flush_again = False
+                last, batch = await run(None, load_outbox, self.session_factory)
+                if not batch:
+                    if self._flush_again:
+                        continue
+                    break
+                try:
+                    reply = await self.request("push", deltas=batch)
+                except SyncServerError as exc:
+                    # Kept in the outbox and sent again in a while
+                    self._status(True, f"Invio modifiche rimandato: {exc}")
+                    self.loop.call_later(RECONNECT_SECONDS, self._flush)
+                    break
+                # Deltas of rows deleted on the server are skipped (the replica
+                # got the delete from the feed); rejected ones are dropped and
+                # the replica realigned, it already applied them
+                await run(None, ack_outbox, self.session_factory, last)
+                rejected = reply.get("rejected") or []
+                if rejected:
+                    log.warning("Sync deltas rejected: %s", rejected)
+                    await self.request("hello", league=None, seq=0)
+                    self._status(
+                        True,
+                        f"{len(rejected)} modifiche rifiutate dal server, lega riallineata: "
+                        f"{rejected[0][1]}"
+                    )
+        except ConnectionError:
+            pass  # still in the outbox for the next connection
+        except Exception:
+            log.exception("Sync outbox error")  # kept, retried on the next flush
+        finally:
+            self._flushing = None
+
+    def _close(self):
+        self._closed = True
+        if self._task is not None:
+            self._task.cancel()
+
+    def _status(self, connected, message):
+        if self.on_status is not None:
+            self.on_status(connected, message)
+
+
+# ---------- MAIN ----------
+
+async def serve(session_factory, host, port):
+    server = SyncServer(session_factory, host, port)
+    await server.start()
+    print(f"Lega condivisa in ascolto su {server.host}:{server.port}")
+    await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Server per la lega condivisa")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args(argv)
+
+    from database import SessionLocal, engine
+    from migrations import migrate
+
+    migrate(engine)
+    try:
+        asyncio.run(serve(SessionLocal, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import asyncio
+import threading
+
+from PySide6.QtCore import QObject, Signal
+
+from sync import SyncClient
+
+
+class SyncLink(QObject):
+    """Runs a SyncClient on its own thread and plugs it into repositories.
+
+    Incoming feed entries are written to the local replica by the sync
+    thread; the ChangeWatcher then patches the views like any other commit.
+    """
+
+    status_changed = Signal(bool, str)  # connected, message (from the sync thread)
+
+    def __init__(self, session_factory, host, port, parent=None):
+        super().__init__(parent)
+        self.client = SyncClient(session_factory, host, port, on_status=self.status_changed.emit)
+        self._thread = None
+
+    def attach(self, repository):
+        """Replicate the writes of a repository through the server"""
+        repository.replication = self.client
+
+    def start(self):
+        started = threading.Event()
+
+        def run():
+            async def main():
+                self.client.loop = asyncio.get_running_loop()
+                started.set()
+                await self.client.run()
+
+            try:
+                asyncio.run(main())
+            except asyncio.CancelledError:
+                pass  # stop()
+
+        self._thread = threading.Thread(target=run, name="sync", daemon=True)
+        self._thread.start()
+        started.wait()
+
+    def stop(self):
+        if self._thread is not None:
+            self.client.stop()
+            self._thread.join(5)
+            self._thread = None
@@ -1,4 +1,4 @@
-from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QPushButton
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel
 from PySide6.QtCore import Signal
 from editable_table_model import EditableTableModel
 from editable_table_view import EditableTableView
@@ -17,6 +17,8 @@ class TableWithEditButtons(QWidget):
         model = cast(EditableTableModel, self.view.model())
         if model:
             model.has_pending_changes.connect(self.update_buttons_visibility)
+            model.loading_changed.connect(self.loading_label.setVisible)
+            self.loading_label.setVisible(model.is_loading())
     
     def setup_ui(self):
         layout = QVBoxLayout()
@@ -24,6 +26,13 @@ class TableWithEditButtons(QWidget):
         
         # Buttons layout (top right)
         buttons_layout = QHBoxLayout()
+        
+        # Loading indicator (visible while a query runs)
+        self.loading_label = QLabel("Caricamento…")
+        self.loading_label.setStyleSheet("color: gray;")
+        self.loading_label.hide()
+        buttons_layout.addWidget(self.loading_label)
+        
         buttons_layout.addStretch()
         
         self.confirm_btn = QPushButton("Conferma modifiche")